@@ -1,29 +1,39 @@
-from machine import ADC, Pin
 import uasyncio
-import _thread
+from managers import event_bus as events
+from managers.event_bus import event_bus
+from managers.adc_manager import adc_manager
 
 class DFRobotMoistureSensor:
     def __init__(self, config, log_manager, data_mgr) -> None:
-        self.sensor_pin = ADC(Pin(config.DFR_MOISTURE_SENSOR_PIN))
+        self.config = config
+        self.sensor = adc_manager.channel(config.DFR_MOISTURE_SENSOR_PIN, "dfr_moisture", probe=True)
+        self.spike_window = config.ADC_SPIKE_WINDOW or 2
         self.log_mgr = log_manager
         self.data_mgr = data_mgr
+        self.acquisition_mgr = None
+        self.system_manager = None
         
         # Configuration values
         self.SENSOR_DRY_VALUE = config.DFR_MOISTURE_SENSOR_DRY_VALUE
         self.SENSOR_WET_VALUE = config.DFR_MOISTURE_SENSOR_WET_VALUE
         self.THRESHOLD = config.MOISTURE_THRESHOLD
         
-        self.moisture_raw = self.sensor_pin.read_u16()
+        self.moisture_raw = self.sensor.read_u16()
+        self.moisture_noise = 0
         self.moisture_percent = self.calculate_moisture_lvl()
         
-        self.lock = _thread.allocate_lock()
+        event_bus.subscribe(events.CONFIG_CHANGED, self.on_config_changed)
         self.log_mgr.log("DFRobotMoistureSensor initialized.")
         
     
     def calculate_moisture_lvl(self):
         try:
             
-            self.moisture_raw = self.data_mgr.filter_spike("dfr_moisture_sensor", self.sensor_pin.read_u16())
+            raw_value = self.acquisition_mgr.latest("dfr_moisture") if self.acquisition_mgr else None
+            if raw_value is None:
+                raw_value = self.data_mgr.filter_spike("dfr_moisture_sensor", self.sensor.read(), self.spike_window)
+                self.moisture_noise = self.sensor.noise
+            self.moisture_raw = raw_value
             # self.log_mgr.log(f"dfr moisture raw: {self.moisture_raw}")
             # Calculate moisture percentage
             moisture_range = self.SENSOR_DRY_VALUE - self.SENSOR_WET_VALUE
@@ -46,17 +56,32 @@ class DFRobotMoistureSensor:
             return None
         
         
+    def on_config_changed(self, key):
+        if key == "MOISTURE_THRESHOLD":
+            self.THRESHOLD = self.config.MOISTURE_THRESHOLD
+        elif key == "DFR_MOISTURE_SENSOR_DRY_VALUE":
+            self.SENSOR_DRY_VALUE = self.config.DFR_MOISTURE_SENSOR_DRY_VALUE
+        elif key == "DFR_MOISTURE_SENSOR_WET_VALUE":
+            self.SENSOR_WET_VALUE = self.config.DFR_MOISTURE_SENSOR_WET_VALUE
+        elif key.startswith("ADC_"):
+            self.spike_window = self.config.ADC_SPIKE_WINDOW or 2
+
+    def set_acquisition_manager(self, acquisition_mgr):
+        self.acquisition_mgr = acquisition_mgr
+        acquisition_mgr.add_channel("dfr_moisture", self.config.DFR_MOISTURE_SENSOR_PIN, acquisition_mgr.MODE_OVERSAMPLE,
+                                    self.config.ACQUISITION_MOISTURE_OVERSAMPLE or 16, self.config.ACQUISITION_MOISTURE_INTERVAL_MS or 1000)
+
     async def read_moisture(self):
-        with self.lock:
-            self.moisture_percent = self.calculate_moisture_lvl()
-            if self.moisture_percent is None:
-                self.log_mgr.log("Failed to read DFR moisture.")
-                if self.system_manager:
-                    self.system_manager.add_error("DFR moisture_read")
-                return
+        self.moisture_percent = self.calculate_moisture_lvl()
+        if self.moisture_percent is None:
+            self.log_mgr.log("Failed to read DFR moisture.")
+            if self.system_manager:
+                self.system_manager.add_error("DFR moisture_read")
+            return
                 
     def get_moisture_data(self):
         return {
             "moisture_percent": round(self.moisture_percent, 2) if self.moisture_percent is not None else None,
-            "moisture_raw": self.moisture_raw
+            "moisture_raw": self.moisture_raw,
+            "moisture_noise": round(self.moisture_noise, 1)
             }
\ No newline at end of file
@@ -1,39 +1,47 @@
 import utime
 import uasyncio
-from machine import Pin, ADC
-import _thread
-import gc
+from components.pump import Pump
+from managers import event_bus as events
+from managers.event_bus import event_bus
+from managers.adc_manager import adc_manager
 
 class M5WateringUnit:
     def __init__(self, config, system_manager, log_manager, data_manager, water_tank):
         self.system_manager = system_manager
         self.log_manager = log_manager
         self.data_manager = data_manager
-        self.system_manager = None
         self.config = config
         self.water_tank = water_tank
         
         # Initialize pins
-        self.moisture_sensor = ADC(config.M5_MOISTURE_SENSOR_PIN_NR)
-        self.water_pump = Pin(config.M5_WATER_PUMP_PIN_NR, Pin.OUT)
+        self.moisture_sensor = adc_manager.channel(config.M5_MOISTURE_SENSOR_PIN_NR, "m5_moisture", probe=True)
+        self.spike_window = config.ADC_SPIKE_WINDOW or 2
+        self.pump = Pump(config.M5_WATER_PUMP_PIN_NR, log_manager)
+        self.water_pump = self.pump.pin
         
         # Configuration values
         self.MOISTURE_SENSOR_DRY_VALUE = config.M5_MOISTURE_SENSOR_DRY_VALUE
         self.MOISTURE_SENSOR_WET_VALUE = config.M5_MOISTURE_SENSOR_WET_VALUE
         self.MOISTURE_THRESHOLD = config.MOISTURE_THRESHOLD
-        self.WATER_PUMP_FLOW_RATE = config.M5_WATER_PUMP_FLOW_RATE
+        self.WATER_PUMP_FLOW_RATE = config.M5_WATER_PUMP_FLOW_RATE or 600
         self.WATERING_DURATION = config.WATERING_DURATION
         
         # State variables
         self.raw_moisture_value = 0
+        self.raw_moisture_noise = 0
         self.current_moisture_percent = 0
         self.water_used = 0
         self.last_watered = 0
         self.is_watering = False
         self.watered_time = 0
         self.watering_block_timer = 0 
-        
-        self.lock = _thread.allocate_lock()
+        self.acquisition_mgr = None
+        self.last_dose_ml = 0
+        self.last_on_ms = 0
+        self.load_flow_curve()
+
+        event_bus.subscribe(events.CONFIG_CHANGED, self.on_config_changed)
+        event_bus.subscribe(events.CONTROL_COMMAND, self.on_control_command, deliver_async=True)
         
         self.log_manager.log("M5WateringUnit initialized.")
         
@@ -43,15 +51,26 @@ class M5WateringUnit:
 
     def set_system_manager(self, system_manager):
         self.system_manager = system_manager
+
+    def set_acquisition_manager(self, acquisition_mgr):
+        # Oversampled and spike-filtered on core 1, read_moisture then just picks up the latest value
+        self.acquisition_mgr = acquisition_mgr
+        acquisition_mgr.add_channel("m5_moisture", self.config.M5_MOISTURE_SENSOR_PIN_NR, acquisition_mgr.MODE_OVERSAMPLE,
+                                    self.config.ACQUISITION_MOISTURE_OVERSAMPLE or 16, self.config.ACQUISITION_MOISTURE_INTERVAL_MS or 1000)
         
     async def read_moisture(self):
         try:
-            self.raw_moisture_value = self.data_manager.filter_spike("m5_moisture_sensor" ,self.moisture_sensor.read_u16())
+            raw_value = self.acquisition_mgr.latest("m5_moisture") if self.acquisition_mgr else None
+            if raw_value is None:
+                raw_value = self.data_manager.filter_spike("m5_moisture_sensor", self.moisture_sensor.read(), self.spike_window)
+                self.raw_moisture_noise = self.moisture_sensor.noise
+            self.raw_moisture_value = raw_value
             
             # Calculate moisture percentage
             moisture_range = self.MOISTURE_SENSOR_DRY_VALUE - self.MOISTURE_SENSOR_WET_VALUE
             if moisture_range == 0:
                 self.log_manager.log("Error: M5 moisture sensor not properly calibrated")
+                self.current_moisture_percent = None
                 return None
 
             # Correct calculation: 100% when raw_value is at or below WET_VALUE, 0% when at or above DRY_VALUE
@@ -65,61 +84,125 @@ class M5WateringUnit:
             self.current_moisture_percent = max(0, min(100, moisture_percent))
         except Exception as e:
             self.log_manager.log(f"Error reading moisture: {e}")
+            self.current_moisture_percent = None  # Not stale data the watering controller would act on
+
+    def load_flow_curve(self):
+        # M5_WATER_PUMP_FLOW_CURVE: [[on_ms, ml], ...] measured at the pump, covering its priming;
+        # past the last point it delivers M5_WATER_PUMP_FLOW_RATE ml per minute
+        self.pump.set_flow(self.WATER_PUMP_FLOW_RATE, self.config.M5_WATER_PUMP_FLOW_CURVE,
+                           self.config.M5_WATER_PUMP_MAX_ON_TIME_MS)
+
+    def ml_for_on_time(self, on_ms):
+        return self.pump.ml_for_on_time(on_ms)
+
+    def on_time_for_ml(self, ml):
+        return self.pump.on_time_for_ml(ml)
+
+    async def dose(self, ml):
+        # Delivers `ml` using the flow curve; returns the ml the pump's actual on-time delivered
+        return await self.water_for(self.on_time_for_ml(ml), ml)
 
     async def control_pump(self, duration):
+        return await self.water_for(duration * 1000)
+
+    async def water_for(self, on_ms, requested_ml=None):
         current_time = utime.time()
         if current_time < self.watering_block_timer:
             self.log_manager.log(f"Watering blocked. Please wait {self.watering_block_timer - current_time} seconds.")
-            return
+            return None
+        if on_ms <= 0:
+            return 0
 
         try:
             if self.system_manager:
                 self.system_manager.start_processing("watering")
             self.is_watering = True
-            self.water_pump.on()
-            
-            # Water in 5-second intervals
-            remaining_duration = duration
-            while remaining_duration > 0:
-                await uasyncio.sleep(min(5, remaining_duration))
-                remaining_duration -= 5
-                if self.system_manager:
-                    self.system_manager.feed_watchdog()  # Use SystemManager's method to feed the watchdog
-
-            self.water_pump.off()
-            self.watered_time += duration
-            water_used = (duration / 60) * self.WATER_PUMP_FLOW_RATE
+            on_time = await self.pump.run(on_ms)
+
+            # The tank is charged for what the pump actually ran, not for what was asked for
+            water_used = self.ml_for_on_time(on_time)
             self.water_tank.reduce_capacity(water_used)
             self.water_used += water_used
+            self.watered_time += on_time / 1000
+            self.last_dose_ml = water_used
+            self.last_on_ms = on_time
             self.last_watered = utime.time()
-            self.watering_block_timer = self.last_watered + duration  # Set the block timer
-            self.log_manager.log(f"Watered for {duration}s, used {water_used:.2f}ml")
-            if self.system_manager:
-                self.system_manager.stop_processing("watering")
+            self.watering_block_timer = self.last_watered + int(on_time / 1000)  # Set the block timer
+            if requested_ml is None:
+                self.log_manager.log(f"Watered for {on_time / 1000:.2f}s, used {water_used:.2f}ml")
+            else:
+                self.log_manager.log(f"Dosed {water_used:.2f}ml of {requested_ml:.2f}ml in {on_time / 1000:.2f}s")
+            return water_used
         except Exception as e:
             self.log_manager.log(f"Error controlling pump: {e}")
             if self.system_manager:
                 self.system_manager.add_error("watering")
             self.water_pump.off()  # Ensure pump is off in case of error
+            return None
         finally:
+            # Also on an error or a cancelled task, or the status would stay on PROCESSING for good
+            if self.system_manager:
+                self.system_manager.stop_processing("watering")
             self.is_watering = False
 
     
+    def on_config_changed(self, key):
+        if key == "MOISTURE_THRESHOLD":
+            self.MOISTURE_THRESHOLD = self.config.MOISTURE_THRESHOLD
+        elif key == "M5_MOISTURE_SENSOR_DRY_VALUE":
+            self.MOISTURE_SENSOR_DRY_VALUE = self.config.M5_MOISTURE_SENSOR_DRY_VALUE
+        elif key == "M5_MOISTURE_SENSOR_WET_VALUE":
+            self.MOISTURE_SENSOR_WET_VALUE = self.config.M5_MOISTURE_SENSOR_WET_VALUE
+        elif key == "WATERING_DURATION":
+            self.WATERING_DURATION = self.config.WATERING_DURATION
+        elif key.startswith("ADC_"):
+            self.spike_window = self.config.ADC_SPIKE_WINDOW or 2
+        elif key in ("M5_WATER_PUMP_FLOW_RATE", "M5_WATER_PUMP_FLOW_CURVE", "M5_WATER_PUMP_MAX_ON_TIME_MS"):
+            self.WATER_PUMP_FLOW_RATE = self.config.M5_WATER_PUMP_FLOW_RATE or 600
+            self.load_flow_curve()
+
+    async def on_control_command(self, command):
+        name, argument = command
+        if name == "watering":
+            if argument == "start":
+                self.log_manager.log("Triggering watering via MQTT control")
+                await self.trigger_watering()
+            elif argument.startswith("dose:"):
+                try:
+                    ml = float(argument[5:])
+                except ValueError:
+                    self.log_manager.log(f"Unknown control command: {argument}")
+                    return
+                if self.is_watering:
+                    self.log_manager.log("Watering already in progress. Please wait.")
+                    return
+                self.log_manager.log(f"Dosing {ml}ml via MQTT control")
+                await self.dose(ml)
+                self.cleanup()
+            else:
+                self.log_manager.log(f"Unknown control command: {argument}")
+        elif name == "reset-water-tank":
+            if argument == "reset":
+                self.log_manager.log("Resetting water tank level via MQTT control")
+                self.water_tank.reset_capacity()
+            else:
+                self.log_manager.log(f"Unknown control command: {argument}")
+
     def reset_water_used(self):
         self.water_used = 0
         self.log_manager.log("Watering Unit - water_used value reset")
         
 
     def get_current_data(self):
-        with self.lock:
-            return {
-                "raw_moisture_value": self.raw_moisture_value,
-                "moisture": round(self.current_moisture_percent, 2) if self.current_moisture_percent is not None else None,
-                "water_used": round(self.water_used, 2),
-                "water_left": round(self.water_tank.get_capacity(), 2),
-                "last_watered": self.last_watered,
-                "is_watering": self.is_watering
-            }
+        return {
+            "raw_moisture_value": self.raw_moisture_value,
+            "raw_moisture_noise": round(self.raw_moisture_noise, 1),
+            "moisture": round(self.current_moisture_percent, 2) if self.current_moisture_percent is not None else None,
+            "water_used": round(self.water_used, 2),
+            "water_left": round(self.water_tank.get_capacity(), 2),
+            "last_watered": self.last_watered,
+            "is_watering": self.is_watering
+        }
 
     async def trigger_watering(self):
         if not self.is_watering:
@@ -131,4 +214,5 @@ class M5WateringUnit:
 
     def cleanup(self):
         self.water_pump.off()
-        gc.collect()
\ No newline at end of file
+        if self.system_manager:
+            self.system_manager.memory_mgr.on_idle()
\ No newline at end of file
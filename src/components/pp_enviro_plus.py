@@ -1,14 +1,15 @@
-import asyncio
 import utime
 import uasyncio
-from machine import Pin, ADC
 from picographics import PicoGraphics, DISPLAY_ENVIRO_PLUS
 from pimoroni import RGBLED, Button
 from breakout_bme68x import BreakoutBME68X
 from pimoroni_i2c import PimoroniI2C
 from breakout_ltr559 import BreakoutLTR559
-from adcfft import ADCFFT
-import gc
+from managers.data_records import EnviroRecord
+from managers import event_bus as events
+from managers.event_bus import event_bus
+from managers.perf_manager import perf
+from managers.adc_manager import adc_manager
 
 class PicoEnviroPlus:
     def __init__(self, config, log_manager, data_mgr):
@@ -17,6 +18,10 @@ class PicoEnviroPlus:
         self.data_mgr = data_mgr
         self.system_manager = None
         self.display_manager = None
+        self.acquisition_mgr = None
+        self.sensor_recorder = None  # Set by EnviroPi when a capture is first requested
+        self.heap_profiler = None  # Likewise, once heap profiling is switched on
+        self.adcfft = None
 
         # Initialize display
         self.display = PicoGraphics(display=DISPLAY_ENVIRO_PLUS, rotate=90)
@@ -30,6 +35,7 @@ class PicoEnviroPlus:
             'X': Button(14, invert=True),
             'Y': Button(15, invert=True)
         }
+        event_bus.subscribe(events.BUTTON_PRESSED, self.on_button_pressed, deliver_async=True)
 
         # Display settings
         self.display_backlight_on = True
@@ -39,7 +45,7 @@ class PicoEnviroPlus:
 
         # Sensor data
         self.last_sensor_read = 0
-        self.sensor_data = {}
+        self.sensor_data = EnviroRecord()
 
         # Temperature edge values
         self.min_temperature = float('inf')
@@ -57,13 +63,18 @@ class PicoEnviroPlus:
     def set_system_manager(self, system_manager):
         self.system_manager = system_manager
 
+    def set_acquisition_manager(self, acquisition_mgr):
+        # Block-sample the microphone on core 1 instead of taking one read per second
+        self.acquisition_mgr = acquisition_mgr
+        acquisition_mgr.add_channel("mic", self.config.ENVIRO_PLUS_MICROPHONE_PIN, acquisition_mgr.MODE_BLOCK,
+                                    self.config.ACQUISITION_MIC_BLOCK_SIZE or 64, self.config.ACQUISITION_MIC_INTERVAL_MS or 100)
+
     def init_sensors(self):
         try:
             i2c = PimoroniI2C(sda=4, scl=5)
             self.bme = BreakoutBME68X(i2c, address=0x77)
             self.ltr559 = BreakoutLTR559(i2c)
-            self.adcfft = ADCFFT()
-            self.mic = ADC(Pin(self.config.ENVIRO_PLUS_MICROPHONE_PIN))
+            self.mic = adc_manager.channel(self.config.ENVIRO_PLUS_MICROPHONE_PIN, "mic")
             self.log_manager.log("PicoEnviroPlus sensors initialized.")
         except Exception as e:
             self.log_manager.log(f"Error initializing PicoEnviroPlus sensors: {e}")
@@ -72,46 +83,65 @@ class PicoEnviroPlus:
         try:
             bme_data = self.bme.read()
             ltr559_data = self.ltr559.get_reading()
-            mic_reading = self.mic.read_u16()
-
-            temperature = bme_data[0]
-            pressure = bme_data[1]
-            humidity = bme_data[2]
-            gas = bme_data[3]
-            enviro_plus_lux = ltr559_data[BreakoutLTR559.LUX] if ltr559_data else 0
-            
-            corrected_temperature = self.data_mgr.correct_temperature_reading(temperature)
-            self.set_temperature_edge_values(corrected_temperature)
-            corrected_humidity = self.data_mgr.correct_humidity_reading(humidity, temperature, corrected_temperature)
-            adjusted_pressure = self.data_mgr.adjust_to_sea_pressure(pressure, corrected_temperature, self.config.ALTITUDE)
-            adjusted_enviro_plus_lux = self.data_mgr.adjust_lux_for_growhouse(enviro_plus_lux)
-            
-            gas_quality = self.data_mgr.interpret_gas_reading(gas)
-            mic_db = self.data_mgr.interpret_mic_reading(mic_reading)
-
-            # env_status, issues, light_status = self.data_mgr.describe_growhouse_environment(
-            #     corrected_temperature, corrected_humidity, adjusted_enviro_plus_lux)
-            self.sensor_data = {
-                "temperature": corrected_temperature,
-                "humidity": corrected_humidity,
-                "pressure": adjusted_pressure,
-                "gas": gas,
-                "gas_quality": gas_quality,
-                "lux": adjusted_enviro_plus_lux,
-                # "light_status": light_status,
-                "mic": mic_db,
-                "status": bme_data[4]
-                # "env_status": env_status,
-                # "env_issues": issues
-            }
+            lux = ltr559_data[BreakoutLTR559.LUX] if ltr559_data else None
+            mic_reading = self.acquisition_mgr.latest("mic") if self.acquisition_mgr else None
+            mic_filtered = mic_reading is not None
+            if mic_reading is None:
+                mic_reading = self.mic.read_u16()
+            recorder = self.sensor_recorder
+            if recorder and recorder.active:
+                recorder.record(bme_data, lux, mic_reading, mic_filtered)
+            record = self.process_reading(bme_data, lux, mic_reading, mic_filtered)
             self.last_sensor_read = utime.ticks_ms()
-            return self.sensor_data
+            return record
         except Exception as e:
             self.log_manager.log(f"Error reading PicoEnviroPlus sensors: {e}")
             if self.system_manager:
                 self.system_manager.add_error("sensor_read")
             return None
 
+    def process_reading(self, bme_data, lux, mic_reading, mic_filtered, data_mgr=None, record=None):
+        # Raw driver values to a corrected record. SensorReplay passes its own DataManager and record,
+        # so a replay leaves the live filters, min/max values and latest reading alone.
+        live = record is None
+        data_mgr = data_mgr or self.data_mgr
+        temperature = bme_data[0]
+        pressure = bme_data[1]
+        humidity = bme_data[2]
+        gas = bme_data[3]
+        enviro_plus_lux = lux if lux is not None else 0
+
+        with self.heap_profiler.stage("corrections") if self.heap_profiler and live else perf.null_span:
+            corrected_temperature = data_mgr.correct_temperature_reading(temperature)
+            if live:
+                self.set_temperature_edge_values(corrected_temperature)
+            corrected_humidity = data_mgr.correct_humidity_reading(humidity, temperature, corrected_temperature)
+            adjusted_pressure = data_mgr.adjust_to_sea_pressure(pressure, corrected_temperature, self.config.ALTITUDE)
+            adjusted_enviro_plus_lux = data_mgr.adjust_lux_for_growhouse(enviro_plus_lux)
+
+            gas_quality = data_mgr.interpret_gas_reading(gas)
+            mic_db = data_mgr.interpret_mic_reading(mic_reading, mic_filtered)
+
+        # env_status, issues, light_status = data_mgr.describe_growhouse_environment(
+        #     corrected_temperature, corrected_humidity, adjusted_enviro_plus_lux)
+        if live:
+            record = self.sensor_data
+        record.temperature = corrected_temperature
+        record.humidity = corrected_humidity
+        record.pressure = adjusted_pressure
+        record.gas = gas
+        record.gas_quality = gas_quality
+        record.lux = adjusted_enviro_plus_lux
+        record.mic = mic_db
+        record.status = bme_data[4]
+        return record
+
+    def get_adcfft(self):
+        if self.adcfft is None:
+            from adcfft import ADCFFT
+            self.adcfft = ADCFFT()
+        return self.adcfft
+
     def get_sensor_data(self):
         if utime.ticks_diff(utime.ticks_ms(), self.last_sensor_read) > 1000:
             return self.read_sensors()
@@ -125,6 +155,7 @@ class PicoEnviroPlus:
             self.display_mode = mode
             self.current_mode_index = self.display_modes.index(mode)
             self.log_manager.log(f"Display mode set to {mode}")
+            event_bus.publish(events.DISPLAY_MODE_CHANGED, mode)
         else:
             self.log_manager.log(f"Invalid display mode: {mode}")
 
@@ -132,6 +163,7 @@ class PicoEnviroPlus:
         self.current_mode_index = (self.current_mode_index + 1) % len(self.display_modes)
         self.display_mode = self.display_modes[self.current_mode_index]
         self.log_manager.log(f"Switched to {self.display_mode} mode")
+        event_bus.publish(events.DISPLAY_MODE_CHANGED, self.display_mode)
 
     def toggle_backlight(self):
         self.display_backlight_on = not self.display_backlight_on
@@ -171,8 +203,13 @@ class PicoEnviroPlus:
     def check_buttons(self):
         for button, obj in self.buttons.items():
             if obj.read():
-                uasyncio.create_task(self.handle_button_press(button))
-                utime.sleep_ms(200)  # Debounce
+                event_bus.publish(events.BUTTON_PRESSED, button)
+                with perf.span("button_debounce"):
+                    utime.sleep_ms(200)  # Debounce, blocks the whole loop
+
+    async def on_button_pressed(self, button):
+        if button in self.buttons:
+            await self.handle_button_press(button)
 
 
     def set_led(self, r, g, b):
@@ -192,9 +229,5 @@ class PicoEnviroPlus:
     def cleanup(self):
         self.display.set_backlight(0)
         self.set_led(0, 0, 0)
-        gc.collect()
-
-    async def run(self):
-        while True:
-            self.check_buttons()
-            await uasyncio.sleep_ms(100)
\ No newline at end of file
+        if self.system_manager:
+            self.system_manager.memory_mgr.on_idle()
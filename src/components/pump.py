@@ -0,0 +1,82 @@
+import utime
+import uasyncio
+from machine import Pin, Timer
+
+
+class Pump:
+    # A pump on a GPIO, switched off by a one-shot timer so event-loop lag can't stretch a run.
+    # flow_curve: [[on_ms, ml], ...] measured at the pump, the ml ascending. The pump takes a
+    # moment to prime, so short runs deliver less than the nominal rate; past the last point it
+    # delivers flow_rate ml per minute. Flat segments are fine: the priming dead time is ml
+    # staying at 0 while on_ms rises.
+    def __init__(self, pin_nr, log_mgr, flow_rate=600, flow_curve=None, max_on_ms=30000):
+        self.log_mgr = log_mgr
+        self.pin = Pin(pin_nr, Pin.OUT)
+        self.pin.off()
+        self.set_flow(flow_rate, flow_curve, max_on_ms)
+
+        # Pump-off comes from a hard timer IRQ, so neither event-loop lag nor a collection can delay
+        # it; the bound method is created here, the IRQ can't allocate
+        self.timer = Timer()
+        self.done = uasyncio.ThreadSafeFlag()
+        self.off_callback = self.on_timer
+
+    def set_flow(self, flow_rate=600, flow_curve=None, max_on_ms=30000):
+        self.flow_rate = flow_rate or 600
+        self.flow_curve = [(int(on_ms), float(ml)) for on_ms, ml in flow_curve or [[0, 0]]]
+        self.max_on_ms = max_on_ms or 30000
+
+    def ml_for_on_time(self, on_ms):
+        curve = self.flow_curve
+        for index in range(1, len(curve)):
+            t1, ml1 = curve[index]
+            if on_ms <= t1:
+                t0, ml0 = curve[index - 1]
+                if t1 == t0:
+                    return ml1
+                return ml0 + (ml1 - ml0) * (on_ms - t0) / (t1 - t0)
+        t_last, ml_last = curve[-1]
+        return ml_last + (on_ms - t_last) * self.flow_rate / 60000
+
+    def on_time_for_ml(self, ml):
+        curve = self.flow_curve
+        for index in range(1, len(curve)):
+            t1, ml1 = curve[index]
+            t0, ml0 = curve[index - 1]
+            if ml1 == ml0:
+                continue  # Nothing delivered over this segment, the dose needs at least its end
+            if ml <= ml1:
+                return int(t0 + (t1 - t0) * (ml - ml0) / (ml1 - ml0))
+        t_last, ml_last = curve[-1]
+        return int(t_last + (ml - ml_last) * 60000 / self.flow_rate)
+
+    def on_timer(self, timer):
+        # Hard IRQ: stop the pump and wake run(), nothing more
+        self.pin.off()
+        self.done.set()
+
+    async def run(self, on_ms):
+        # Returns the on-time in ms: on_ms when the timer stopped the pump, as measured otherwise
+        if on_ms > self.max_on_ms:
+            self.log_mgr.log(f"Pump run of {on_ms}ms capped at {self.max_on_ms}ms")
+            on_ms = self.max_on_ms
+        on_ms = int(on_ms)
+        if on_ms <= 0:
+            return 0
+        self.done.clear()
+        self.pin.on()
+        on_us = utime.ticks_us()
+        self.timer.init(mode=Timer.ONE_SHOT, period=on_ms, callback=self.off_callback, hard=True)
+        try:
+            await uasyncio.wait_for_ms(self.done.wait(), on_ms + 1000)
+            return on_ms
+        except uasyncio.TimeoutError:
+            self.pin.off()
+            self.log_mgr.log("Pump timer didn't fire, pump stopped by the watering task")
+            return utime.ticks_diff(utime.ticks_us(), on_us) / 1000
+        finally:
+            self.pin.off()  # Also when the task is cancelled mid-run
+            self.timer.deinit()
+
+    def off(self):
+        self.pin.off()
@@ -0,0 +1,88 @@
+from components.pump import Pump
+from managers.adc_manager import adc_manager
+from managers.data_records import ZoneRecord
+from managers.watering_controller import DrySpell
+
+
+class WateringZone:
+    # One pot of a rack: a moisture probe and a pump. Settings come from its WATERING_ZONES entry,
+    # anything it leaves out falls back to the global watering keys.
+    def __init__(self, index, settings, config, log_mgr):
+        self.index = index
+        self.name = settings.get("name") or f"zone{index}"
+        self.log_mgr = log_mgr
+        # Zones behind one multiplexer all read the same channel
+        self.sensor = adc_manager.channel(settings["sensor_pin"], "zones", probe=True)
+        # With an analog multiplexer in front of the ADC pin, the select lines pick this channel
+        self.mux_channel = settings.get("mux_channel")
+        self.pump = Pump(settings["pump_pin"], log_mgr)
+        self.spell = DrySpell()
+        self.record = ZoneRecord(self.name)
+        self.status_topic = f"zones/{index}/status"
+        self.decision_topic = f"zones/{index}/decision"
+
+        self.raw = 0
+        self.noise = 0
+        self.moisture = None
+        self.state = ""
+        self.action = ""
+        self.reason = ""
+        self.water_used = 0
+        self.last_watered = 0
+        self.is_watering = False
+        self.queued = False
+        self.configure(settings, config)
+
+    def configure(self, settings, config):
+        get = settings.get
+        self.dry_value = get("dry", config.M5_MOISTURE_SENSOR_DRY_VALUE or 30000)
+        self.wet_value = get("wet", config.M5_MOISTURE_SENSOR_WET_VALUE or 17000)
+        self.spell.configure(get("threshold", config.MOISTURE_THRESHOLD or 40),
+                             get("hysteresis", config.MOISTURE_HYSTERESIS or 10),
+                             get("pause", config.WATERING_PAUSE_DURATION or 3600),
+                             get("max_cycles", config.WATERING_MAX_CYCLES or 1),
+                             get("cycle_window", config.WATERING_CYCLE_WINDOW or 86400))
+        self.pump.set_flow(get("flow_rate", config.M5_WATER_PUMP_FLOW_RATE),
+                           get("flow_curve", config.M5_WATER_PUMP_FLOW_CURVE),
+                           config.M5_WATER_PUMP_MAX_ON_TIME_MS)
+        # Worked out here rather than per decision: the pump's on-time and what it delivers
+        dose_ml = get("dose_ml", config.WATERING_DOSE_ML)
+        if dose_ml:
+            self.on_ms = self.pump.on_time_for_ml(dose_ml)
+        else:
+            self.on_ms = (get("duration", config.WATERING_DURATION) or 5) * 1000
+        self.dose_ml = self.pump.ml_for_on_time(self.on_ms)
+
+    def read(self):
+        raw = self.sensor.read()
+        self.raw = int(raw)
+        self.noise = self.sensor.noise
+        moisture_range = self.dry_value - self.wet_value
+        if moisture_range == 0:
+            self.moisture = None
+        elif raw <= self.wet_value:
+            self.moisture = 100.0
+        elif raw >= self.dry_value:
+            self.moisture = 0.0
+        else:
+            self.moisture = (self.dry_value - raw) / moisture_range * 100
+
+    def deficit(self):
+        # How far below its own threshold the zone is; the pump queue serves the largest first
+        if self.moisture is None:
+            return 0
+        return self.spell.threshold - self.moisture
+
+    def get_record(self):
+        record = self.record
+        record.moisture = round(self.moisture, 2) if self.moisture is not None else None
+        record.raw = self.raw
+        record.noise = round(self.noise, 1)
+        record.state = self.state
+        record.reason = self.reason
+        record.cycles = self.spell.cycles
+        record.water_used = round(self.water_used, 2)
+        record.last_watered = self.last_watered
+        record.is_watering = self.is_watering
+        record.queued = self.queued
+        return record
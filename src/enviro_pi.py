@@ -1,96 +1,302 @@
-import sys
+import json
 import uasyncio
-import machine
-import gc
 import micropython
-import utime
+import gc
 from breakout_bme68x import STATUS_HEATER_STABLE
 
 from managers.config_manager import ConfigManager
 from managers.wifi_manager import WiFiManager
-from managers.mqtt_manager import MQTTManager
 from managers.data_manager import DataManager
 from managers.system_manager import SystemManager
 from managers.log_manager import LogManager
+from managers.startup_manager import StartupManager
+from managers.job_scheduler import JobScheduler
+from managers import event_bus as events
+from managers.event_bus import event_bus
+from managers.perf_manager import perf
+from managers.adc_manager import adc_manager
 from managers.pp_enviro_plus_display_mgr import PicoEnviroPlusDisplayMgr
-from managers.influx_data_manager import InfluxDataManager
 from components.pp_enviro_plus import PicoEnviroPlus
 from components.momentary_button import MomentaryButton 
 
 class EnviroPi:
-    def __init__(self):
+    def __init__(self, boot_profiler=None):
         micropython.alloc_emergency_exception_buf(100)
         
+        self.boot_profiler = boot_profiler
         self.log_mgr = LogManager()
+        self.startup_mgr = StartupManager(self.log_mgr)
+        event_bus.set_log_manager(self.log_mgr)
+        self.scheduler = JobScheduler(self.log_mgr)
         self.config_mgr = ConfigManager(self.log_mgr)
+        perf.configure(self.config_mgr)
+        adc_manager.configure(self.config_mgr, self.log_mgr)
+        # Diagnostics are imported when first asked for (get_tracer and friends), not on every boot
+        self.tracer = None
+        self.sensor_recorder = None
+        self.heap_profiler = None
+        self.flash_log_mgr = None
+        if self.config_mgr.FLASH_LOG_ENABLED:
+            from managers.flash_log_manager import FlashLogManager
+            self.flash_log_mgr = FlashLogManager(self.config_mgr)
+            self.log_mgr.set_flash_sink(self.flash_log_mgr)
         self.system_mgr = SystemManager(self.config_mgr, self.log_mgr, None)
         self.data_mgr = DataManager(self.config_mgr, self.log_mgr, self.system_mgr)
         self.system_mgr.data_mgr = self.data_mgr
         self.wifi_mgr = WiFiManager(self.config_mgr, self.log_mgr)
-        self.mqtt_mgr = MQTTManager(self.config_mgr, self.log_mgr)
-        self.influx_data_manager = InfluxDataManager(self.config_mgr, self.log_mgr)
+        self.mqtt_mgr = None
+        if self.config_mgr.MQTT_ENABLED is not False:
+            from managers.mqtt_manager import MQTTManager
+            self.mqtt_mgr = MQTTManager(self.config_mgr, self.log_mgr)
+        self.influx_data_manager = None
+        self.power_mgr = None
+        if self.mqtt_mgr:
+            from managers.power_manager import PowerManager
+            self.power_mgr = PowerManager(self.config_mgr, self.log_mgr, self.wifi_mgr, self.mqtt_mgr)
+        self.low_power_mgr = None
+        if self.config_mgr.LOW_POWER_MODE:
+            from managers.low_power_manager import LowPowerManager
+            self.low_power_mgr = LowPowerManager(self.config_mgr, self.log_mgr, self.system_mgr)
+            # lightsleep only runs with the radio down, which only the duty cycle does between windows
+            if self.power_mgr and self.power_mgr.mode != "duty_cycle":
+                self.log_mgr.log(f"LOW_POWER_MODE needs the radio off between windows, POWER_MODE {self.power_mgr.mode} switched to duty_cycle")
+                self.power_mgr.mode = "duty_cycle"
+        self.acquisition_mgr = None
+        if self.config_mgr.ACQUISITION_ENABLED and self.low_power_mgr is None:
+            # A busy core 1 would keep lightsleep from ever saving anything, so the two are exclusive
+            from managers.acquisition_manager import AcquisitionManager
+            self.acquisition_mgr = AcquisitionManager(self.config_mgr, self.log_mgr)
 
         self.enviro_plus = PicoEnviroPlus(self.config_mgr, self.log_mgr, self.data_mgr)
         self.enviro_plus_led = self.enviro_plus.get_led()
         self.external_button = MomentaryButton(self.config_mgr.MOMENTARY_BUTTON_PIN, sample_size=10, threshold=8)
 
+        self.water_tank = None
+        self.m5_watering_unit = None
+        self.dfr_moisture_sensor = None
+        self.watering_controller = None
+        self.zone_scheduler = None
+        if self.config_mgr.WATERING_ENABLED:
+            self._setup_watering()
+
         self.system_mgr.set_led(self.enviro_plus_led)
         self.enviro_plus_display_mgr = PicoEnviroPlusDisplayMgr(self.config_mgr, self.enviro_plus, self.log_mgr, self.data_mgr, self.system_mgr)
         self.enviro_plus.set_display_manager(self.enviro_plus_display_mgr)
+        if self.config_mgr.HEAP_PROFILE_ENABLED:
+            self.get_heap_profiler()
+
+        self.history_store = None
+        self.http_server = None
+        if self.config_mgr.HTTP_SERVER_ENABLED:
+            from managers.history_store import HistoryStore
+            from managers.http_server import HTTPServer
+            self.history_store = HistoryStore(self.config_mgr, self.log_mgr)
+            self.http_server = HTTPServer(self.config_mgr, self.log_mgr, self, self.history_store)
 
         self._setup_managers()
         self._initialize_state()
+        self.startup_mgr.mark("constructed")
+
+    def _setup_watering(self):
+        from components.water_tank import WaterTank
+        self.water_tank = WaterTank(self.config_mgr.WATER_TANK_FULL_CAPACITY or 1400, self.log_mgr)
+        if self.config_mgr.WATERING_ZONES:
+            # A rack of sensor/pump pairs replaces the single M5 unit and its DFRobot probe
+            from managers.zone_scheduler import ZoneScheduler
+            self.zone_scheduler = ZoneScheduler(self.config_mgr, self.log_mgr, self.water_tank, self.mqtt_mgr, self.system_mgr)
+            return
+        from components.m5_watering_unit import M5WateringUnit
+        from managers.watering_controller import WateringController
+        self.m5_watering_unit = M5WateringUnit(self.config_mgr, self.system_mgr, self.log_mgr, self.data_mgr, self.water_tank)
+        if self.config_mgr.DFR_MOISTURE_SENSOR_PIN is not None:
+            from components.dfr_moisture_sensor import DFRobotMoistureSensor
+            self.dfr_moisture_sensor = DFRobotMoistureSensor(self.config_mgr, self.log_mgr, self.data_mgr)
+            self.dfr_moisture_sensor.system_manager = self.system_mgr
+        self.watering_controller = WateringController(self.config_mgr, self.log_mgr, self.m5_watering_unit,
+                                                      self.dfr_moisture_sensor, self.mqtt_mgr)
 
     def _setup_managers(self):
         self.wifi_mgr.set_system_manager(self.system_mgr)
-        self.mqtt_mgr.set_system_manager(self.system_mgr)
+        self.data_mgr.set_wifi_manager(self.wifi_mgr)
+        if self.mqtt_mgr:
+            self.mqtt_mgr.set_system_manager(self.system_mgr)
+            self.mqtt_mgr.set_wifi_manager(self.wifi_mgr)
         self.enviro_plus.set_system_manager(self.system_mgr)
+        self.system_mgr.set_scheduler(self.scheduler)
+        if self.acquisition_mgr:
+            self.enviro_plus.set_acquisition_manager(self.acquisition_mgr)
+            self.system_mgr.set_acquisition_manager(self.acquisition_mgr)
+            if self.m5_watering_unit:
+                self.m5_watering_unit.set_acquisition_manager(self.acquisition_mgr)
+            if self.dfr_moisture_sensor:
+                self.dfr_moisture_sensor.set_acquisition_manager(self.acquisition_mgr)
+
+        event_bus.subscribe(events.SENSOR_SAMPLE, self.on_sensor_sample)
+        event_bus.subscribe(events.DISPLAY_MODE_CHANGED, self.on_display_mode_change)
+        # Async so a failing publish (which raises an error status itself) can't re-enter update_status
+        event_bus.subscribe(events.STATUS_CHANGED, self.on_status_change, deliver_async=True)
+        event_bus.subscribe(events.BUTTON_PRESSED, self.on_button_pressed, deliver_async=True)
+        event_bus.subscribe(events.CONTROL_COMMAND, self.on_control_command, deliver_async=True)
+
+    def get_influx_data_manager(self):
+        # Only needed for the occasional state query, so keep it (and urequests) out of the boot path
+        if self.influx_data_manager is None:
+            from managers.influx_data_manager import InfluxDataManager
+            self.influx_data_manager = InfluxDataManager(self.config_mgr, self.log_mgr)
+            self.influx_data_manager.set_wifi_manager(self.wifi_mgr)
+        return self.influx_data_manager
+
+    def get_tracer(self):
+        if self.tracer is None:
+            from managers.trace_recorder import tracer
+            tracer.configure(self.config_mgr, self.log_mgr)
+            self.scheduler.set_tracer(tracer)
+            perf.set_tracer(tracer)
+            self.tracer = tracer
+        return self.tracer
+
+    def get_sensor_recorder(self):
+        if self.sensor_recorder is None:
+            from managers.sensor_recorder import sensor_recorder
+            sensor_recorder.configure(self.config_mgr, self.log_mgr)
+            self.enviro_plus.sensor_recorder = sensor_recorder
+            self.sensor_recorder = sensor_recorder
+        return self.sensor_recorder
+
+    def get_heap_profiler(self):
+        if self.heap_profiler is None:
+            from managers.heap_profiler import heap_profiler
+            heap_profiler.configure(self.config_mgr)
+            self.enviro_plus.heap_profiler = heap_profiler
+            self.heap_profiler = heap_profiler
+        return self.heap_profiler
+
+    def heap_stage(self, name, awaits=False):
+        # Costs one attribute check while the profiler was never switched on
+        if self.heap_profiler is None:
+            return perf.null_span
+        return self.heap_profiler.stage(name, awaits)
 
     def _initialize_state(self):
         self.current_status = "running"
-        self.last_mqtt_publish = 0
-        self.external_button_pressed = False
+        self.latest_sensor_data = None
+        self.boot_report = None
+        self.system_task = None
+        self.local_ready_heap_free = 0
+        self.external_button_down = False
+        self.replay_task = None
 
     async def run(self):
         await self.startup()
-        await self.main_loop()
+        self._setup_jobs()
+        if self.low_power_mgr:
+            self._setup_low_power()
+        # From here the scheduler feeds the watchdog after each pass of its loop, so a job that blocks
+        # the loop (or a coroutine job stuck past JOB_HANG_TIMEOUT) lets the board reset
+        self.scheduler.set_watchdog(self.system_mgr.feed_watchdog, (self.config_mgr.JOB_HANG_TIMEOUT or 300) * 1000)
+        if self.system_task:
+            self.system_task.cancel()
+            self.system_task = None
+        await self.scheduler.run()
 
     async def startup(self):
         self.log_mgr.enable_buffering()
         self.log_mgr.log("Starting PicoW-Growmat startup sequence...")
+        uasyncio.create_task(event_bus.run())
         self.enviro_plus.set_display_mode("Log")
 
-        await self._initialize_connections()
-        await self._setup_components()
+        # The watchdog is armed in the SystemManager constructor, keep feeding it while phases run
+        self.system_task = uasyncio.create_task(self.system_mgr.run())
+
+        self.startup_mgr.add_phase("display", self._setup_components)
+        self.startup_mgr.add_phase("sensors", self._warm_up_sensors, timeout=self.config_mgr.STARTUP_SENSOR_WARMUP_TIMEOUT or 60)
+        self.startup_mgr.add_phase("wifi", self._connect_wifi, timeout=30)
+        self.startup_mgr.add_phase("ntp", self._sync_time, depends_on=("wifi",))
+        self.startup_mgr.add_phase("mqtt", self._start_mqtt, depends_on=("wifi",), timeout=15)
+        self.startup_mgr.start()
+
+        # The device is usable locally as soon as the display is up; network phases continue in the background
+        await self.startup_mgr.wait_for("display")
         await self._start_tasks()
 
         self.enviro_plus.set_display_mode(self.config_mgr.DEFAULT_DISPLAY_MODE)
-        self.log_mgr.log("Startup sequence completed")
+        self.startup_mgr.mark("local_ready")
+        self.local_ready_heap_free = gc.mem_free()
+        self.log_mgr.log("Startup sequence completed, network setup continues in background")
+        uasyncio.create_task(self._publish_boot_report())
+
+    async def _setup_components(self):
+        self.enviro_plus_display_mgr.setup_display(self.config_mgr)
+        self.startup_mgr.mark("first_frame")
+
+    async def _warm_up_sensors(self):
+        # Wait for the BME688 gas heater to stabilise so the first publish carries valid data
+        while True:
+            sensor_data = self.enviro_plus.get_sensor_data()
+            if sensor_data and sensor_data.get('status', 0) & STATUS_HEATER_STABLE:
+                return True
+            await uasyncio.sleep(1)
 
-    async def _initialize_connections(self):
-        self.log_mgr.log("Initializing connections...")
+    async def _connect_wifi(self):
         try:
-            await uasyncio.wait_for(self.wifi_mgr.connect(), 30)
-        except uasyncio.TimeoutError:
-            self.log_mgr.log("WiFi connection timed out")
+            await self.wifi_mgr.connect()
+        finally:
+            # Whatever the first attempt did, the supervisor keeps the link up from here on
+            uasyncio.create_task(self.wifi_mgr.supervise())
 
-        if self.system_mgr.sync_time():
+    async def _sync_time(self):
+        uasyncio.create_task(self.system_mgr.ntp_mgr.run())
+        if not self.wifi_mgr.is_connected():
+            return False
+        if await self.system_mgr.sync_time():
             self.log_mgr.log("Time synchronized successfully")
-        else:
-            self.log_mgr.log("Failed to synchronize time")
+            return True
+        self.log_mgr.log("Failed to synchronize time")
+        return False
 
-    async def _setup_components(self):
-        self.enviro_plus.on_display_mode_change = self.on_display_mode_change
-        self.enviro_plus_display_mgr.setup_display(self.config_mgr)
+    async def _start_mqtt(self):
+        if self.mqtt_mgr is None:
+            return False
+        uasyncio.create_task(self.mqtt_mgr.run())
+        if not self.wifi_mgr.is_connected():
+            return False
+        while not self.mqtt_mgr.is_connected:
+            await uasyncio.sleep_ms(100)
+        return True
+
+    async def _publish_boot_report(self):
+        await self.startup_mgr.wait_all()
+        self.boot_report = self.startup_mgr.get_boot_report()
+        self.boot_report["heap_free_local_ready"] = self.local_ready_heap_free
+        self.boot_report["heap_free"] = gc.mem_free()
+        if self.boot_profiler:
+            self.boot_profiler.uninstall()
+            import_ms, import_bytes = self.boot_profiler.get_totals()
+            self.boot_report["import_ms"] = import_ms
+            self.boot_report["import_bytes"] = import_bytes
+            self.boot_report["imports"] = self.boot_profiler.get_report()
+        self.log_mgr.log(f"Boot completed in {self.boot_report['startup_complete']}ms, first frame after {self.boot_report.get('first_frame')}ms")
+        if self.mqtt_mgr is None:
+            return
+        while not self.mqtt_mgr.publish_message("system/boot", json.dumps(self.boot_report).encode()):
+            await uasyncio.sleep(5)
 
     async def _start_tasks(self):
-        uasyncio.create_task(self.mqtt_mgr.run())
-        uasyncio.create_task(self.system_mgr.run())
-        uasyncio.create_task(self.enviro_plus.run())
-        uasyncio.create_task(self.check_external_button())
+        if self.power_mgr:
+            self.power_mgr.setup()
+            uasyncio.create_task(self.power_mgr.run())
+        if self.acquisition_mgr:
+            self.acquisition_mgr.start()
+        if self.http_server:
+            try:
+                await self.http_server.start()
+            except Exception as e:
+                self.log_mgr.log(f"Error starting HTTP server: {e}")
+        if perf.enabled:
+            uasyncio.create_task(perf.run_heartbeat())
 
         # try:
-        #     water_tank_level, last_watered = await uasyncio.wait_for(self.influx_data_manager.query_task(), 10)
+        #     water_tank_level, last_watered = await uasyncio.wait_for(self.get_influx_data_manager().query_task(), 10)
         #     if water_tank_level is not None:
         #         self.water_tank.set_capacity(water_tank_level)
         #     if last_watered is not None:
@@ -98,52 +304,248 @@ class EnviroPi:
         # except uasyncio.TimeoutError:
         #     self.log_mgr.log("InfluxDB query timed out")
 
-    async def main_loop(self):
-        while True:
-            try:
-                gc.collect()
-                self.system_mgr.update_system_data()
-                
-                await self.handle_external_button()
-                await self.process_sensor_data()
-                
-                self.enviro_plus.check_buttons()
-                await uasyncio.sleep(1)
+    def _setup_jobs(self):
+        # When several jobs are due at once the one with the highest priority runs first
+        scheduler = self.scheduler
+        if self.low_power_mgr:
+            # Keep wake-ups to one per sample; lightsleep is capped well below the 8 s watchdog
+            sample_period = (self.config_mgr.LOW_POWER_SAMPLE_INTERVAL or 10) * 1000
+        else:
+            sample_period = 1000
+            # In low-power mode buttons wake the device via IRQ instead of being polled
+            scheduler.add_job("buttons", 100, self.buttons_job, priority=8)
+        scheduler.add_job("sample", sample_period, self.sample_job, priority=7)
+        if self.mqtt_mgr:
+            publish_period = (self.config_mgr.MQTT_UPDATE_INTERVAL or 60) * 1000
+            scheduler.add_job("publish", publish_period, self.publish_job, deadline_ms=5000, priority=5, retry_ms=5000)
+        scheduler.add_job("render", sample_period, self.render_job, priority=4, skippable=True)
+        # In low-power mode the scan rides the sample wake-up instead of adding its own
+        scan_period = sample_period if self.low_power_mgr else adc_manager.scan_interval_ms
+        scheduler.add_job("adc_scan", scan_period, adc_manager.scan, priority=3)
+        scheduler.add_job("system", sample_period, self.system_stats_job, priority=3)
+        if self.flash_log_mgr:
+            scheduler.add_job("flash_log", sample_period, self.flash_log_mgr.flush_job, priority=1)
+        if self.watering_controller:
+            # Readings first, so every decision sees fresh moisture values
+            scheduler.add_job("moisture", (self.config_mgr.MOISTURE_CHECK_INTERVAL or 300) * 1000,
+                              self.watering_controller.read_sensors, priority=2)
+            scheduler.add_job("watering", (self.config_mgr.WATERING_CHECK_INTERVAL or 900) * 1000,
+                              self.watering_controller.decide, priority=1)
+        elif self.zone_scheduler:
+            # Two jobs however many zones there are
+            scheduler.add_job("moisture", (self.config_mgr.MOISTURE_CHECK_INTERVAL or 300) * 1000,
+                              self.zone_scheduler.read_sensors, priority=2)
+            scheduler.add_job("watering", (self.config_mgr.WATERING_CHECK_INTERVAL or 900) * 1000,
+                              self.zone_scheduler.decide, priority=1)
+        weather_period = (self.config_mgr.WEATHER_UPDATE_INTERVAL_IN_MINUTES or 10) * 60000
+        scheduler.add_job("weather", weather_period, self.enviro_plus_display_mgr.refresh_weather_data, deadline_ms=30000, priority=1)
+        if perf.enabled and self.mqtt_mgr:
+            scheduler.add_job("perf", perf.publish_interval * 1000, self.perf_job, priority=2)
+        if self.mqtt_mgr:
+            # Always scheduled since the profiler can be switched on at runtime; idle it returns at once
+            scheduler.add_job("heap_profile", (self.config_mgr.HEAP_PROFILE_PUBLISH_INTERVAL or 60) * 1000,
+                              self.heap_profile_job, priority=2)
 
-            except Exception as e:
-                self.log_mgr.log(f"Error in main loop: {e}")
-                self.system_mgr.print_system_data()
-                await uasyncio.sleep(5)
+    def _setup_low_power(self):
+        # Sampling-only runtime: the CPU lightsleeps between jobs while the display and radio are off
+        lp = self.low_power_mgr
+        if self.enviro_plus_display_mgr.display_backlight_on:
+            self.enviro_plus_display_mgr.toggle_backlight()
 
-    async def process_sensor_data(self):
-        # Enviro Plus Sensor
-        enviro_plus_sensor_data = await self.read_enviro_plus_sensors()
-        
-        if enviro_plus_sensor_data is None:
-            self.log_mgr.log("No Enviro Plus sensor data available")
+        for index, pin in enumerate((12, 13, 14, 15, self.config_mgr.MOMENTARY_BUTTON_PIN)):
+            lp.add_wake_pin(pin, index)
+        lp.on_wake = self.on_low_power_wake
+        lp.set_sleep_condition(self.can_lightsleep)
+        self.scheduler.set_idle_handler(lp.idle)
+        if self.power_mgr is None:
+            # No publish windows to bring the radio up for, so it stays off for good
+            self.log_mgr.log("LOW_POWER_MODE without MQTT, WiFi switched off")
+            self.wifi_mgr.suspend()
+        self.log_mgr.log("Low-power runtime started")
 
-        await self.update_display(enviro_plus_sensor_data)
-        
-        if enviro_plus_sensor_data.get('status', 0) & STATUS_HEATER_STABLE:
-            await self.handle_mqtt_publishing(enviro_plus_sensor_data)
+    def can_lightsleep(self):
+        # lightsleep stops everything, so only use it when nothing else needs the CPU or the radio
+        if self.enviro_plus_display_mgr.display_backlight_on or self.system_mgr.processing_tasks:
+            return False
+        if self.scheduler.in_flight():
+            return False  # A coroutine job is waiting on I/O or a timer lightsleep would stall
+        return self.wifi_mgr.suspended or not self.wifi_mgr.wlan.active()
+
+    def buttons_job(self):
+        with self.heap_stage("buttons"):
+            self.enviro_plus.check_buttons()
+            pressed = self.external_button.is_pressed()
+            if pressed and not self.external_button_down:
+                event_bus.publish(events.BUTTON_PRESSED, "EXT")
+            self.external_button_down = pressed
+
+    def sample_job(self):
+        if self.heap_profiler:
+            self.heap_profiler.tick()
+        if self.acquisition_mgr:
+            self.acquisition_mgr.drain()
+        with perf.span("sensor_read"), self.heap_stage("sensor_read"):
+            sensor_data = self.enviro_plus.get_sensor_data()
+        if sensor_data is None:
+            self.log_mgr.log("No Enviro Plus sensor data available")
         else:
+            event_bus.publish(events.SENSOR_SAMPLE, sensor_data)
+        if self.low_power_mgr:
+            self.low_power_mgr.count_sample()
+
+    async def render_job(self):
+        if self.enviro_plus_display_mgr.display_backlight_on:
+            with perf.span("render"), self.heap_stage("render", awaits=True):
+                await self.update_display(self.latest_sensor_data)
+
+    def system_stats_job(self):
+        self.system_mgr.update_status()
+        self.system_mgr.memory_mgr.maybe_collect()
+        with self.heap_stage("system_data"):
+            self.system_mgr.update_system_data()
+
+    async def publish_job(self):
+        sensor_data = self.latest_sensor_data
+        if sensor_data is None or not sensor_data.get('status', 0) & STATUS_HEATER_STABLE:
             self.log_mgr.log("Gas sensor heater not stable, skipping MQTT publishing")
+            return False
+        with self.heap_stage("publish", awaits=True):
+            return await self.handle_mqtt_publishing(sensor_data)
 
-    async def check_external_button(self):
-        while True:
-            if self.external_button.is_pressed():
-                self.external_button_pressed = True
-            await uasyncio.sleep_ms(100)
+    def perf_job(self):
+        # Histograms restart after every delivered report, so each message covers one interval
+        if self.mqtt_mgr.publish_message("perf", json.dumps(perf.get_report()).encode()):
+            perf.reset()
+            return True
+        return False
+
+    def heap_profile_job(self):
+        # Like perf reports, each delivered report covers one interval
+        heap_profiler = self.heap_profiler
+        if not (heap_profiler and heap_profiler.enabled):
+            return True
+        if self.mqtt_mgr.publish_message("heap/profile", json.dumps(heap_profiler.get_report()).encode()):
+            heap_profiler.reset()
+            return True
+        return False
+
+    def on_low_power_wake(self, pending):
+        for index, button in enumerate(("A", "B", "X", "Y", "EXT")):
+            if pending & (1 << index):
+                event_bus.publish(events.BUTTON_PRESSED, button)
+
+    def on_sensor_sample(self, sensor_data):
+        self.latest_sensor_data = sensor_data
 
-    async def handle_external_button(self):
-        if self.external_button_pressed:
+    async def on_button_pressed(self, button):
+        if button == "EXT":
             self.log_mgr.log("External button pressed")
-            
             await self.enviro_plus_display_mgr.initiate_system_restart()
-            self.external_button_pressed = False
 
-    async def read_enviro_plus_sensors(self):
-        return self.enviro_plus.get_sensor_data()
+    async def on_control_command(self, command):
+        name, argument = command
+        if name == "record":
+            self.handle_record_command(argument)
+            return
+        if name == "replay":
+            self.handle_replay_command(argument)
+            return
+        if name == "heap-profile":
+            self.handle_heap_profile_command(argument)
+            return
+        if name != "trace":
+            return
+        # control/trace accepts "start", "start:<seconds>", "stop", "save" (to flash) and "dump" (over MQTT)
+        action, _, value = argument.partition(":")
+        tracer = self.get_tracer()
+        if action == "start":
+            tracer.start(int(value) if value else None)
+        elif action == "stop":
+            tracer.stop()
+        elif action == "save":
+            tracer.save()
+        elif action == "dump":
+            await self.dump_trace()
+        else:
+            self.log_mgr.log(f"Unknown trace command: {argument}")
+
+    def handle_record_command(self, argument):
+        # control/record accepts "start", "start:<seconds>" and "stop"; the capture goes to SENSOR_RECORD_FILE
+        action, _, value = argument.partition(":")
+        if action == "start":
+            self.get_sensor_recorder().start(int(value) if value else None)
+        elif action == "stop":
+            if self.sensor_recorder:
+                self.sensor_recorder.stop()
+        else:
+            self.log_mgr.log(f"Unknown record command: {argument}")
+
+    def handle_heap_profile_command(self, argument):
+        # control/heap-profile accepts "on", "off", "reset" and "report" (publishes right away)
+        heap_profiler = self.get_heap_profiler()
+        if argument in ("on", "true"):
+            heap_profiler.set_enabled(True)
+        elif argument in ("off", "false"):
+            heap_profiler.set_enabled(False)
+        elif argument == "reset":
+            heap_profiler.reset()
+        elif argument == "report":
+            if self.mqtt_mgr:
+                self.mqtt_mgr.publish_message("heap/profile", json.dumps(heap_profiler.get_report()).encode())
+            return
+        else:
+            self.log_mgr.log(f"Unknown heap-profile command: {argument}")
+            return
+        self.log_mgr.log(f"Heap profiler {'on' if heap_profiler.enabled else 'off'}")
+
+    def handle_replay_command(self, argument):
+        # control/replay accepts "start[:<speed>[:publish]]" (speed 0 = as fast as possible) and "stop"
+        action, _, options = argument.partition(":")
+        if action == "stop":
+            if self.replay_task:
+                self.replay_task.cancel()
+            return
+        if action != "start":
+            self.log_mgr.log(f"Unknown replay command: {argument}")
+            return
+        recorder = self.get_sensor_recorder()
+        if self.replay_task is not None or recorder.active:
+            self.log_mgr.log("Replay not started, a recording or replay is running")
+            return
+        speed, _, publish = options.partition(":")
+        try:
+            speed = float(speed) if speed else 0
+        except ValueError:
+            self.log_mgr.log(f"Unknown replay command: {argument}")
+            return
+        self.replay_task = uasyncio.create_task(self.replay_sensors(recorder.file, speed, publish == "publish"))
+
+    async def replay_sensors(self, path, speed=0, publish=False, output=None):
+        from managers.sensor_recorder import SensorReplay
+        try:
+            report = await SensorReplay(path).run(self, speed, publish, output or self.config_mgr.SENSOR_REPLAY_OUTPUT)
+            self.log_mgr.log(f"Replayed {report['samples']} samples at {report['samples_per_s']}/s")
+            if self.mqtt_mgr:
+                self.mqtt_mgr.publish_message("replay/report", json.dumps(report).encode())
+            return report
+        except Exception as e:
+            self.log_mgr.log(f"Error replaying {path}: {e}")
+            return None
+        finally:
+            self.replay_task = None
+
+    async def dump_trace(self):
+        if self.mqtt_mgr is None:
+            return
+        for chunk in self.get_tracer().iter_chunks():
+            if not self.mqtt_mgr.publish_message("trace/dump", chunk):
+                self.log_mgr.log("Trace dump aborted, MQTT publish failed")
+                return
+            await uasyncio.sleep_ms(0)
+
+    def on_status_change(self, status):
+        if self.mqtt_mgr:
+            self.mqtt_mgr.publish_message("system/status", status.encode())
 
     async def update_display(self, sensor_data):
         if sensor_data is None:
@@ -164,27 +566,50 @@ class EnviroPi:
             self.log_mgr.log(f"Error updating display: {e}")
 
     async def handle_mqtt_publishing(self, enviro_plus_sensor_data):
-        current_time = utime.time()
-        if current_time - self.last_mqtt_publish >= self.config_mgr.MQTT_UPDATE_INTERVAL:
-            if not self.mqtt_mgr.is_connected:
-                self.log_mgr.log("MQTT not connected, attempting to connect...")
-                await self.mqtt_mgr.connect()
-            
-            if self.mqtt_mgr.is_connected:
-                try:
-                    prepared_mqtt_data = self.data_mgr.prepare_mqtt_sensor_data_for_publishing(
-                        enviro_plus_sensor_data,
-                        self.system_mgr.get_system_data(),
-                        self.system_mgr.get_current_config_data()
-                    )
-                    publish_result = await self.mqtt_mgr.publish_data(prepared_mqtt_data)
-                    if publish_result:
-                        self.last_mqtt_publish = current_time
-                except Exception as e:
-                    self.log_mgr.log(f"MQTT publishing error: {e}")
-            else:
-                self.log_mgr.log("MQTT connection failed, skipping publish")
+        if self.mqtt_mgr is None:
+            return True
+        if not self.wifi_mgr.link_up and not self.mqtt_mgr.queue_offline:
+            return False
+        if self.wifi_mgr.link_up and not self.mqtt_mgr.is_connected:
+            self.log_mgr.log("MQTT not connected, attempting to connect...")
+            await self.mqtt_mgr.connect()
+        
+        if not (self.mqtt_mgr.is_connected or self.mqtt_mgr.queue_offline):
+            self.log_mgr.log("MQTT connection failed, skipping publish")
+            return False
+
+        try:
+            prepared_mqtt_data = self.data_mgr.prepare_mqtt_sensor_data_for_publishing(
+                enviro_plus_sensor_data,
+                self.system_mgr.get_system_data(),
+                self.system_mgr.get_current_config_data(),
+                self.wifi_mgr.get_wifi_data(),
+                self.get_power_data(),
+                self.watering_controller.get_watering_data() if self.watering_controller else None
+            )
+            with perf.span("publish"):
+                publish_result = await self.mqtt_mgr.publish_data(prepared_mqtt_data)
+            if publish_result:
+                self.mqtt_mgr.publish_message("system/scheduler", json.dumps(self.scheduler.get_stats()).encode())
+                self.mqtt_mgr.publish_message("system/events", json.dumps(event_bus.get_stats()).encode())
+                if self.zone_scheduler:
+                    self.zone_scheduler.publish_status()
+                self.system_mgr.memory_mgr.on_idle()
+            return publish_result
+        except Exception as e:
+            self.log_mgr.log(f"MQTT publishing error: {e}")
+            return False
+
+    def get_power_data(self):
+        if self.power_mgr is None:
+            return None
+        power_data = self.power_mgr.get_power_data()
+        if self.low_power_mgr:
+            self.low_power_mgr.update_record(power_data)
+        return power_data
 
     def on_display_mode_change(self, new_mode):
         self.log_mgr.log(f"Display mode changed to: {new_mode}")
-        uasyncio.create_task(self.update_display(None))
\ No newline at end of file
+        if new_mode == "Weather":
+            self.scheduler.trigger("weather")
+        self.scheduler.trigger("render")
\ No newline at end of file
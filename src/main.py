@@ -1,8 +1,21 @@
+import os
+
+# Opt-in: the import profiler runs only while a boot_profile file exists in the flash root, its own
+# bookkeeping would otherwise be paid on every boot
+boot_profiler = None
+try:
+    os.stat("boot_profile")  # Relative: the working directory is "/" at boot
+    from managers.boot_profiler import BootProfiler
+    boot_profiler = BootProfiler()
+    boot_profiler.install()
+except OSError:
+    pass
+
 import uasyncio
 from enviro_pi import EnviroPi
 
 def main():
-    enviro_pi = EnviroPi()
+    enviro_pi = EnviroPi(boot_profiler)
     uasyncio.run(enviro_pi.run())
 
 if __name__ == "__main__":
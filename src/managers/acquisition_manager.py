@@ -0,0 +1,211 @@
+import _thread
+import utime
+from array import array
+from managers.adc_manager import adc_manager
+
+
+class SampleRing:
+    # Single-producer/single-consumer handoff between the cores: core 1 only ever moves `head`,
+    # core 0 only ever moves `tail`, so neither side needs a lock. One slot always stays empty
+    # so head == tail unambiguously means "nothing to read".
+    def __init__(self, size):
+        self.size = size
+        self.channels = bytearray(size)
+        self.values = array('i', [0] * size)
+        self.stamps = array('i', [0] * size)
+        self.head = 0
+        self.tail = 0
+        self.dropped = 0
+
+    def push(self, channel, value, stamp):
+        head = self.head
+        next_head = head + 1
+        if next_head == self.size:
+            next_head = 0
+        if next_head == self.tail:
+            self.dropped += 1  # Core 0 fell behind; losing the newest sample is cheaper than waiting
+            return False
+        self.channels[head] = channel
+        self.values[head] = value
+        self.stamps[head] = stamp
+        self.head = next_head  # Publish the slot only once it is completely written
+        return True
+
+
+class AcquisitionManager:
+    MODE_BLOCK = 0       # Peak of a block of back-to-back reads (microphone)
+    MODE_OVERSAMPLE = 1  # Mean of several reads (moisture probes)
+    MAX_CHANNELS = 8
+
+    def __init__(self, config, log_mgr):
+        self.log_mgr = log_mgr
+        self.ring = SampleRing(config.ACQUISITION_RING_SIZE or 64)
+        self.window = config.SENSOR_DATA_AVG_WINDOW_SIZE or 5
+
+        # Everything core 1 touches is allocated here, the worker itself never allocates
+        count = self.MAX_CHANNELS
+        self.names = []
+        self.channel_index = {}
+        self.adcs = []
+        self.modes = bytearray(count)
+        self.sample_counts = array('H', [0] * count)
+        self.intervals = array('i', [0] * count)
+        self.next_due = array('i', [0] * count)
+        self.history = array('i', [0] * (count * self.window))
+        self.history_len = bytearray(count)
+        self.history_pos = bytearray(count)
+        self.spike_runs = bytearray(count)
+        self.channel_count = 0
+
+        # Core 0 side: latest value per channel
+        self.latest_values = array('i', [0] * count)
+        self.latest_stamps = array('i', [0] * count)
+        self.sample_totals = array('I', [0] * count)
+
+        self.running = False
+        self.core1_load = 0  # Hundredths of a percent, kept integer so core 1 never creates floats
+        self.window_start = 0
+        self.window_busy_us = 0
+
+    def add_channel(self, name, pin, mode, samples, interval_ms):
+        if self.running:
+            raise RuntimeError("Acquisition channels must be added before start()")
+        if self.channel_count >= self.MAX_CHANNELS:
+            raise RuntimeError("Too many acquisition channels")
+        index = self.channel_count
+        self.names.append(name)
+        self.channel_index[name] = index
+        self.adcs.append(adc_manager.channel(pin, name).adc)
+        self.modes[index] = mode
+        self.sample_counts[index] = max(1, samples)
+        self.intervals[index] = interval_ms
+        self.channel_count += 1
+        return index
+
+    def start(self):
+        if self.running or self.channel_count == 0:
+            return
+        self.running = True
+        now = utime.ticks_ms()
+        for index in range(self.channel_count):
+            self.next_due[index] = now
+        self.window_start = utime.ticks_us()
+        _thread.start_new_thread(self._worker, ())
+        self.log_mgr.log(f"Acquisition started on core 1: {', '.join(self.names)}")
+
+    def stop(self):
+        self.running = False
+
+    def _acquire(self, index):
+        # The converter is shared with core 0's reads; a whole block is taken under the ADC lock
+        lock = adc_manager.lock
+        lock.acquire()
+        try:
+            return self._read_block(index)
+        finally:
+            lock.release()
+
+    def _read_block(self, index):
+        adc = self.adcs[index]
+        samples = self.sample_counts[index]
+        if self.modes[index] == self.MODE_BLOCK:
+            # The peak keeps the reading on the scale MIC_MIN_VALUE/MIC_MAX_VALUE were calibrated for
+            peak = 0
+            for _ in range(samples):
+                value = adc.read_u16()
+                if value > peak:
+                    peak = value
+            return peak
+        total = 0
+        for _ in range(samples):
+            total += adc.read_u16()
+        return total // samples
+
+    def _filter_spike(self, index, value):
+        # Integer version of DataManager.filter_spike over a per-channel slice of `history`
+        window = self.window
+        base = index * window
+        length = self.history_len[index]
+        position = self.history_pos[index]
+        if length == window:
+            total = 0
+            for offset in range(window):
+                total += self.history[base + offset]
+            average = total // window
+            # An average of 0 has no margin at all, every nonzero reading would look like a spike
+            if average and abs(value - average) > average // 2:
+                if self.spike_runs[index] < window:
+                    self.spike_runs[index] += 1
+                    value = average
+                else:
+                    # Off by as much `window` times in a row is a step: start over from the reading
+                    self.spike_runs[index] = 0
+                    self.history[base] = value
+                    self.history_len[index] = 1
+                    self.history_pos[index] = 1 if window > 1 else 0
+                    return value
+            else:
+                self.spike_runs[index] = 0
+        else:
+            self.history_len[index] = length + 1
+        self.history[base + position] = value
+        position += 1
+        self.history_pos[index] = 0 if position == window else position
+        return value
+
+    def _worker(self):
+        ring = self.ring
+        while self.running:
+            start = utime.ticks_us()
+            now = utime.ticks_ms()
+            next_wake = utime.ticks_add(now, 1000)
+            for index in range(self.channel_count):
+                due = self.next_due[index]
+                if utime.ticks_diff(now, due) >= 0:
+                    value = self._filter_spike(index, self._acquire(index))
+                    ring.push(index, value, now)
+                    due = utime.ticks_add(due, self.intervals[index])
+                    if utime.ticks_diff(now, due) >= 0:
+                        due = utime.ticks_add(now, self.intervals[index])  # Don't replay missed periods
+                    self.next_due[index] = due
+                if utime.ticks_diff(due, next_wake) < 0:
+                    next_wake = due
+
+            end = utime.ticks_us()
+            self.window_busy_us += utime.ticks_diff(end, start)
+            elapsed = utime.ticks_diff(end, self.window_start)
+            if elapsed >= 1000000:
+                self.core1_load = self.window_busy_us // (elapsed // 10000)  # Stays a small int
+                self.window_busy_us = 0
+                self.window_start = end
+
+            delay = utime.ticks_diff(next_wake, utime.ticks_ms())
+            if delay > 0:
+                utime.sleep_ms(delay)
+
+    def drain(self):
+        # Core 0: move everything core 1 produced into the per-channel latest values
+        ring = self.ring
+        tail = ring.tail
+        head = ring.head
+        while tail != head:
+            index = ring.channels[tail]
+            self.latest_values[index] = ring.values[tail]
+            self.latest_stamps[index] = ring.stamps[tail]
+            self.sample_totals[index] += 1
+            tail += 1
+            if tail == ring.size:
+                tail = 0
+        ring.tail = tail
+
+    def latest(self, name):
+        index = self.channel_index.get(name)
+        if index is None or self.sample_totals[index] == 0:
+            return None
+        return self.latest_values[index]
+
+    def update_record(self, record):
+        self.drain()
+        record.core1_load = self.core1_load / 100
+        record.acq_samples = sum(self.sample_totals)
+        record.acq_dropped = self.ring.dropped
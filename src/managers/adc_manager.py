@@ -0,0 +1,135 @@
+import _thread
+import utime
+from array import array
+from machine import ADC
+from managers import event_bus as events
+from managers.event_bus import event_bus
+from managers.adc_sampler import ADCSampler
+
+
+class ADCChannel:
+    # One ADC input shared by everything that reads it: one handle, one burst sampler and the
+    # channel's slot in the manager's scan arrays.
+    def __init__(self, manager, pin, slot):
+        self.manager = manager
+        self.pin = pin
+        self.slot = slot
+        self.adc = ADC(pin)  # GPIO 26-29 or channel 4, the chip temperature sensor
+        self.sampler = ADCSampler(self.adc)
+        self.users = []
+        self.probe = False  # A moisture probe reads it, so it gets the longer burst
+        self.scanned = False
+
+    def read_u16(self):
+        # A single conversion, for readers that keep their own statistics (the microphone peak)
+        lock = self.manager.lock
+        lock.acquire()
+        try:
+            return self.adc.read_u16()
+        finally:
+            lock.release()
+
+    def read(self):
+        # A fresh trimmed-mean burst; it also becomes the channel's cached value
+        manager = self.manager
+        lock = manager.lock
+        lock.acquire()
+        try:
+            value = self.sampler.read()
+        finally:
+            lock.release()
+        manager.values[self.slot] = value
+        manager.noise[self.slot] = self.sampler.noise
+        manager.stamps[self.slot] = utime.ticks_ms()
+        self.scanned = True
+        return value
+
+    @property
+    def value(self):
+        return self.manager.values[self.slot] if self.scanned else self.read()
+
+    @property
+    def noise(self):
+        return self.manager.noise[self.slot]
+
+
+class ADCManager:
+    # Owns every ADC handle. Components ask for a channel by pin instead of building ADC(Pin(n))
+    # themselves, so a pin read by several of them (the monitored pins overlap the microphone and
+    # the moisture probes) has one handle and one sampler, and the GPIO is set up once. The
+    # "adc_scan" job reads the scanned channels into shared arrays every ADC_SCAN_INTERVAL_MS;
+    # readers that only need a recent value take the cached one instead of converting again.
+    # The RP2040 has one converter behind an input mux, so every conversion, on either core,
+    # holds `lock`: a read from core 0 can't switch the mux under a block core 1 is taking.
+    TEMPERATURE = 4
+    VSYS = 29
+    MAX_CHANNELS = 5  # GPIO 26-29 and the temperature sensor
+
+    def __init__(self):
+        self.config = None
+        self.log_mgr = None
+        self.lock = _thread.allocate_lock()
+        self.channels = {}  # pin -> ADCChannel
+        self.scan_channels = []
+        self.values = array('f', [0.0] * self.MAX_CHANNELS)
+        self.noise = array('f', [0.0] * self.MAX_CHANNELS)
+        self.stamps = array('i', [0] * self.MAX_CHANNELS)
+        self.scan_interval_ms = 1000
+        self.scans = 0
+
+    def configure(self, config, log_mgr):
+        self.config = config
+        self.log_mgr = log_mgr
+        self.scan_interval_ms = config.ADC_SCAN_INTERVAL_MS or 1000
+        # Supply and chip temperature always, plus whatever ADC_PINS_TO_MONITOR reports
+        for pin in (self.TEMPERATURE, self.VSYS) + tuple(config.ADC_PINS_TO_MONITOR or ()):
+            channel = self.channel(pin, "system")
+            if channel not in self.scan_channels:
+                self.scan_channels.append(channel)
+        for channel in self.channels.values():
+            self.load_sampler(channel)  # Channels taken before configure() ran still have the defaults
+        event_bus.subscribe(events.CONFIG_CHANGED, self.on_config_changed)
+
+    def on_config_changed(self, key):
+        if key.startswith("ADC_"):
+            self.scan_interval_ms = self.config.ADC_SCAN_INTERVAL_MS or 1000
+            for channel in self.channels.values():
+                self.load_sampler(channel)
+
+    def load_sampler(self, channel):
+        config = self.config
+        if config is None:
+            return
+        # The probes' burst is the longer one, a pin shared with a probe gets it for every reader
+        burst = (config.ADC_BURST_SIZE or 16) if channel.probe else (config.ADC_SYSTEM_BURST_SIZE or 8)
+        channel.sampler.configure(burst, config.ADC_BURST_TRIM, config.ADC_BURST_INTERVAL_US or 0)
+
+    def channel(self, pin, user, probe=False):
+        # The handle for `pin`, built on first use; `user` names the reader in the shared-pin log
+        channel = self.channels.get(pin)
+        if channel is None:
+            if len(self.channels) == self.MAX_CHANNELS:
+                raise ValueError(f"No ADC channel on pin {pin}")
+            channel = self.channels[pin] = ADCChannel(self, pin, len(self.channels))
+            channel.probe = probe
+            self.load_sampler(channel)
+        elif probe and not channel.probe:
+            channel.probe = True
+            self.load_sampler(channel)
+        if user not in channel.users:
+            channel.users.append(user)
+            if len(channel.users) > 1 and self.log_mgr:
+                self.log_mgr.log(f"ADC pin {pin} shared by {', '.join(channel.users)}")
+        return channel
+
+    def scan(self):
+        # Scheduler job: every scanned channel back to back into the shared arrays
+        for channel in self.scan_channels:
+            try:
+                channel.read()
+            except Exception as e:
+                self.log_mgr.log(f"Error reading ADC pin {channel.pin}: {e}")
+        self.scans += 1
+
+
+adc_manager = ADCManager()
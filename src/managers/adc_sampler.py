@@ -0,0 +1,58 @@
+import math
+import utime
+from array import array
+
+
+class ADCSampler:
+    # One reading from a burst of back-to-back ADC reads: the burst goes into a preallocated
+    # array, the `trim` lowest and highest samples are dropped and the rest averaged. What is
+    # left also gives the noise (standard deviation, in raw counts) that goes with the value.
+    # A single read_u16() needed the spike filter's history to fight noise; a trimmed burst
+    # rejects the outliers within the read itself.
+    def __init__(self, adc, burst=16, trim=None, interval_us=0):
+        self.adc = adc
+        self.value = 0
+        self.noise = 0.0
+        self.configure(burst, trim, interval_us)
+
+    def configure(self, burst=16, trim=None, interval_us=0):
+        self.burst = max(1, burst)
+        self.trim = self.burst // 8 if trim is None else min(trim, (self.burst - 1) // 2)
+        self.interval_us = interval_us
+        self.samples = array('H', [0] * self.burst)
+
+    def read(self):
+        samples = self.samples
+        burst = self.burst
+        read_u16 = self.adc.read_u16
+        interval_us = self.interval_us
+        for index in range(burst):
+            samples[index] = read_u16()
+            if interval_us:
+                utime.sleep_us(interval_us)
+
+        if self.trim:
+            # Insertion sort in place; bursts are short and this allocates nothing
+            for index in range(1, burst):
+                sample = samples[index]
+                position = index - 1
+                while position >= 0 and samples[position] > sample:
+                    samples[position + 1] = samples[position]
+                    position -= 1
+                samples[position + 1] = sample
+
+        trim = self.trim
+        count = burst - 2 * trim
+        total = 0
+        for index in range(trim, burst - trim):
+            total += samples[index]
+        # Squares are summed around the integer mean so they stay small ints, not heap bignums
+        centre = total // count
+        squares = 0
+        for index in range(trim, burst - trim):
+            deviation = samples[index] - centre
+            squares += deviation * deviation
+        mean = total / count
+        self.value = mean
+        self.noise = math.sqrt(max(0, squares / count - (mean - centre) ** 2))
+        return mean
@@ -0,0 +1,64 @@
+import builtins
+import gc
+import sys
+import utime
+
+
+class BootProfiler:
+    # Wraps builtins.__import__ while main.py boots (only when the boot_profile marker file exists)
+    # and notes each module's own import time and heap. Collection stays on, a heap exhausted
+    # mid-boot must still be collected; each import starts from a collected heap instead, and the
+    # collection is left out of both the module's and its importer's figures.
+    def __init__(self):
+        self.original_import = None
+        self.imports = {}
+        self.stack = []
+
+    def install(self):
+        if self.original_import is None:
+            self.original_import = builtins.__import__
+            builtins.__import__ = self._import
+
+    def uninstall(self):
+        if self.original_import is not None:
+            builtins.__import__ = self.original_import
+            self.original_import = None
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level or name in sys.modules:
+            return self.original_import(name, globals, locals, fromlist, level)
+
+        # Track time/heap spent in nested imports so each module reports its own cost
+        before_us = utime.ticks_us()
+        before_alloc = gc.mem_alloc()
+        gc.collect()
+        self.stack.append([0, 0])
+        start_us = utime.ticks_us()
+        start_alloc = gc.mem_alloc()
+        try:
+            return self.original_import(name, globals, locals, fromlist, level)
+        finally:
+            end_us = utime.ticks_us()
+            end_alloc = gc.mem_alloc()
+            child_us, child_alloc = self.stack.pop()
+            if name not in self.imports:
+                # A collection the import triggered itself can still make this negative
+                own_alloc = max(0, end_alloc - start_alloc - child_alloc)
+                self.imports[name] = (utime.ticks_diff(end_us, start_us) - child_us, own_alloc)
+            if self.stack:
+                # The importer's window also saw the collection above, so that comes off too
+                self.stack[-1][0] += utime.ticks_diff(end_us, before_us)
+                self.stack[-1][1] += end_alloc - before_alloc
+
+    def get_report(self):
+        # {module: [self_ms, self_bytes]}, ordered by the time spent importing
+        ordered = sorted(self.imports.items(), key=lambda item: item[1][0], reverse=True)
+        return {name: [round(us / 1000, 2), alloc] for name, (us, alloc) in ordered}
+
+    def get_totals(self):
+        total_us = 0
+        total_alloc = 0
+        for us, alloc in self.imports.values():
+            total_us += us
+            total_alloc += alloc
+        return round(total_us / 1000, 2), total_alloc
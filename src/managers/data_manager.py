@@ -1,16 +1,29 @@
 import math
 import utime
-import urequests
-import ntptime
-import machine
+from managers.perf_manager import perf
 
 class DataManager:
     def __init__(self, config, log_mgr, system_mgr):
         self.config = config
         self.log_manager = log_mgr
         self.system_mgr = system_mgr
+        self.wifi_mgr = None
+        self.http_client = None
         self.moving_averages = {}
-        self.window_size = self.config.SENSOR_DATA_AVG_WINDOW_SIZE
+        self.spike_runs = {}
+        self.window_size = self.config.SENSOR_DATA_AVG_WINDOW_SIZE or 5
+        self.mqtt_data = {"enviro-plus": None, "system": None, "adc": None, "wifi": None, "power": None, "m5-watering-unit": None, "current_config": None}
+
+    def set_wifi_manager(self, wifi_mgr):
+        self.wifi_mgr = wifi_mgr
+
+    def get_http_client(self):
+        # Imported on the first fetch rather than at boot, where it would delay the first frame
+        if self.http_client is None:
+            from managers.http_client import http_client
+            http_client.configure(self.config)
+            self.http_client = http_client
+        return self.http_client
 
     def correct_temperature_reading(self, temperature):
         return round(temperature - self.config.TEMPERATURE_OFFSET, 2)
@@ -43,7 +56,7 @@ class DataManager:
     def adjust_cpu_frequency(self, cpu_frequency):
         return cpu_frequency / 1000000
     
-    def interpret_mic_reading(self, mic):
+    def interpret_mic_reading(self, mic, filtered=False):
         # Define the range of the microphone input
         MIC_MIN = self.config.MIC_MIN_VALUE  # Adjusted based on your silent readings
         MIC_MAX = self.config.MIC_MAX_VALUE  # Assuming 16-bit ADC
@@ -53,7 +66,10 @@ class DataManager:
         DB_MAX = 110  # Highest reading (very loud)
 
         # Normalize the mic reading to a 0-1 range
-        normalized_mic = max(0, min(1, (self.filter_spike("mic", mic) - MIC_MIN) / (MIC_MAX - MIC_MIN)))
+        # Readings from the acquisition worker have already been through its spike filter
+        if not filtered:
+            mic = self.filter_spike("mic", mic)
+        normalized_mic = max(0, min(1, (mic - MIC_MIN) / (MIC_MAX - MIC_MIN)))
 
         # Convert to logarithmic dB scale
         # Using a modified formula to give more realistic values
@@ -77,10 +93,14 @@ class DataManager:
         else:
             return "Bright"
 
-    def get_weather_data_from_api(self):
+    async def get_weather_data_from_api(self):
+        if self.wifi_mgr and not self.wifi_mgr.link_up:
+            self.log_manager.log("WiFi link down, skipping weather fetch")
+            return None
         try:
             url = f"{self.config.WEATHER_API_BASE_URL}/current.json" + f"?key={self.config.WEATHER_API_TOKEN}" + f"&q={self.config.WEATHER_FOR}&aqi=yes"
-            response = urequests.get(url)
+            with perf.span("weather_fetch"):
+                response = await self.get_http_client().get(url)
 
             if response.status_code != 200:
                 self.log_manager.log(f"Weather API error: {response.status_code}")
@@ -131,13 +151,16 @@ class DataManager:
         
     
 
-    def filter_spike(self, sensor_name, value):
+    def filter_spike(self, sensor_name, value, window=None):
+        # Burst-sampled readings (ADCSampler) are already clean and pass a shorter window
+        window = window or self.window_size
         if sensor_name not in self.moving_averages:
             self.moving_averages[sensor_name] = []
+            self.spike_runs[sensor_name] = 0
 
         history = self.moving_averages[sensor_name]
         
-        if len(history) < self.window_size:
+        if len(history) < window:
             history.append(value)
             return value
         
@@ -147,13 +170,22 @@ class DataManager:
         # Define threshold as a percentage of the average
         threshold = 0.5 * avg  # 50% deviation threshold, adjust as needed
         
-        if deviation > threshold:
+        if deviation > threshold and avg and self.spike_runs[sensor_name] < window:
+            self.spike_runs[sensor_name] += 1
             filtered_value = avg
+        elif deviation > threshold and avg:
+            # Off by as much `window` times in a row is a step, not a spike (a probe losing
+            # contact, a pot being watered); start over from it instead of masking it forever
+            self.spike_runs[sensor_name] = 0
+            history.clear()
+            history.append(value)
+            return value
         else:
+            self.spike_runs[sensor_name] = 0
             filtered_value = value
         
         history.append(filtered_value)
-        if len(history) > self.window_size:
+        while len(history) > window:
             history.pop(0)
         
         return filtered_value
@@ -168,15 +200,16 @@ class DataManager:
             )
         return formatted_time if not None else epoch_value
 
-    def prepare_mqtt_sensor_data_for_publishing(self, enviro_plus_data, system_data, current_config_data):
+    def prepare_mqtt_sensor_data_for_publishing(self, enviro_plus_data, system_data, current_config_data, wifi_data=None, power_data=None, watering_data=None):
         try:
-            mqtt_data = system_data
-            data = {
-                "enviro-plus": enviro_plus_data,
-                "system": mqtt_data["system"],
-                "adc": mqtt_data["adc"],
-                "current_config": current_config_data
-            }
+            data = self.mqtt_data
+            data["enviro-plus"] = enviro_plus_data
+            data["system"] = system_data["system"]
+            data["adc"] = system_data["adc"]
+            data["wifi"] = wifi_data
+            data["power"] = power_data
+            data["m5-watering-unit"] = watering_data
+            data["current_config"] = current_config_data
             return data
         except Exception as e:
             print(f"Error in prepare_mqtt_sensor_data_for_publishing: {e}")
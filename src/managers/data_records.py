@@ -0,0 +1,167 @@
+class DataRecord:
+    # Preallocated record updated in place each tick; supports the dict-style reads
+    # (record["key"], record.get("key"), "key" in record) that consumers already use.
+    # MicroPython ignores __slots__, here it only names the fields; the saving on the device is
+    # the instance being reused instead of a dict being built every tick
+    __slots__ = ()
+    FIELDS = ()
+
+    def __getitem__(self, key):
+        return getattr(self, key)
+
+    def __contains__(self, key):
+        return key in self.FIELDS
+
+    def get(self, key, default=None):
+        if key in self.FIELDS:
+            return getattr(self, key)
+        return default
+
+    def items(self):
+        for key in self.FIELDS:
+            yield key, getattr(self, key)
+
+
+class EnviroRecord(DataRecord):
+    __slots__ = ("temperature", "humidity", "pressure", "gas", "gas_quality", "lux", "mic", "status")
+    FIELDS = __slots__
+
+    def __init__(self):
+        self.temperature = 0
+        self.humidity = 0
+        self.pressure = 0
+        self.gas = 0
+        self.gas_quality = ""
+        self.lux = 0
+        self.mic = 0
+        self.status = 0
+
+
+class SystemRecord(DataRecord):
+    __slots__ = ("internal_voltage", "chip_temperature", "cpu_frequency", "cpu_usage", "ram_usage",
+                 "timestamp", "uptime", "gc_collections", "gc_pause_ms", "gc_max_pause_ms",
+                 "heap_free", "heap_largest_free", "heap_fragmentation",
+                 "ntp_synced", "ntp_offset_ms", "ntp_drift_ppm", "ntp_last_sync",
+                 "core0_load", "core1_load", "acq_samples", "acq_dropped")
+    FIELDS = __slots__
+
+    def __init__(self):
+        self.internal_voltage = 0
+        self.chip_temperature = 0
+        self.cpu_frequency = 0
+        self.cpu_usage = 0
+        self.ram_usage = 0
+        self.timestamp = 0
+        self.uptime = ""
+        self.gc_collections = 0
+        self.gc_pause_ms = 0
+        self.gc_max_pause_ms = 0
+        self.heap_free = 0
+        self.heap_largest_free = 0
+        self.heap_fragmentation = 0
+        self.ntp_synced = False
+        self.ntp_offset_ms = 0
+        self.ntp_drift_ppm = 0
+        self.ntp_last_sync = 0
+        self.core0_load = 0
+        self.core1_load = 0
+        self.acq_samples = 0
+        self.acq_dropped = 0
+
+
+class WiFiRecord(DataRecord):
+    __slots__ = ("connected", "uptime", "disconnects", "reconnect_attempts",
+                 "rssi", "rssi_min", "rssi_max", "rssi_avg")
+    FIELDS = __slots__
+
+    def __init__(self):
+        self.connected = False
+        self.uptime = 0
+        self.disconnects = 0
+        self.reconnect_attempts = 0
+        self.rssi = 0
+        self.rssi_min = 0
+        self.rssi_max = 0
+        self.rssi_avg = 0
+
+
+class PowerRecord(DataRecord):
+    __slots__ = ("mode", "state", "active_pct", "powersave_pct", "radio_off_pct", "windows", "queued",
+                 "idle_pct", "sleeps", "refused_sleeps", "energy_per_sample_mj", "avg_current_ma")
+    FIELDS = __slots__
+
+    def __init__(self):
+        self.mode = ""
+        self.state = ""
+        self.active_pct = 0
+        self.powersave_pct = 0
+        self.radio_off_pct = 0
+        self.windows = 0
+        self.queued = 0
+        self.idle_pct = 0
+        self.sleeps = 0
+        self.refused_sleeps = 0
+        self.energy_per_sample_mj = 0
+        self.avg_current_ma = 0
+
+
+class WateringRecord(DataRecord):
+    __slots__ = ("moisture", "m5_moisture", "dfr_moisture", "water_used", "water_left", "is_watering",
+                 "watering_cycles", "watering_cycles_configured", "state", "last_watered")
+    FIELDS = __slots__
+
+    def __init__(self):
+        self.moisture = 0
+        self.m5_moisture = 0
+        self.dfr_moisture = 0
+        self.water_used = 0
+        self.water_left = 0
+        self.is_watering = False
+        self.watering_cycles = 0
+        self.watering_cycles_configured = 0
+        self.state = ""
+        self.last_watered = 0
+
+
+class ZoneRecord(DataRecord):
+    __slots__ = ("name", "moisture", "raw", "noise", "state", "reason", "cycles", "water_used",
+                 "last_watered", "is_watering", "queued")
+    FIELDS = __slots__
+
+    def __init__(self, name=""):
+        self.name = name
+        self.moisture = 0
+        self.raw = 0
+        self.noise = 0
+        self.state = ""
+        self.reason = ""
+        self.cycles = 0
+        self.water_used = 0
+        self.last_watered = 0
+        self.is_watering = False
+        self.queued = False
+
+
+class ADCRecord(DataRecord):
+    __slots__ = ("pins", "FIELDS", "values")
+
+    def __init__(self, pins):
+        self.pins = tuple(pins)
+        self.FIELDS = tuple(f"adc_{pin}" for pin in self.pins)
+        self.values = [0] * len(self.pins)
+
+    def __getitem__(self, key):
+        return self.values[self.FIELDS.index(key)]
+
+    def get(self, key, default=None):
+        if key in self.FIELDS:
+            return self.values[self.FIELDS.index(key)]
+        return default
+
+    def items(self):
+        for index, key in enumerate(self.FIELDS):
+            yield key, self.values[index]
+
+    def clear(self):
+        for index in range(len(self.values)):
+            self.values[index] = 0
@@ -0,0 +1,125 @@
+import utime
+import uasyncio
+from array import array
+
+# Topics are small ints so publishing indexes a list instead of hashing a string.
+# Payload per topic:
+SENSOR_SAMPLE = 0         # EnviroRecord (updated in place, copy what you keep)
+CONFIG_CHANGED = 1        # config key (str)
+BUTTON_PRESSED = 2        # "A", "B", "X", "Y" or "EXT"
+STATUS_CHANGED = 3        # "RUNNING", "PROCESSING" or "ERROR"
+DISPLAY_MODE_CHANGED = 4  # display mode name
+CONTROL_COMMAND = 5       # (command, argument)
+
+TOPIC_NAMES = ("sensor_sample", "config_changed", "button_pressed", "status_changed",
+               "display_mode_changed", "control_command")
+
+
+class EventBus:
+    def __init__(self, queue_size=16):
+        count = len(TOPIC_NAMES)
+        self.log_mgr = None
+        self.sync_subscribers = [[] for _ in range(count)]
+        self.async_subscribers = [[] for _ in range(count)]
+
+        # Per-topic statistics, latency is publish-to-delivered in microseconds
+        self.published = array('I', [0] * count)
+        self.delivered = array('I', [0] * count)
+        self.dropped = array('I', [0] * count)
+        self.avg_latency_us = array('i', [0] * count)
+        self.max_latency_us = array('i', [0] * count)
+
+        # Events for async subscribers wait here until the dispatcher task picks them up
+        self.queue_size = queue_size
+        self.queue_topics = bytearray(queue_size)
+        self.queue_payloads = [None] * queue_size
+        self.queue_stamps = array('i', [0] * queue_size)
+        self.head = 0
+        self.tail = 0
+        self.pending = uasyncio.Event()
+
+    def set_log_manager(self, log_mgr):
+        self.log_mgr = log_mgr
+
+    def subscribe(self, topic, handler, deliver_async=False):
+        # Sync handlers run inside publish() and must be quick; async ones may be coroutines
+        subscribers = self.async_subscribers if deliver_async else self.sync_subscribers
+        subscribers[topic].append(handler)
+
+    def unsubscribe(self, topic, handler):
+        for subscribers in (self.sync_subscribers[topic], self.async_subscribers[topic]):
+            if handler in subscribers:
+                subscribers.remove(handler)
+
+    def publish(self, topic, payload=None):
+        self.published[topic] += 1
+        start = utime.ticks_us()
+
+        handlers = self.sync_subscribers[topic]
+        if handlers:
+            for handler in handlers:
+                try:
+                    handler(payload)
+                except Exception as e:
+                    self._log(f"Error in {TOPIC_NAMES[topic]} subscriber: {e}")
+            self._record(topic, utime.ticks_diff(utime.ticks_us(), start), len(handlers))
+
+        if self.async_subscribers[topic]:
+            next_head = (self.head + 1) % self.queue_size
+            if next_head == self.tail:
+                self.dropped[topic] += 1
+                return
+            self.queue_topics[self.head] = topic
+            self.queue_payloads[self.head] = payload
+            self.queue_stamps[self.head] = start
+            self.head = next_head
+            self.pending.set()
+
+    def _record(self, topic, latency_us, deliveries):
+        self.delivered[topic] += deliveries
+        # Running average (1/8 weight) so the figure never overflows however long the device runs
+        self.avg_latency_us[topic] += (latency_us - self.avg_latency_us[topic]) // 8
+        if latency_us > self.max_latency_us[topic]:
+            self.max_latency_us[topic] = latency_us
+
+    def _log(self, message):
+        if self.log_mgr:
+            self.log_mgr.log(message)
+
+    async def run(self):
+        while True:
+            await self.pending.wait()
+            self.pending.clear()
+            while self.tail != self.head:
+                tail = self.tail
+                topic = self.queue_topics[tail]
+                payload = self.queue_payloads[tail]
+                stamp = self.queue_stamps[tail]
+                self.queue_payloads[tail] = None  # Don't keep the payload alive in the queue
+                self.tail = (tail + 1) % self.queue_size
+
+                handlers = self.async_subscribers[topic]
+                for handler in handlers:
+                    try:
+                        result = handler(payload)
+                        if hasattr(result, "send"):  # A coroutine; on MicroPython it has no __await__
+                            await result
+                    except Exception as e:
+                        self._log(f"Error in {TOPIC_NAMES[topic]} subscriber: {e}")
+                self._record(topic, utime.ticks_diff(utime.ticks_us(), stamp), len(handlers))
+
+    def get_stats(self):
+        stats = {}
+        for topic, name in enumerate(TOPIC_NAMES):
+            stats[name] = {
+                "published": self.published[topic],
+                "delivered": self.delivered[topic],
+                "dropped": self.dropped[topic],
+                "avg_us": self.avg_latency_us[topic],
+                "max_us": self.max_latency_us[topic]
+            }
+        return stats
+
+
+# Shared instance: producers publish and consumers subscribe without knowing about each other
+event_bus = EventBus()
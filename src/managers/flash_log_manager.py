@@ -0,0 +1,151 @@
+import os
+import utime
+
+
+class FlashLogManager:
+    # log() only copies entries into RAM blocks; the flash_log job writes them out. A block that
+    # fills up is sealed and the spare one takes over, so a write never happens in log() itself.
+    # Should both fill before the job gets to them, further entries are dropped and counted.
+    def __init__(self, config):
+        self.directory = config.FLASH_LOG_DIR or "/logs"
+        self.file_count = config.FLASH_LOG_FILE_COUNT or 4
+        self.block_size = config.FLASH_LOG_BLOCK_SIZE or 4096
+        # Files are a whole number of blocks so a flush never straddles a file boundary
+        file_size = config.FLASH_LOG_FILE_SIZE or 4 * self.block_size
+        self.file_size = max(1, file_size // self.block_size) * self.block_size
+        self.flush_interval = config.FLASH_LOG_FLUSH_INTERVAL or 30
+        self.chunk_size = config.FLASH_LOG_CHUNK_SIZE or 1024
+
+        self.buffer = bytearray(self.block_size)
+        self.buffer_view = memoryview(self.buffer)
+        self.buffer_len = 0
+        self.spare = bytearray(self.block_size)
+        self.sealed = None  # A full block waiting for the job
+        self.sealed_len = 0
+        self.current_index = 0
+        self.current_size = 0  # What is in the current file, sealed and buffered bytes excluded
+        self.last_flush = utime.ticks_ms()
+        self.write_errors = 0
+        self.dropped = 0
+
+        self._open_rotation()
+
+    def _file_path(self, index):
+        return f"{self.directory}/log_{index}.txt"
+
+    def _index_path(self):
+        return f"{self.directory}/log.idx"
+
+    def _open_rotation(self):
+        try:
+            os.mkdir(self.directory)
+        except OSError:
+            pass  # Directory already exists
+
+        try:
+            with open(self._index_path(), 'r') as f:
+                self.current_index = int(f.read().strip()) % self.file_count
+        except (OSError, ValueError):
+            self.current_index = 0
+
+        try:
+            self.current_size = os.stat(self._file_path(self.current_index))[6]
+        except OSError:
+            self.current_size = 0
+
+        if self.current_size >= self.file_size:
+            self._rotate()
+
+    def _rotate(self):
+        self.current_index = (self.current_index + 1) % self.file_count
+        self.current_size = 0
+        with open(self._file_path(self.current_index), 'wb'):
+            pass  # Truncate the oldest file before reusing it
+        with open(self._index_path(), 'w') as f:
+            f.write(str(self.current_index))
+
+    def _room(self):
+        # Keep writes aligned: after a partial timer flush, a block is only filled up to the next
+        # block boundary of the current file (a sealed block always ends on one)
+        return self.block_size - (self.current_size % self.block_size) - self.buffer_len
+
+    def write(self, entry):
+        data = entry.encode() + b"\n"
+        if self.sealed is not None and len(data) >= self._room():
+            self.dropped += 1  # Both blocks full, the job hasn't caught up
+            return
+        offset = 0
+        remaining = len(data)
+        while remaining > 0:
+            room = self._room()
+            count = min(room, remaining)
+            self.buffer[self.buffer_len:self.buffer_len + count] = data[offset:offset + count]
+            self.buffer_len += count
+            offset += count
+            remaining -= count
+            if count == room:
+                self._seal()
+
+    def _seal(self):
+        # Hand the full block to the job and carry on in the spare; sealed bytes count as written
+        # for the alignment of the next block
+        self.sealed, self.sealed_len = self.buffer, self.buffer_len
+        self.buffer = self.spare
+        self.buffer_view = memoryview(self.buffer)
+        self.spare = None
+        self.buffer_len = 0
+        self.current_size += self.sealed_len
+
+    def _append(self, data):
+        try:
+            with open(self._file_path(self.current_index), 'ab') as f:
+                f.write(data)
+        except OSError as e:
+            self.write_errors += 1
+            print(f"Flash log write failed: {e}")
+
+    def _write_sealed(self):
+        if self.sealed is None:
+            return
+        # current_size already includes the block; it ends exactly on the file's last block
+        self._append(memoryview(self.sealed)[:self.sealed_len])
+        if self.current_size >= self.file_size:
+            self._rotate()
+        self.spare = self.sealed
+        self.sealed = None
+        self.sealed_len = 0
+        if self.dropped:
+            print(f"Flash log dropped {self.dropped} entries")
+            self.dropped = 0
+
+    def flush(self):
+        # Everything buffered out to flash: from the job, a log read and before a reset
+        self._write_sealed()
+        if self.buffer_len:
+            if self.current_size >= self.file_size:
+                self._rotate()
+            self._append(self.buffer_view[:self.buffer_len])
+            self.current_size += self.buffer_len
+            self.buffer_len = 0
+        self.last_flush = utime.ticks_ms()
+
+    def flush_job(self):
+        # Scheduler job: a sealed block goes out right away, a partial one every flush_interval
+        self._write_sealed()
+        if utime.ticks_diff(utime.ticks_ms(), self.last_flush) >= self.flush_interval * 1000:
+            self.flush()
+
+    def read_chunk(self, file_age, offset, length=None):
+        # file_age 0 is the file currently being written, 1 the one before it, ...
+        if file_age < 0 or file_age >= self.file_count:
+            return None, 0
+        self.flush()
+        length = min(length or self.chunk_size, self.chunk_size)
+        index = (self.current_index - file_age) % self.file_count
+        try:
+            total = os.stat(self._file_path(index))[6]
+            with open(self._file_path(index), 'rb') as f:
+                f.seek(offset)
+                return f.read(length), total
+        except OSError:
+            return None, 0
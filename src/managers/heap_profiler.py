@@ -0,0 +1,136 @@
+import gc
+from managers.perf_manager import NullSpan
+
+
+class HeapStage:
+    # Context manager measuring the heap one stage allocates; like perf spans, one instance per name
+    def __init__(self, profiler, name, awaits=False):
+        self.profiler = profiler
+        self.name = name
+        self.awaits = awaits
+        self.calls = 0
+        self.bytes = 0
+        self.max_bytes = 0
+        self.start = 0
+        self.child_bytes = 0
+        self.parent = None
+
+    def __enter__(self):
+        self.profiler._enter(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.profiler._exit(self)
+        return False
+
+
+class HeapProfiler:
+    # Brackets main-loop stages with gc.mem_alloc() deltas. Automatic collection is off inside the
+    # window so a collection can't make a delta negative. Nested stages are counted exclusively: an
+    # inner stage's bytes are taken out of the stage around it. A stage that awaits (awaits=True)
+    # leaves collection on, since the tasks that run in between would otherwise hit MemoryError
+    # with nothing to free the heap; its figures are reported as approximate, a collection inside
+    # the window can hide allocations and other tasks' allocations are counted in.
+    def __init__(self):
+        self.enabled = False
+        self.stages = {}
+        self.null_stage = NullSpan()
+        self.current = None
+        self.gc_holds = 0  # Synchronous stages currently running with collection off
+        self.gc_was_enabled = True
+        self.ticks = 0
+        self.min_free = 16384
+        self.publish_interval = 60
+        self.top_count = 5
+
+    def configure(self, config):
+        self.enabled = bool(config.HEAP_PROFILE_ENABLED)
+        self.min_free = config.HEAP_PROFILE_MIN_FREE or 16384
+        self.publish_interval = config.HEAP_PROFILE_PUBLISH_INTERVAL or 60
+        self.top_count = config.HEAP_PROFILE_TOP_COUNT or 5
+
+    def stage(self, name, awaits=False):
+        if not self.enabled:
+            return self.null_stage
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = HeapStage(self, name, awaits)
+            self.stages[name] = stage
+        return stage
+
+    def _enter(self, stage):
+        if not stage.awaits:
+            if self.gc_holds == 0:
+                self.gc_was_enabled = gc.isenabled()
+                # With automatic collection off an exhausted heap raises MemoryError, so make room first
+                if gc.mem_free() < self.min_free:
+                    gc.collect()
+                gc.disable()
+            self.gc_holds += 1
+        stage.child_bytes = 0
+        stage.parent = self.current
+        self.current = stage
+        stage.start = gc.mem_alloc()
+
+    def _exit(self, stage):
+        allocated = gc.mem_alloc() - stage.start
+        self.current = stage.parent
+        if stage.parent is not None:
+            stage.parent.child_bytes += allocated
+        own = allocated - stage.child_bytes
+        if own < 0:
+            own = 0  # Only a collection lowers mem_alloc(); whatever was freed isn't this stage's allocation
+        stage.calls += 1
+        stage.bytes += own
+        if own > stage.max_bytes:
+            stage.max_bytes = own
+        stage.parent = None
+        if not stage.awaits:
+            self.gc_holds -= 1
+            if self.gc_holds == 0 and self.gc_was_enabled:
+                gc.enable()
+
+    def tick(self):
+        # One main-loop iteration (sample period); per-tick figures are averaged over these
+        if self.enabled:
+            self.ticks += 1
+
+    def set_enabled(self, enabled):
+        if enabled and not self.enabled:
+            self.reset()
+        self.enabled = enabled
+
+    def top(self, count=None):
+        # [(name, bytes per tick)] of the heaviest stages first
+        ticks = self.ticks or 1
+        ranked = sorted(self.stages.values(), key=lambda stage: stage.bytes, reverse=True)
+        return [(stage.name, stage.bytes // ticks) for stage in ranked[:count or self.top_count]]
+
+    def get_report(self):
+        ticks = self.ticks or 1
+        stages = {}
+        for stage in self.stages.values():
+            stages[stage.name] = {
+                "calls": stage.calls,
+                "bytes": stage.bytes,
+                "bytes_per_tick": stage.bytes // ticks,
+                "bytes_per_call": stage.bytes // stage.calls if stage.calls else 0,
+                "max_bytes": stage.max_bytes,
+                "approximate": stage.awaits
+            }
+        return {
+            "ticks": self.ticks,
+            "top": [name for name, _ in self.top()],
+            "stages": stages
+        }
+
+    def reset(self):
+        for stage in self.stages.values():
+            stage.calls = 0
+            stage.bytes = 0
+            stage.max_bytes = 0
+        self.ticks = 0
+
+
+# Shared instance so any module can bracket a stage without being handed a manager
+heap_profiler = HeapProfiler()
@@ -0,0 +1,54 @@
+import utime
+from array import array
+from managers import event_bus as events
+from managers.event_bus import event_bus
+
+
+class HistoryStore:
+    # Downsampled sensor history in RAM: one float ring per channel sharing one timestamp ring.
+    # Read oldest-first by index so streaming it out needs no copies.
+    def __init__(self, config, log_mgr):
+        self.log_mgr = log_mgr
+        self.channels = tuple(config.HISTORY_CHANNELS or ("temperature", "humidity", "pressure", "gas", "lux", "mic"))
+        self.size = config.HISTORY_SIZE or 288
+        self.interval_ms = (config.HISTORY_INTERVAL or 300) * 1000
+        self.stamps = array('I', [0] * self.size)
+        self.values = [array('f', [0] * self.size) for _ in self.channels]
+        self.head = 0
+        self.count = 0
+        self.last_sample = None
+        event_bus.subscribe(events.SENSOR_SAMPLE, self.on_sensor_sample)
+
+    def channel_index(self, name):
+        for index, channel in enumerate(self.channels):
+            if channel == name:
+                return index
+        return -1
+
+    def on_sensor_sample(self, record):
+        if not record.get("status"):
+            return  # The BME68X hasn't delivered a reading yet, the record still holds its zeros
+        now = utime.ticks_ms()
+        if self.last_sample is not None and utime.ticks_diff(now, self.last_sample) < self.interval_ms:
+            return
+        self.last_sample = now
+        head = self.head
+        self.stamps[head] = utime.time()
+        for index, channel in enumerate(self.channels):
+            value = record.get(channel)
+            self.values[index][head] = value if isinstance(value, (int, float)) else 0
+        head += 1
+        self.head = 0 if head == self.size else head
+        if self.count < self.size:
+            self.count += 1
+
+    def position(self, offset):
+        # Ring position of the offset-th oldest entry
+        position = self.head - self.count + offset
+        return position + self.size if position < 0 else position
+
+    def stamp_at(self, offset):
+        return self.stamps[self.position(offset)]
+
+    def value_at(self, channel, offset):
+        return self.values[channel][self.position(offset)]
@@ -0,0 +1,291 @@
+import socket
+import uasyncio
+import utime
+
+
+class HTTPResponse:
+    # The part of urequests' Response the managers use; the body is read completely before returning
+    def __init__(self, status_code, content):
+        self.status_code = status_code
+        self.content = content
+
+    @property
+    def text(self):
+        return str(self.content, "utf-8")
+
+    def json(self):
+        import json
+        return json.loads(self.content)
+
+    def close(self):
+        self.content = None
+
+
+class Connection:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.last_used = utime.ticks_ms()
+        self.requests = 0
+
+    def close(self):
+        try:
+            self.writer.close()
+        except Exception:
+            pass
+
+
+class HTTPClient:
+    # Async HTTP/1.1 client shared by everything that talks to web services. Per host it keeps up
+    # to pool_size connections open between requests, so DNS, the TCP handshake and (for https)
+    # the TLS handshake are paid once per connection instead of once per request. That only helps
+    # requests closer together than keepalive_ms (InfluxDB queries, a retried fetch): the weather
+    # refresh every WEATHER_UPDATE_INTERVAL_IN_MINUTES outlives both the pool and the DNS cache,
+    # and there is no TLS session resumption, so each refresh pays the full handshake.
+    def __init__(self):
+        self.pool_size = 1
+        self.keepalive_ms = 30000
+        self.dns_ttl_ms = 300000
+        self.connect_timeout_ms = 10000
+        self.read_timeout_ms = 10000
+        self.max_response = 16384
+        self.idle = {}  # "host:port" -> [Connection]
+        self.busy = {}  # "host:port" -> connections handed out
+        self.dns_cache = {}  # host -> (ip, resolved at)
+        self.ssl_context = None
+        self.requests = 0
+        self.reused = 0
+        self.connects = 0
+        self.dns_lookups = 0
+
+    def configure(self, config):
+        self.pool_size = min(max(config.HTTP_CLIENT_POOL_SIZE or 1, 1), 2)
+        self.keepalive_ms = (config.HTTP_CLIENT_KEEPALIVE or 30) * 1000
+        self.dns_ttl_ms = (config.HTTP_CLIENT_DNS_TTL or 300) * 1000
+        self.connect_timeout_ms = config.HTTP_CLIENT_CONNECT_TIMEOUT_MS or 10000
+        self.read_timeout_ms = config.HTTP_CLIENT_READ_TIMEOUT_MS or 10000
+        self.max_response = config.HTTP_CLIENT_MAX_RESPONSE or 16384
+
+    async def get(self, url, headers=None):
+        return await self.request("GET", url, headers)
+
+    async def post(self, url, headers=None, data=None):
+        return await self.request("POST", url, headers, data)
+
+    async def request(self, method, url, headers=None, data=None):
+        tls, host, port, path = self._parse_url(url)
+        if isinstance(data, str):
+            data = data.encode()
+        key = f"{host}:{port}"
+        connection = await self._acquire(key, host, port, tls)
+        reused = connection.requests > 0
+        try:
+            try:
+                response, keep = await self._exchange(connection, method, host, path, headers, data)
+            except OSError:
+                if not reused or method not in ("GET", "HEAD"):
+                    raise
+                # Most likely the server dropped the idle connection while it sat in the pool. Only
+                # idempotent requests go out once more on a fresh connection: a POST may have been
+                # processed before the connection broke, and sending it again could repeat it.
+                connection.close()
+                connection = await self._open(host, port, tls)
+                response, keep = await self._exchange(connection, method, host, path, headers, data)
+            self.requests += 1
+            if reused:
+                self.reused += 1
+        except Exception:
+            connection.close()
+            self._release(key, None)
+            raise
+        self._release(key, connection if keep else None)
+        return response
+
+    def _parse_url(self, url):
+        scheme, _, rest = url.partition("://")
+        if scheme not in ("http", "https"):
+            raise ValueError(f"Unsupported URL: {url}")
+        tls = scheme == "https"
+        authority, slash, path = rest.partition("/")
+        host, _, port = authority.partition(":")
+        return tls, host, int(port) if port else (443 if tls else 80), slash + path or "/"
+
+    def resolve(self, host, port):
+        # MicroPython's getaddrinfo blocks and doesn't report record TTLs, so an answer is kept
+        # for dns_ttl_ms and dropped early when a connect to it fails
+        now = utime.ticks_ms()
+        cached = self.dns_cache.get(host)
+        if cached and utime.ticks_diff(now, cached[1]) < self.dns_ttl_ms:
+            return cached[0]
+        self.dns_lookups += 1
+        address = socket.getaddrinfo(host, port)[0][-1]
+        self.dns_cache[host] = (address, now)
+        return address
+
+    def _take_idle(self, key):
+        idle = self.idle.get(key)
+        now = utime.ticks_ms()
+        while idle:
+            connection = idle.pop()
+            if utime.ticks_diff(now, connection.last_used) < self.keepalive_ms:
+                self.busy[key] = self.busy.get(key, 0) + 1
+                return connection
+            connection.close()  # Past the server's keep-alive timeout, it is likely gone already
+        return None
+
+    async def _acquire(self, key, host, port, tls):
+        connection = self._take_idle(key)
+        if connection:
+            return connection
+        waited = 0
+        while self.busy.get(key, 0) >= self.pool_size:
+            # Every connection to this host is in use; wait for one to come back
+            if waited >= self.connect_timeout_ms:
+                raise OSError(110, "ETIMEDOUT")
+            await uasyncio.sleep_ms(20)
+            waited += 20
+            connection = self._take_idle(key)
+            if connection:
+                return connection
+        self.busy[key] = self.busy.get(key, 0) + 1
+        try:
+            return await self._open(host, port, tls)
+        except Exception:
+            self.busy[key] -= 1
+            raise
+
+    async def _open(self, host, port, tls):
+        address = self.resolve(host, port)
+        try:
+            if tls:
+                reader, writer = await uasyncio.wait_for_ms(
+                    uasyncio.open_connection(address[0], address[1], ssl=self._ssl_context(), server_hostname=host),
+                    self.connect_timeout_ms)
+            else:
+                reader, writer = await uasyncio.wait_for_ms(
+                    uasyncio.open_connection(address[0], address[1]), self.connect_timeout_ms)
+        except Exception:
+            self.dns_cache.pop(host, None)  # Maybe the host moved, look it up again next time
+            raise
+        self.connects += 1
+        return Connection(reader, writer)
+
+    def _ssl_context(self):
+        # One context for every TLS connection so its setup is done once. MicroPython's ssl has no
+        # session resumption, keeping the connection open is what saves the handshake.
+        if self.ssl_context is None:
+            import ssl
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+            context.verify_mode = ssl.CERT_NONE  # Same as urequests, no CA bundle on the device
+            self.ssl_context = context
+        return self.ssl_context
+
+    def _release(self, key, connection):
+        self.busy[key] -= 1
+        if connection is not None:
+            connection.last_used = utime.ticks_ms()
+            self.idle.setdefault(key, []).append(connection)
+
+    async def _exchange(self, connection, method, host, path, headers, data):
+        writer = connection.writer
+        request = f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nConnection: keep-alive\r\n"
+        if data is not None:
+            request += f"Content-Length: {len(data)}\r\n"
+        if headers:
+            for name, value in headers.items():
+                request += f"{name}: {value}\r\n"
+        writer.write((request + "\r\n").encode())
+        if data:
+            writer.write(data)
+        await uasyncio.wait_for_ms(writer.drain(), self.read_timeout_ms)
+        connection.requests += 1
+
+        status_line = await self._readline(connection)
+        if not status_line:
+            raise OSError(104, "ECONNRESET")  # Closed without an answer
+        parts = status_line.split(None, 2)
+        status = int(parts[1])
+        keep = parts[0] == b"HTTP/1.1"
+        length = None
+        chunked = False
+        while True:
+            line = await self._readline(connection)
+            if not line or line == b"\r\n":
+                break
+            name, _, value = line.partition(b":")
+            name = name.strip().lower()
+            value = value.strip()
+            if name == b"content-length":
+                length = int(value)
+            elif name == b"transfer-encoding":
+                chunked = value.lower() == b"chunked"
+            elif name == b"connection":
+                keep = value.lower() != b"close"
+
+        if method == "HEAD" or status in (204, 304):
+            content = b""
+        elif chunked:
+            content = await self._read_chunked(connection)
+        elif length is not None:
+            if length > self.max_response:
+                raise ValueError(f"Response too large: {length} bytes")
+            content = await self._read_exactly(connection, length)
+        else:
+            content = await self._read_to_close(connection)
+            keep = False
+        return HTTPResponse(status, content), keep
+
+    async def _readline(self, connection):
+        return await uasyncio.wait_for_ms(connection.reader.readline(), self.read_timeout_ms)
+
+    async def _read_exactly(self, connection, length):
+        content = bytearray(length)
+        view = memoryview(content)
+        received = 0
+        while received < length:
+            data = await uasyncio.wait_for_ms(connection.reader.read(length - received), self.read_timeout_ms)
+            if not data:
+                raise OSError(104, "ECONNRESET")
+            view[received:received + len(data)] = data
+            received += len(data)
+        return bytes(content)
+
+    async def _read_chunked(self, connection):
+        content = b""
+        while True:
+            size = int((await self._readline(connection)).split(b";")[0], 16)
+            if size == 0:
+                await self._readline(connection)  # Blank line after the last chunk, no trailers expected
+                return content
+            if len(content) + size > self.max_response:
+                raise ValueError(f"Response larger than {self.max_response} bytes")
+            content += await self._read_exactly(connection, size)
+            await self._readline(connection)
+
+    async def _read_to_close(self, connection):
+        content = b""
+        while True:
+            data = await uasyncio.wait_for_ms(connection.reader.read(1024), self.read_timeout_ms)
+            if not data:
+                return content
+            content += data
+            if len(content) > self.max_response:
+                raise ValueError(f"Response larger than {self.max_response} bytes")
+
+    def close(self):
+        for connections in self.idle.values():
+            for connection in connections:
+                connection.close()
+        self.idle = {}
+
+    def get_stats(self):
+        return {
+            "requests": self.requests,
+            "reused": self.reused,
+            "connects": self.connects,
+            "dns_lookups": self.dns_lookups
+        }
+
+
+# Shared instance so the weather and Influx requests pool their connections
+http_client = HTTPClient()
@@ -0,0 +1,283 @@
+import gc
+import uasyncio
+import utime
+
+INF = float('inf')
+
+
+class ResponseBuffer:
+    # One buffer shared by every response. Handlers fill it and hand it to writer.write() without
+    # yielding in between, and only await drain() once it is flushed, so concurrent scrapes never
+    # see each other's bytes and a response is built without allocating per line.
+    def __init__(self, size):
+        self.size = size
+        self.buffer = bytearray(size)
+        self.view = memoryview(self.buffer)
+        self.pos = 0
+        self.writer = None
+
+    def start(self, writer):
+        self.writer = writer
+        self.pos = 0
+
+    def add(self, data):
+        length = len(data)
+        if self.pos + length > self.size:
+            self.flush()
+            if length > self.size:
+                self.writer.write(data)
+                return
+        self.buffer[self.pos:self.pos + length] = data
+        self.pos += length
+
+    def add_int(self, value):
+        if value >= 100000000000 or value <= -100000000000:
+            self.add(str(value).encode())
+            return
+        if self.pos + 12 > self.size:
+            self.flush()
+        buffer = self.buffer
+        pos = self.pos
+        if value < 0:
+            buffer[pos] = 45  # "-"
+            pos += 1
+            value = -value
+        divisor = 1
+        while divisor * 10 <= value:
+            divisor *= 10
+        while divisor:
+            buffer[pos] = 48 + (value // divisor) % 10
+            pos += 1
+            divisor //= 10
+        self.pos = pos
+
+    def add_number(self, value):
+        # Integers as they are, floats with two decimals, booleans as 0/1
+        if value is True or value is False:
+            self.add_int(1 if value else 0)
+        elif isinstance(value, int):
+            self.add_int(value)
+        elif not isinstance(value, float) or value != value:
+            self.add(b"NaN")
+        elif value == INF or value == -INF:
+            self.add(b"+Inf" if value > 0 else b"-Inf")
+        else:
+            scaled = int(value * 100 + (0.5 if value >= 0 else -0.5))
+            if scaled < 0:
+                self.add(b"-")
+                scaled = -scaled
+            self.add_int(scaled // 100)
+            fraction = scaled % 100
+            self.add(b".0" if fraction < 10 else b".")
+            self.add_int(fraction)
+
+    def add_str(self, value):
+        self.add(value.encode() if isinstance(value, str) else value)
+
+    def flush(self):
+        if self.pos:
+            self.writer.write(self.view[:self.pos])
+            self.pos = 0
+
+
+class HTTPServer:
+    # Read-only local endpoints: /metrics (Prometheus text), /status (JSON) and
+    # /history?channel=<name>[&since=<epoch>] (CSV streamed from the HistoryStore)
+    STATUS_LINES = {
+        200: b"HTTP/1.1 200 OK\r\n",
+        400: b"HTTP/1.1 400 Bad Request\r\n",
+        404: b"HTTP/1.1 404 Not Found\r\n",
+        503: b"HTTP/1.1 503 Service Unavailable\r\n",
+    }
+    CONTENT_TYPES = {
+        "metrics": b"Content-Type: text/plain; version=0.0.4\r\n",
+        "json": b"Content-Type: application/json\r\n",
+        "csv": b"Content-Type: text/csv\r\n",
+        "text": b"Content-Type: text/plain\r\n",
+    }
+    END_OF_HEADERS = b"Connection: close\r\n\r\n"
+
+    def __init__(self, config, log_mgr, app, history=None):
+        self.log_mgr = log_mgr
+        self.app = app
+        self.history = history
+        self.port = config.HTTP_SERVER_PORT or 80
+        self.max_clients = config.HTTP_MAX_CLIENTS or 2
+        self.timeout_ms = config.HTTP_REQUEST_TIMEOUT_MS or 5000
+        self.out = ResponseBuffer(config.HTTP_BUFFER_SIZE or 512)
+        self.server = None
+        self.clients = 0
+        self.requests = 0
+        self.rejected = 0
+
+        # Everything constant about the responses is encoded once here
+        self.record_metrics = []
+        self._compile_record("enviro", app.enviro_plus.sensor_data)
+        self._compile_record("system", app.system_mgr.system_record)
+        self._compile_record("wifi", app.wifi_mgr.wifi_record)
+        self.live_metrics = [
+            (self._metric_prefix("heap_free_bytes", "gauge"), gc.mem_free),
+            (self._metric_prefix("heap_alloc_bytes", "gauge"), gc.mem_alloc),
+            (self._metric_prefix("scheduler_load_pct", "gauge"), app.scheduler.get_load),
+            (self._metric_prefix("http_requests_total", "counter"), lambda: self.requests),
+        ]
+        self.sensor_fields = [(f'"{name}":'.encode(), name) for name, value in app.enviro_plus.sensor_data.items()]
+
+    def _metric_prefix(self, name, kind):
+        return f"# TYPE enviro_pi_{name} {kind}\nenviro_pi_{name} ".encode()
+
+    def _compile_record(self, group, record):
+        # Numeric and boolean fields only; text fields like uptime don't fit the exposition format
+        for name, value in record.items():
+            if isinstance(value, (int, float)):
+                self.record_metrics.append((self._metric_prefix(f"{group}_{name}", "gauge"), record, name))
+
+    async def start(self):
+        self.server = await uasyncio.start_server(self._handle, "0.0.0.0", self.port)
+        self.log_mgr.log(f"HTTP server listening on port {self.port}")
+
+    def stop(self):
+        if self.server:
+            self.server.close()
+            self.server = None
+
+    async def _handle(self, reader, writer):
+        # A client holds its slot from accept until the last byte is drained and the socket closed,
+        # so slow readers count against the limit as well as the handlers themselves
+        busy = self.clients >= self.max_clients
+        if not busy:
+            self.clients += 1
+        try:
+            request_line = await uasyncio.wait_for_ms(reader.readline(), self.timeout_ms)
+            while True:
+                header = await uasyncio.wait_for_ms(reader.readline(), self.timeout_ms)
+                if not header or header == b"\r\n":
+                    break
+            if busy:
+                # Sampling comes first: over the limit a scrape is turned away instead of queued
+                self.rejected += 1
+                self._error(writer, 503, b"Busy, try again\n")
+            else:
+                await self._respond(writer, request_line)
+            self.out.flush()
+            await uasyncio.wait_for_ms(writer.drain(), self.timeout_ms)
+        except Exception as e:
+            if not isinstance(e, uasyncio.TimeoutError):
+                self.log_mgr.log(f"HTTP request failed: {e}")
+        finally:
+            try:
+                writer.close()
+                await writer.wait_closed()
+            except Exception:
+                pass
+            if not busy:
+                self.clients -= 1
+
+    async def _respond(self, writer, request_line):
+        parts = request_line.split()
+        if len(parts) < 2 or parts[0] != b"GET":
+            self._error(writer, 400, b"Only GET is supported\n")
+            return
+        self.requests += 1
+        path, _, query = parts[1].decode().partition("?")
+        if path == "/metrics":
+            self._write_metrics(writer)
+        elif path == "/status":
+            self._write_status(writer)
+        elif path == "/history":
+            await self._write_history(writer, self._parse_query(query))
+        else:
+            self._error(writer, 404, b"Try /metrics, /status or /history?channel=<name>\n")
+
+    def _parse_query(self, query):
+        params = {}
+        for pair in query.split("&"):
+            key, _, value = pair.partition("=")
+            if key:
+                params[key] = value
+        return params
+
+    def _begin(self, writer, status, content_type):
+        out = self.out
+        out.start(writer)
+        out.add(self.STATUS_LINES[status])
+        out.add(self.CONTENT_TYPES[content_type])
+        out.add(self.END_OF_HEADERS)
+
+    def _error(self, writer, status, message):
+        self._begin(writer, status, "text")
+        self.out.add(message)
+
+    def _write_metrics(self, writer):
+        self._begin(writer, 200, "metrics")
+        out = self.out
+        for prefix, record, name in self.record_metrics:
+            out.add(prefix)
+            out.add_number(getattr(record, name))
+            out.add(b"\n")
+        for prefix, getter in self.live_metrics:
+            out.add(prefix)
+            out.add_number(getter())
+            out.add(b"\n")
+
+    def _write_status(self, writer):
+        app = self.app
+        self._begin(writer, 200, "json")
+        out = self.out
+        out.add(b'{"status":"')
+        out.add_str(app.system_mgr.get_status())
+        out.add(b'","uptime_ms":')
+        out.add_int(utime.ticks_diff(utime.ticks_ms(), app.system_mgr.start_time))
+        out.add(b',"display_mode":"')
+        out.add_str(app.enviro_plus.display_mode)
+        out.add(b'","wifi_connected":')
+        out.add(b"true" if app.wifi_mgr.link_up else b"false")
+        out.add(b',"mqtt_connected":')
+        out.add(b"true" if app.mqtt_mgr and app.mqtt_mgr.is_connected else b"false")
+        out.add(b',"heap_free":')
+        out.add_int(gc.mem_free())
+        out.add(b',"sensor":{')
+        record = app.enviro_plus.sensor_data
+        for index, (key, name) in enumerate(self.sensor_fields):
+            if index:
+                out.add(b",")
+            out.add(key)
+            value = getattr(record, name)
+            if isinstance(value, str):
+                out.add(b'"')
+                out.add_str(value)
+                out.add(b'"')
+            else:
+                out.add_number(value)
+        out.add(b"}}\n")
+
+    async def _write_history(self, writer, params):
+        history = self.history
+        channel = history.channel_index(params.get("channel", "")) if history else -1
+        if channel < 0:
+            channels = ", ".join(history.channels) if history else "none"
+            self._error(writer, 404, f"Unknown channel, available: {channels}\n".encode())
+            return
+        try:
+            since = int(params.get("since", 0))
+        except ValueError:
+            self._error(writer, 400, b"since must be an epoch timestamp\n")
+            return
+
+        self._begin(writer, 200, "csv")
+        out = self.out
+        out.add(b"timestamp,value\n")
+        offset = 0
+        while offset < history.count:
+            stamp = history.stamp_at(offset)
+            if stamp >= since:
+                out.add_int(stamp)
+                out.add(b",")
+                out.add_number(history.value_at(channel, offset))
+                out.add(b"\n")
+            offset += 1
+            if out.pos > out.size - 32:
+                # Hand the chunk over and let sampling run before filling the buffer again
+                out.flush()
+                await uasyncio.wait_for_ms(writer.drain(), self.timeout_ms)
+                out.start(writer)  # Another scrape may have used the buffer meanwhile
@@ -1,6 +1,6 @@
-import urequests
 import utime
-import uasyncio
+from managers.perf_manager import perf
+from managers.http_client import http_client
 
 class InfluxDataManager:
     def __init__(self, config, log_manager):
@@ -11,25 +11,26 @@ class InfluxDataManager:
         self.bucket = config.INFLUXDB_BUCKET
         self.token = config.INFLUXDB_TOKEN
         self.lookup_interval_in_days = config.INFLUXDB_LOOKUP_INTERVAL
+        self.wifi_manager = None
+        http_client.configure(config)  # Shared with DataManager's weather fetch, which may not have run yet
+
+    def set_wifi_manager(self, wifi_manager):
+        self.wifi_manager = wifi_manager
 
     async def _query_influxdb(self, query):
+        if self.wifi_manager and not self.wifi_manager.link_up:
+            self.log_manager.log("WiFi link down, skipping InfluxDB query")
+            return None
         url = f"{self.base_url}/query?org={self.org}"
         headers = {
             "Authorization": f"Token {self.token}",
             "Content-Type": "application/vnd.flux",
             "Accept": "application/csv"
         }
+        response = None
         try:
-            response = None
-            request_sent = False
-            while not request_sent:
-                try:
-                    response = urequests.post(url, headers=headers, data=query)
-                    request_sent = True
-                except OSError as e:
-                    if e.errno != 11:  # EAGAIN error
-                        raise
-                await uasyncio.sleep(0)  # Yield control
+            with perf.span("influx_query"):
+                response = await http_client.post(url, headers=headers, data=query)
 
             if response.status_code == 200:
                 return response.text
@@ -0,0 +1,248 @@
+import utime
+import uasyncio
+
+
+class Job:
+    def __init__(self, name, period_ms, callback, deadline_ms=None, priority=0, skippable=False, retry_ms=None):
+        self.name = name
+        self.period_ms = period_ms
+        self.callback = callback
+        # Relative to the release time; a job finishing later than this counts as an overrun
+        self.deadline_ms = deadline_ms if deadline_ms is not None else period_ms
+        self.priority = priority
+        self.skippable = skippable
+        self.retry_ms = retry_ms
+        self.next_due = utime.ticks_ms()
+        self.trace_id = 0  # Registered once a trace recorder is attached
+        self.task = None  # A coroutine job's task while it is in flight
+        self.started = 0
+
+        self.runs = 0
+        self.overruns = 0
+        self.skipped = 0
+        self.skip_streak = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.max_lateness_ms = 0
+        self.total_lateness_ms = 0
+        self.max_runtime_ms = 0
+        self.last_runtime_ms = 0
+
+    def get_stats(self):
+        avg_lateness = round(self.total_lateness_ms / self.runs, 1) if self.runs else 0
+        return {
+            "runs": self.runs,
+            "overruns": self.overruns,
+            "skipped": self.skipped,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "max_late_ms": self.max_lateness_ms,
+            "avg_late_ms": avg_lateness,
+            "max_run_ms": self.max_runtime_ms,
+            "last_run_ms": self.last_runtime_ms
+        }
+
+
+class JobScheduler:
+    # A skippable job is never dropped more than this many releases in a row
+    MAX_SKIP_STREAK = 3
+    # Longest idle wait while every due job is still in flight
+    IN_FLIGHT_POLL_MS = 100
+
+    def __init__(self, log_mgr):
+        self.log_mgr = log_mgr
+        self.jobs = []
+        self.idle_handler = None
+        self.watchdog = None
+        self.hang_timeout_ms = 0
+        self.hang_reported = False
+        self.started = utime.ticks_ms()
+        self.busy_ms = 0
+        self.tracer = None
+        self.idle_trace_id = 0
+
+    def add_job(self, name, period_ms, callback, deadline_ms=None, priority=0, skippable=False, retry_ms=None):
+        job = Job(name, period_ms, callback, deadline_ms, priority, skippable, retry_ms)
+        if self.tracer:
+            job.trace_id = self.tracer.name_id(f"job:{name}")
+        self.jobs.append(job)
+        return job
+
+    def set_tracer(self, tracer):
+        # The trace recorder is only imported once a trace is requested; jobs register their names then
+        self.tracer = tracer
+        self.idle_trace_id = tracer.name_id("idle")
+        for job in self.jobs:
+            job.trace_id = tracer.name_id(f"job:{job.name}")
+
+    def get_job(self, name):
+        for job in self.jobs:
+            if job.name == name:
+                return job
+        return None
+
+    def trigger(self, name):
+        # Make the job due right away; it runs at the scheduler's next wake-up
+        job = self.get_job(name)
+        if job:
+            job.next_due = utime.ticks_ms()
+
+    def set_idle_handler(self, handler):
+        # handler(delay_ms) is awaited instead of uasyncio.sleep_ms while no job is due
+        self.idle_handler = handler
+
+    def set_watchdog(self, feed, hang_timeout_ms):
+        # feed() is called after every pass of the loop, so a job that blocks the loop starves the
+        # watchdog. A coroutine job can't block it, so feeding also stops once one has been in
+        # flight for longer than hang_timeout_ms.
+        self.watchdog = feed
+        self.hang_timeout_ms = hang_timeout_ms
+
+    def in_flight(self):
+        # Number of coroutine jobs currently running as tasks
+        return sum(1 for job in self.jobs if job.task is not None)
+
+    def _hung_job(self, now):
+        for job in self.jobs:
+            if job.task is not None and utime.ticks_diff(now, job.started) > self.hang_timeout_ms:
+                return job
+        return None
+
+    def next_deadline(self):
+        deadline = None
+        for job in self.jobs:
+            if job.task is None and (deadline is None or utime.ticks_diff(job.next_due, deadline) < 0):
+                deadline = job.next_due
+        if deadline is None:
+            # Everything is in flight; look again soon, a finished job may be due by then
+            deadline = utime.ticks_add(utime.ticks_ms(), self.IN_FLIGHT_POLL_MS)
+        return deadline
+
+    def _next_job(self, now):
+        # Highest priority among the due jobs, the one released first on a tie. A job still in
+        # flight isn't released again; its missed releases are coalesced once it finishes.
+        best = None
+        for job in self.jobs:
+            if job.task is not None or utime.ticks_diff(now, job.next_due) < 0:
+                continue
+            if best is None or job.priority > best.priority or (
+                    job.priority == best.priority and utime.ticks_diff(job.next_due, best.next_due) < 0):
+                best = job
+        return best
+
+    async def _run_job(self, job, now):
+        lateness = utime.ticks_diff(now, job.next_due)
+        # Releases missed while the job waited are merged into this run instead of being replayed
+        missed = lateness // job.period_ms if job.period_ms > 0 else 0
+        released = job.next_due
+        job.next_due = utime.ticks_add(job.next_due, job.period_ms * (missed + 1))
+        job.coalesced += missed
+
+        if job.skippable and lateness > job.deadline_ms and job.skip_streak < self.MAX_SKIP_STREAK:
+            # Overloaded: the result would be stale anyway, so give the time to the jobs behind it
+            job.skipped += 1
+            job.skip_streak += 1
+            return
+        job.skip_streak = 0
+
+        result = None
+        tracer = self.tracer
+        if tracer:
+            tracer.begin(job.trace_id)
+        try:
+            result = job.callback()
+        except Exception as e:
+            job.errors += 1
+            self.log_mgr.log(f"Error in job {job.name}: {e}")
+        if tracer:
+            tracer.end(job.trace_id)
+
+        # MicroPython coroutines are generators without __await__; uasyncio checks for send too
+        if hasattr(result, "send"):
+            # Run it as its own task so its network and sleep waits don't hold up the jobs behind it
+            job.started = now
+            job.task = uasyncio.create_task(self._run_task(job, result, now, released, lateness))
+            # Only the stretch up to its first wait counts as load, later steps interleave with idle
+            start = utime.ticks_ms()
+            await uasyncio.sleep_ms(0)
+            self.busy_ms += utime.ticks_diff(utime.ticks_ms(), start)
+            return
+
+        end = utime.ticks_ms()
+        self.busy_ms += utime.ticks_diff(end, now)
+        self._finish_job(job, result, now, released, lateness)
+
+    async def _run_task(self, job, coro, now, released, lateness):
+        result = None
+        tracer = self.tracer
+        if tracer:
+            tracer.begin(job.trace_id)
+        try:
+            result = await coro
+        except Exception as e:
+            job.errors += 1
+            self.log_mgr.log(f"Error in job {job.name}: {e}")
+        finally:
+            job.task = None
+            if tracer:
+                tracer.end(job.trace_id)
+        self._finish_job(job, result, now, released, lateness)
+
+    def _finish_job(self, job, result, now, released, lateness):
+        # Runtime is start to completion, so for a coroutine job it includes its waits
+        end = utime.ticks_ms()
+        runtime = utime.ticks_diff(end, now)
+        job.runs += 1
+        job.last_runtime_ms = runtime
+        job.max_runtime_ms = max(job.max_runtime_ms, runtime)
+        job.max_lateness_ms = max(job.max_lateness_ms, lateness)
+        job.total_lateness_ms += lateness
+        if utime.ticks_diff(end, released) > job.deadline_ms:
+            job.overruns += 1
+
+        if result is False and job.retry_ms is not None:
+            # The job couldn't do its work (e.g. no broker), try again before the next period
+            retry_at = utime.ticks_add(end, job.retry_ms)
+            if utime.ticks_diff(retry_at, job.next_due) < 0:
+                job.next_due = retry_at
+
+    def _feed_watchdog(self):
+        hung = self._hung_job(utime.ticks_ms()) if self.hang_timeout_ms else None
+        if hung is None:
+            self.watchdog()
+        elif not self.hang_reported:
+            self.hang_reported = True
+            self.log_mgr.log(f"Job {hung.name} hung, no longer feeding the watchdog")
+
+    async def run(self):
+        while True:
+            if self.watchdog:
+                self._feed_watchdog()
+            now = utime.ticks_ms()
+            job = self._next_job(now)
+            if job:
+                await self._run_job(job, now)
+                await uasyncio.sleep_ms(0)  # Let other tasks in between jobs
+                continue
+
+            delay = utime.ticks_diff(self.next_deadline(), now)
+            tracer = self.tracer
+            if tracer:
+                tracer.begin(self.idle_trace_id)
+            if self.idle_handler:
+                await self.idle_handler(delay)
+            else:
+                await uasyncio.sleep_ms(delay)
+            if tracer:
+                tracer.end(self.idle_trace_id)
+
+    def get_load(self):
+        # Share of time spent in jobs since start, in percent
+        elapsed = utime.ticks_diff(utime.ticks_ms(), self.started)
+        return round(self.busy_ms * 100 / elapsed, 2) if elapsed > 0 else 0
+
+    def get_stats(self):
+        return {
+            "load_pct": self.get_load(),
+            "jobs": {job.name: job.get_stats() for job in self.jobs}
+        }
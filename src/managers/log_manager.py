@@ -5,6 +5,13 @@ class LogManager:
         self.buffer_size = 15
         self.buffer = []
         self.buffering_enabled = True
+        self.flash_sink = None
+
+    def set_flash_sink(self, flash_sink):
+        self.flash_sink = flash_sink
+        # Persist what was logged before the configuration (and thus the sink) was available
+        for log_entry in self.buffer:
+            self.flash_sink.write(log_entry)
 
     def log(self, message):
         timestamp = utime.localtime()
@@ -15,9 +22,21 @@ class LogManager:
             if len(self.buffer) >= self.buffer_size:
                 self.buffer.pop(0)
             self.buffer.append(log_entry)
+
+        if self.flash_sink:
+            self.flash_sink.write(log_entry)
         
         print(log_entry)  # Always print to console for immediate feedback
 
+    def flush(self):
+        if self.flash_sink:
+            self.flash_sink.flush()
+
+    def read_flash_log(self, file_age, offset):
+        if self.flash_sink is None:
+            return None, 0
+        return self.flash_sink.read_chunk(file_age, offset)
+
     def get_logs(self):
         return self.buffer
 
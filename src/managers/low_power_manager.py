@@ -0,0 +1,97 @@
+import machine
+from machine import Pin
+import utime
+import uasyncio
+
+
+class LowPowerManager:
+    def __init__(self, config, log_mgr, system_mgr):
+        self.config = config
+        self.log_mgr = log_mgr
+        self.system_mgr = system_mgr
+
+        # Sleep must end well before the watchdog (8 s) would bite, wherever it is in its period
+        self.max_sleep_ms = config.LOW_POWER_MAX_SLEEP_MS or 5000
+        self.min_sleep_ms = config.LOW_POWER_MIN_SLEEP_MS or 20
+        self.active_current_ma = config.LOW_POWER_ACTIVE_CURRENT_MA or 45
+        self.sleep_current_ma = config.LOW_POWER_SLEEP_CURRENT_MA or 2
+        self.supply_voltage = config.LOW_POWER_SUPPLY_VOLTAGE or 3.3
+
+        self.can_sleep = None
+        self.on_wake = None
+        self.wake_pins = []
+        self.pending_wake = 0
+
+        self.started = utime.ticks_ms()
+        self.sleep_ms_total = 0
+        self.sleeps = 0
+        self.refused = 0
+        self.wakeups_by_irq = 0
+        self.samples = 0
+
+    def set_sleep_condition(self, can_sleep):
+        self.can_sleep = can_sleep
+
+    def add_wake_pin(self, pin_number, index):
+        # Button IRQs wake the core from lightsleep; the handler only sets a bit (no allocation)
+        pin = Pin(pin_number, Pin.IN, Pin.PULL_UP)
+        bit = 1 << index
+
+        def handler(_):
+            self.pending_wake |= bit
+
+        pin.irq(trigger=Pin.IRQ_FALLING, handler=handler)
+        self.wake_pins.append(pin)
+
+    def count_sample(self):
+        self.samples += 1
+
+    def _handle_wake(self):
+        pending = self.pending_wake
+        if pending:
+            self.pending_wake = 0
+            if self.on_wake:
+                self.on_wake(pending)
+
+    async def idle(self, delay):
+        # JobScheduler idle handler: lightsleep until the next job is due when nothing else is running
+        self._handle_wake()
+        if delay <= 0:
+            await uasyncio.sleep_ms(0)
+            return
+
+        if delay >= self.min_sleep_ms and self.pending_wake == 0 and (self.can_sleep is None or self.can_sleep()):
+            delay = min(delay, self.max_sleep_ms)
+            self.system_mgr.wdt.feed()
+            start = utime.ticks_ms()
+            machine.lightsleep(delay)
+            self.system_mgr.wdt.feed()
+            self.system_mgr.last_wdt_feed = utime.ticks_ms()
+            slept = utime.ticks_diff(utime.ticks_ms(), start)
+            if slept >= self.min_sleep_ms or self.pending_wake:
+                self.sleep_ms_total += slept
+                self.sleeps += 1
+            else:
+                # lightsleep returned without stopping the core (the rp2 port does that while the
+                # radio has work pending); that time was spent awake, so the estimate leaves it out
+                self.refused += 1
+            if self.pending_wake:
+                self.wakeups_by_irq += 1
+                self._handle_wake()
+            await uasyncio.sleep_ms(0)  # Let tasks that became due during the sleep run
+        else:
+            # Other tasks (display, radio window) need the CPU, so yield instead of sleeping
+            await uasyncio.sleep_ms(min(delay, 100))
+
+    def update_record(self, record):
+        elapsed = utime.ticks_diff(utime.ticks_ms(), self.started)
+        if elapsed <= 0:
+            return
+        active_ms = elapsed - self.sleep_ms_total
+        record.idle_pct = round(self.sleep_ms_total * 100 / elapsed, 2)
+        record.sleeps = self.sleeps
+        record.refused_sleeps = self.refused
+        # Estimated from configured currents, as there's no way to measure supply current on-board
+        energy_mj = (active_ms * self.active_current_ma + self.sleep_ms_total * self.sleep_current_ma) * self.supply_voltage / 1000
+        record.energy_per_sample_mj = round(energy_mj / self.samples, 2) if self.samples else 0
+        record.avg_current_ma = round((active_ms * self.active_current_ma + self.sleep_ms_total * self.sleep_current_ma) / elapsed, 2)
@@ -0,0 +1,109 @@
+import gc
+import utime
+from managers.perf_manager import perf
+
+
+class MemoryManager:
+    GC_BLOCK_SIZE = 16  # Bytes per GC heap block on 32-bit ports
+    PROBE_STEPS = 32  # Largest-free-block probe resolution, as a fraction of the free heap
+
+    def __init__(self, config, log_mgr):
+        self.log_mgr = log_mgr
+        self.high_watermark = config.GC_HIGH_WATERMARK or 0.75
+        self.idle_watermark = config.GC_IDLE_WATERMARK or 0.5
+        self.stats_interval = (config.GC_STATS_INTERVAL or 60) * 1000
+
+        self.collections = 0
+        self.watermark_collections = 0
+        self.idle_collections = 0
+        self.total_pause_us = 0
+        self.max_pause_us = 0
+        self.last_pause_us = 0
+        self.largest_free = 0
+        self.fragmentation = 0
+        self.last_stats_update = None
+
+        threshold = config.GC_THRESHOLD_BYTES
+        if threshold:
+            gc.threshold(threshold)
+            self.log_mgr.log(f"GC threshold set to {threshold} bytes")
+
+    def heap_usage(self):
+        free = gc.mem_free()
+        alloc = gc.mem_alloc()
+        total = free + alloc
+        return alloc / total if total > 0 else 0
+
+    def collect(self):
+        start = utime.ticks_us()
+        gc.collect()
+        pause = utime.ticks_diff(utime.ticks_us(), start)
+        perf.record("gc", pause)
+        self.collections += 1
+        self.total_pause_us += pause
+        self.last_pause_us = pause
+        if pause > self.max_pause_us:
+            self.max_pause_us = pause
+
+    def maybe_collect(self):
+        # The system stats job is the only caller, once per tick; idle windows use on_idle()
+        if self.heap_usage() >= self.high_watermark:
+            self.watermark_collections += 1
+            self.collect()
+            return True
+        return False
+
+    def on_idle(self):
+        # Called from known idle windows (e.g. right after a publish) where a pause is harmless
+        if self.heap_usage() >= self.idle_watermark:
+            self.idle_collections += 1
+            self.collect()
+            return True
+        return False
+
+    def update_fragmentation(self):
+        # micropython.mem_info() has the largest free block too, but it always prints to the REPL
+        # (os.dupterm only adds a stream next to USB/UART), so the block is probed for instead.
+        # With automatic collection off an allocation that doesn't fit raises MemoryError rather
+        # than collecting, so sizes are tried from the whole free heap down and the first one that
+        # fits is the largest block, to within PROBE_STEPS. One collection hands the probe back.
+        free = gc.mem_free()
+        step = max(free // self.PROBE_STEPS, self.GC_BLOCK_SIZE)
+        size = free
+        largest = 0
+        was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            while size > 0:
+                try:
+                    probe = bytearray(size)
+                except MemoryError:
+                    size -= step
+                    continue
+                probe = None
+                largest = size
+                break
+        finally:
+            if was_enabled:
+                gc.enable()
+        if largest:
+            self.collect()
+
+        self.largest_free = largest
+        self.fragmentation = 1 - (largest / free) if free > 0 else 0
+
+    def update_stats(self, record):
+        now = utime.ticks_ms()
+        if self.last_stats_update is None or utime.ticks_diff(now, self.last_stats_update) >= self.stats_interval:
+            try:
+                self.update_fragmentation()
+            except Exception as e:
+                self.log_mgr.log(f"Error reading heap fragmentation: {e}")
+            self.last_stats_update = now
+
+        record.gc_collections = self.collections
+        record.gc_pause_ms = round(self.total_pause_us / self.collections / 1000, 2) if self.collections else 0
+        record.gc_max_pause_ms = round(self.max_pause_us / 1000, 2)
+        record.heap_free = gc.mem_free()
+        record.heap_largest_free = self.largest_free
+        record.heap_fragmentation = round(self.fragmentation * 100, 2)
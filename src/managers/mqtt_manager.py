@@ -1,7 +1,9 @@
 import json
 import uasyncio
-from umqtt_simple import MQTTClient
 import utime
+from managers import event_bus as events
+from managers.event_bus import event_bus
+from managers.perf_manager import perf
 
 class MQTTManager:
     def __init__(self, config, log_mgr):
@@ -11,19 +13,77 @@ class MQTTManager:
         self.is_connected = False
         self.last_publish_time = 0
         self.system_manager = None
-        self.m5_watering_unit = None
-        self.dfr_moisture_sensor = None
+        self.wifi_manager = None
+        self.poll_interval_ms = 100
+
+        # Offline queue used when the radio is duty-cycled between publish windows
+        self.queue_offline = False
+        self.persistent_session = False
+        self.outbox = []
+        self.outbox_size = config.MQTT_OUTBOX_SIZE or 200
+        self.outbox_dropped = 0
 
-    def set_m5_watering_unit(self, m5_watering_unit):
-        self.m5_watering_unit = m5_watering_unit
-        
-    def set_dfr_moisture_sensor(self, dfr_moisture_sensor):
-        self.dfr_moisture_sensor = dfr_moisture_sensor
-        
     def set_system_manager(self, system_manager):
         self.system_manager = system_manager
 
+    def set_wifi_manager(self, wifi_manager):
+        self.wifi_manager = wifi_manager
+
+    def link_up(self):
+        return self.wifi_manager is None or self.wifi_manager.link_up
+
+    def enable_offline_queue(self):
+        self.queue_offline = True
+        # A persistent session with QoS 1 subscriptions lets the broker hold control
+        # messages until the next window
+        self.persistent_session = True
+
+    def _iter_messages(self, data):
+        for topic, subtopics in self.config.MQTT_TOPICS.items():
+            if topic in data and data[topic] is not None:
+                for subtopic in subtopics:
+                    if subtopic in data[topic]:
+                        yield f"{self.config.MQTT_CLIENT_NAME}/{topic}/{subtopic}", str(data[topic][subtopic])
+                    else:
+                        self.log_mgr.log(f"Subtopic {subtopic} not found in data for topic {topic}")
+            else:
+                self.log_mgr.log(f"Topic {topic} not found in data")
+
+    def _enqueue(self, data):
+        for full_topic, message in self._iter_messages(data):
+            if len(self.outbox) >= self.outbox_size:
+                self.outbox.pop(0)
+                self.outbox_dropped += 1
+            self.outbox.append((full_topic.encode(), message.encode()))
+        self.log_mgr.log(f"MQTT data queued ({len(self.outbox)} messages pending)")
+
+    async def flush_outbox(self):
+        sent = 0
+        while self.outbox and self.is_connected:
+            topic, message = self.outbox[0]
+            try:
+                self.client.publish(topic, message)
+            except Exception as e:
+                self.log_mgr.log(f"Exception while flushing MQTT outbox: {e}")
+                self.is_connected = False
+                break
+            self.outbox.pop(0)
+            sent += 1
+            if sent % 20 == 0:
+                await uasyncio.sleep(0)  # Let the sampler run during long bursts
+        if sent:
+            self.last_publish_time = utime.time()
+            self.log_mgr.log(f"MQTT outbox flushed: {sent} messages")
+
     async def publish_data(self, data):
+        if self.queue_offline and not (self.link_up() and self.is_connected):
+            self._enqueue(data)
+            return True
+
+        if not self.link_up():
+            self.log_mgr.log("WiFi link down. Skipping MQTT publish.")
+            return False
+
         if not self.is_connected:
             self.log_mgr.log("MQTT not connected. Attempting to connect...")
             await self.reconnect()
@@ -33,22 +93,13 @@ class MQTTManager:
             return False
 
         try:
-            for topic, subtopics in self.config.MQTT_TOPICS.items():
-                if topic in data:
-                    for subtopic in subtopics:
-                        if subtopic in data[topic]:
-                            full_topic = f"{self.config.MQTT_CLIENT_NAME}/{topic}/{subtopic}"
-                            message = str(data[topic][subtopic])
-                            try:
-                                result = self.client.publish(full_topic.encode(), message.encode())
-                            except Exception as e:
-                                if self.system_manager:
-                                    self.system_manager.add_error("mqtt_publish")
-                                self.log_mgr.log(f"Exception while publishing to {full_topic}: {e}")
-                        else:
-                            self.log_mgr.log(f"Subtopic {subtopic} not found in data for topic {topic}")
-                else:
-                    self.log_mgr.log(f"Topic {topic} not found in data")
+            for full_topic, message in self._iter_messages(data):
+                try:
+                    result = self.client.publish(full_topic.encode(), message.encode())
+                except Exception as e:
+                    if self.system_manager:
+                        self.system_manager.add_error("mqtt_publish")
+                    self.log_mgr.log(f"Exception while publishing to {full_topic}: {e}")
             
             self.last_publish_time = utime.time()
             self.log_mgr.log("MQTT data published successful")
@@ -60,6 +111,26 @@ class MQTTManager:
             self.is_connected = False
             return False
 
+    def publish_message(self, subtopic, message):
+        if not self.is_connected:
+            return False
+        try:
+            self.client.publish(f"{self.config.MQTT_CLIENT_NAME}/{subtopic}".encode(), message)
+            return True
+        except Exception as e:
+            self.log_mgr.log(f"Exception while publishing to {subtopic}: {e}")
+            if self.system_manager:
+                self.system_manager.add_error("mqtt_publish")
+            return False
+
+    def disconnect(self):
+        if self.client and self.is_connected:
+            try:
+                self.client.disconnect()
+            except Exception:
+                pass
+        self.is_connected = False
+
     async def reconnect(self):
         self.log_mgr.log("Attempting to reconnect to MQTT broker")
         try:
@@ -73,9 +144,11 @@ class MQTTManager:
             self.system_manager.start_processing("mqtt_connect")
         self.log_mgr.log("MQTT connecting ...")
         try:
+            from umqtt_simple import MQTTClient
             self.client = MQTTClient(self.config.MQTT_CLIENT_NAME, self.config.MQTT_BROKER_ADDRESS, self.config.MQTT_BROKER_PORT, self.config.MQTT_BROKER_USER, self.config.MQTT_BROKER_PW)
             self.client.set_callback(self.on_message)
-            self.client.connect()
+            with perf.span("mqtt_connect"):
+                self.client.connect(clean_session=not self.persistent_session)
             self.is_connected = True
             self.log_mgr.log(f"MQTT client connected as: {self.config.MQTT_CLIENT_NAME}")
             await self.subscribe_to_control_topics()
@@ -92,8 +165,9 @@ class MQTTManager:
     async def subscribe_to_control_topics(self):
         if self.is_connected:
             try:
-                self.client.subscribe(f"{self.config.MQTT_CLIENT_NAME}/control/#")
-                self.client.subscribe(f"{self.config.MQTT_CLIENT_NAME}/config/#")
+                qos = 1 if self.persistent_session else 0
+                self.client.subscribe(f"{self.config.MQTT_CLIENT_NAME}/control/#", qos)
+                self.client.subscribe(f"{self.config.MQTT_CLIENT_NAME}/config/#", qos)
                 self.log_mgr.log("MQTT control topics subscribed")
             except Exception as e:
                 self.log_mgr.log(f"Failed to subscribe to control topics: {e}")       
@@ -107,26 +181,29 @@ class MQTTManager:
             _, _, key = topic.split('/')
             self.handle_config_update(key, msg)
             self.config.load_from_file()
-            if topic == f"{self.config.MQTT_CLIENT_NAME}/config/MOISTURE_THRESHOLD":
-                self.m5_watering_unit.MOISTURE_THRESHOLD = self.config.MOISTURE_THRESHOLD
-                self.dfr_moisture_sensor.THRESHOLD = self.config.MOISTURE_THRESHOLD
-            elif topic == f"{self.config.MQTT_CLIENT_NAME}/config/M5_MOISTURE_SENSOR_DRY_VALUE":
-                self.m5_watering_unit.MOISTURE_SENSOR_DRY_VALUE = self.config.M5_MOISTURE_SENSOR_DRY_VALUE
-            elif topic == f"{self.config.MQTT_CLIENT_NAME}/config/M5_MOISTURE_SENSOR_WET_VALUE":
-                self.m5_watering_unit.MOISTURE_SENSOR_WET_VALUE = self.config.M5_MOISTURE_SENSOR_WET_VALUE
-            elif topic == f"{self.config.MQTT_CLIENT_NAME}/config/DFR_MOISTURE_SENSOR_DRY_VALUE":
-                self.dfr_moisture_sensor.SENSOR_DRY_VALUE = self.config.DFR_MOISTURE_SENSOR_DRY_VALUE
-            elif topic == f"{self.config.MQTT_CLIENT_NAME}/config/DFR_MOISTURE_SENSOR_WET_VALUE":
-                self.dfr_moisture_sensor.SENSOR_WET_VALUE = self.config.DFR_MOISTURE_SENSOR_WET_VALUE
-            elif topic == f"{self.config.MQTT_CLIENT_NAME}/config/WATERING_DURATION":
-                self.m5_watering_unit.WATERING_DURATION = self.config.WATERING_DURATION
+            # Whoever caches this key (watering unit, moisture sensors, ...) refreshes itself
+            event_bus.publish(events.CONFIG_CHANGED, key)
                 
         elif topic == f"{self.config.MQTT_CLIENT_NAME}/control/watering":
-            uasyncio.create_task(self.handle_watering_control(msg))
+            event_bus.publish(events.CONTROL_COMMAND, ("watering", msg.lower()))
+        elif topic == f"{self.config.MQTT_CLIENT_NAME}/control/watering-mode":
+            event_bus.publish(events.CONTROL_COMMAND, ("watering-mode", msg.lower()))
+        elif topic == f"{self.config.MQTT_CLIENT_NAME}/control/zones":
+            event_bus.publish(events.CONTROL_COMMAND, ("zones", msg.lower()))
         elif topic == f"{self.config.MQTT_CLIENT_NAME}/control/reset-water-tank":
-            uasyncio.create_task(self.handle_reset_water_tank(msg))
+            event_bus.publish(events.CONTROL_COMMAND, ("reset-water-tank", msg.lower()))
+        elif topic == f"{self.config.MQTT_CLIENT_NAME}/control/trace":
+            event_bus.publish(events.CONTROL_COMMAND, ("trace", msg.lower()))
+        elif topic == f"{self.config.MQTT_CLIENT_NAME}/control/record":
+            event_bus.publish(events.CONTROL_COMMAND, ("record", msg.lower()))
+        elif topic == f"{self.config.MQTT_CLIENT_NAME}/control/replay":
+            event_bus.publish(events.CONTROL_COMMAND, ("replay", msg.lower()))
+        elif topic == f"{self.config.MQTT_CLIENT_NAME}/control/heap-profile":
+            event_bus.publish(events.CONTROL_COMMAND, ("heap-profile", msg.lower()))
         elif topic == f"{self.config.MQTT_CLIENT_NAME}/control/restart-system":
             uasyncio.create_task(self.handle_system_restart(msg))
+        elif topic == f"{self.config.MQTT_CLIENT_NAME}/control/log-read":
+            uasyncio.create_task(self.handle_log_read(msg))
             
     def handle_config_update(self, key, value):
         try:
@@ -143,30 +220,6 @@ class MQTTManager:
         except Exception as e:
             self.log_mgr.log(f"Error updating configuration: {e}")
 
-    async def handle_watering_control(self, msg):
-        if self.m5_watering_unit is None:
-            self.log_mgr.log("Watering unit not set. Cannot trigger watering.")
-            return
-
-        if msg.lower() == "start":
-            self.log_mgr.log("Triggering watering via MQTT control")
-            await self.m5_watering_unit.trigger_watering()
-        else:
-            self.log_mgr.log(f"Unknown control command: {msg}")
-            
-    async def handle_reset_water_tank(self, msg):
-        if self.m5_watering_unit is None:
-            self.log_mgr.log("Watering unit not set. Cannot reset water tank.")
-            return
-
-        if msg.lower() == "reset":
-            self.log_mgr.log("Resetting water tank level via MQTT control")
-            self.m5_watering_unit.water_tank.reset_capacity()
-        else:
-            self.log_mgr.log(f"Unknown control command: {msg}")
-
-        
-            
     async def handle_system_restart(self, msg):
         if self.system_manager is None:
             self.log_mgr.log("System-Manager not set. Cannot restart system.")
@@ -178,17 +231,80 @@ class MQTTManager:
             self.log_mgr.log(f"Unknown control command: {msg}")
 
 
+    async def handle_log_read(self, msg):
+        # Request payload: "<file_age> <offset>", file_age 0 being the file currently written
+        try:
+            parts = msg.split()
+            file_age = int(parts[0]) if parts else 0
+            offset = int(parts[1]) if len(parts) > 1 else 0
+        except ValueError:
+            self.log_mgr.log(f"Unknown control command: {msg}")
+            return
+
+        chunk, total = self.log_mgr.read_flash_log(file_age, offset)
+        if chunk is None:
+            self.log_mgr.log("Flash log not available")
+            return
+
+        # MicroPython ignores decode()'s errors argument, so the chunk is cut to whole characters
+        # instead: continuation bytes at the start are skipped, a character cut off at the end is
+        # left for the next request
+        start, end = self.utf8_bounds(chunk, offset + len(chunk) >= total)
+        try:
+            data = chunk[start:end].decode('utf-8')
+        except UnicodeError:
+            data = "".join(chr(b) if b < 0x80 else "?" for b in chunk[start:end])  # Damaged on flash
+        next_offset = offset + end
+        response = json.dumps({
+            "file": file_age,
+            "offset": offset + start,
+            "next": next_offset if next_offset < total else -1,
+            "size": total,
+            "data": data
+        })
+        self.publish_message("log/response", response.encode())
+
+    def utf8_bounds(self, chunk, at_eof):
+        # (start, end) of the whole UTF-8 characters in chunk
+        length = len(chunk)
+        start = 0
+        while start < min(3, length) and chunk[start] & 0xC0 == 0x80:
+            start += 1
+        if at_eof:
+            return start, length
+        lead = length - 1
+        while lead > start and length - lead < 4 and chunk[lead] & 0xC0 == 0x80:
+            lead -= 1
+        byte = chunk[lead] if lead >= start and length else 0
+        if byte >= 0xF0:
+            size = 4
+        elif byte >= 0xE0:
+            size = 3
+        elif byte >= 0xC0:
+            size = 2
+        else:
+            size = 1
+        return start, length if length - lead >= size else lead
+
+
     async def check_messages(self):
         if self.is_connected:
             try:
-                self.client.check_msg()
+                with perf.span("mqtt_check_msg"):
+                    self.client.check_msg()
             except Exception as e:
                 self.log_mgr.log(f"Error checking messages: {e}")
                 await self.reconnect()
 
     async def run(self):
         while True:
+            if not self.link_up():
+                # Sleep until the WiFi supervisor restores the link instead of timing out on connects
+                self.is_connected = False
+                await self.wifi_manager.wait_for_link()
             if not self.is_connected:
                 await self.connect()
+            if self.outbox and self.is_connected:
+                await self.flush_outbox()
             await self.check_messages()
-            await uasyncio.sleep(0.1)  # Check messages more frequently
\ No newline at end of file
+            await uasyncio.sleep_ms(self.poll_interval_ms)
\ No newline at end of file
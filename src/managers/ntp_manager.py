@@ -0,0 +1,183 @@
+import socket
+import struct
+import utime
+import uasyncio
+from managers.perf_manager import perf
+
+
+class NTPManager:
+    # Seconds between the NTP epoch (1900) and the port's epoch (1970 or 2000)
+    NTP_DELTA = 3155673600 if utime.gmtime(0)[0] == 2000 else 2208988800
+
+    def __init__(self, config, log_mgr):
+        self.log_mgr = log_mgr
+        self.servers = config.NTP_SERVERS or ["pool.ntp.org"]
+        self.sync_interval = (config.NTP_SYNC_INTERVAL or 3600) * 1000
+        self.retry_interval = (config.NTP_RETRY_INTERVAL or 60) * 1000
+        self.correction_interval = (config.NTP_DRIFT_CORRECTION_INTERVAL or 300) * 1000
+        self.timeout_ms = config.NTP_TIMEOUT_MS or 2000
+        self.dns_ttl_ms = (config.NTP_DNS_TTL or 300) * 1000
+        self.dns_max_timeouts = config.NTP_DNS_MAX_TIMEOUTS or 2
+
+        self.request = bytearray(48)
+        self.request[0] = 0x1B  # LI = 0, VN = 3, Mode = 3 (client)
+        self.addresses = {}  # server -> (address, ticks_ms of the lookup)
+        self.timeouts = {}  # server -> timeouts in a row
+
+        # Reference point of the last sync: true time (ms since epoch) at a ticks_ms instant
+        self.reference_ms = None
+        self.reference_ticks = 0
+        self.drift_ppm = 0
+        self.corrected_ms = 0
+
+        self.synced = False
+        self.last_sync = 0
+        self.last_offset_ms = 0
+        self.last_rtt_ms = 0
+        self.last_server = None
+        self.sync_count = 0
+        self.failure_count = 0
+
+    def _lookup(self, server):
+        host, _, port = server.partition(":")
+        address = socket.getaddrinfo(host, int(port) if port else 123)[0][-1]
+        self.addresses[server] = (address, utime.ticks_ms())
+        return address
+
+    def _resolve(self, server):
+        # getaddrinfo blocks, so only a server with nothing cached is looked up here; an expired
+        # answer is still used and refreshed by _refresh_addresses once the queries are done
+        cached = self.addresses.get(server)
+        return cached[0] if cached else self._lookup(server)
+
+    def _refresh_addresses(self):
+        # Like HTTPClient.resolve, answers live for dns_ttl_ms: pool servers rotate their addresses
+        now = utime.ticks_ms()
+        for server, cached in list(self.addresses.items()):
+            if utime.ticks_diff(now, cached[1]) >= self.dns_ttl_ms:
+                try:
+                    self._lookup(server)
+                except OSError as e:
+                    self.log_mgr.log(f"NTP lookup of {server} failed: {e}")
+
+    def _forget(self, server):
+        # The server may have moved, look it up again on the next sync
+        self.addresses.pop(server, None)
+        self.timeouts[server] = 0
+
+    async def _query(self, server):
+        address = self._resolve(server)  # Before the clock starts, a lookup isn't part of the round trip
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            sock.setblocking(False)
+            start = utime.ticks_ms()
+            sock.sendto(self.request, address)
+            while True:
+                try:
+                    response = sock.recv(48)
+                    break
+                except OSError:
+                    if utime.ticks_diff(utime.ticks_ms(), start) >= self.timeout_ms:
+                        timeouts = self.timeouts.get(server, 0) + 1
+                        self.timeouts[server] = timeouts
+                        if timeouts >= self.dns_max_timeouts:
+                            self._forget(server)
+                        return None
+                    await uasyncio.sleep_ms(10)
+            received = utime.ticks_ms()
+        finally:
+            sock.close()
+        self.timeouts[server] = 0
+
+        if len(response) < 48 or (response[0] & 0x07) != 4 or response[1] == 0:
+            return None  # Not a server reply, or a kiss-o'-death (stratum 0)
+
+        seconds, fraction = struct.unpack_from("!II", response, 40)
+        if seconds == 0:
+            return None
+
+        rtt = utime.ticks_diff(received, start)
+        server_ms = (seconds - self.NTP_DELTA) * 1000 + (fraction * 1000 >> 32)
+        # Server transmit time plus half the round trip approximates true time at `received`
+        return server_ms + rtt // 2, received, rtt
+
+    async def sync(self):
+        best = None
+        for server in self.servers:
+            try:
+                with perf.span("ntp_query"):
+                    result = await self._query(server)
+            except Exception as e:
+                self.log_mgr.log(f"NTP query to {server} failed: {e}")
+                self._forget(server)
+                continue
+            if result is not None and (best is None or result[2] < best[2]):
+                best = result + (server,)
+        self._refresh_addresses()
+
+        if best is None:
+            self.failure_count += 1
+            self.log_mgr.log("NTP sync failed on all servers")
+            return False
+
+        true_ms, at_ticks, rtt, server = best
+        now_ms = true_ms + utime.ticks_diff(utime.ticks_ms(), at_ticks)
+        self.last_offset_ms = now_ms - utime.time() * 1000
+
+        if self.reference_ms is not None:
+            true_elapsed = true_ms - self.reference_ms
+            local_elapsed = utime.ticks_diff(at_ticks, self.reference_ticks)
+            if true_elapsed > 0:
+                self.drift_ppm = (local_elapsed - true_elapsed) * 1000000 / true_elapsed
+
+        self.reference_ms = true_ms
+        self.reference_ticks = at_ticks
+        self.corrected_ms = 0
+        self._set_rtc(now_ms // 1000)
+
+        self.synced = True
+        self.last_sync = now_ms // 1000
+        self.last_rtt_ms = rtt
+        self.last_server = server
+        self.sync_count += 1
+        self.log_mgr.log(f"NTP synced via {server}: offset {self.last_offset_ms}ms, rtt {rtt}ms, drift {self.drift_ppm:.1f}ppm")
+        return True
+
+    def now_ms(self):
+        # Drift-corrected time between syncs, the local oscillator runs `drift_ppm` fast
+        if self.reference_ms is None:
+            return utime.time() * 1000
+        elapsed = utime.ticks_diff(utime.ticks_ms(), self.reference_ticks)
+        return self.reference_ms + int(elapsed * 1000000 / (1000000 + self.drift_ppm))
+
+    def correct_drift(self):
+        if self.reference_ms is None or self.drift_ppm == 0:
+            return
+        error_ms = utime.time() * 1000 - self.now_ms()
+        # The RTC only has second resolution, so only step it once the error reaches a full second
+        if abs(error_ms) >= 1000:
+            self._set_rtc(self.now_ms() // 1000)
+            self.corrected_ms += error_ms
+
+    def _set_rtc(self, seconds):
+        import machine
+        tm = utime.gmtime(seconds)
+        machine.RTC().datetime((tm[0], tm[1], tm[2], tm[6] + 1, tm[3], tm[4], tm[5], 0))
+
+    def update_record(self, record):
+        record.ntp_synced = self.synced
+        record.ntp_offset_ms = self.last_offset_ms
+        record.ntp_drift_ppm = round(self.drift_ppm, 2)
+        record.ntp_last_sync = self.last_sync
+
+    async def run(self):
+        last_attempt = utime.ticks_ms()
+        while True:
+            await uasyncio.sleep_ms(min(self.correction_interval, self.retry_interval))
+            now = utime.ticks_ms()
+            interval = self.sync_interval if self.synced else self.retry_interval
+            if utime.ticks_diff(now, last_attempt) >= interval:
+                last_attempt = now
+                await self.sync()
+            else:
+                self.correct_drift()
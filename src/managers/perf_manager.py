@@ -0,0 +1,178 @@
+import utime
+import uasyncio
+from array import array
+
+
+class Histogram:
+    # Log-linear (HDR-style) buckets over microseconds: values below 16 get exact buckets, above that
+    # each power of two is split into 8 sub-buckets (~12% resolution) up to ~16 s
+    SUB_BITS = 3
+    SUB_COUNT = 1 << SUB_BITS
+    BUCKETS = (21 << SUB_BITS) + SUB_COUNT
+
+    def __init__(self):
+        self.counts = array('H', [0] * self.BUCKETS)
+        self.count = 0
+        self.max_us = 0
+
+    def _index(self, value):
+        shift = 0
+        while value >= self.SUB_COUNT * 2:
+            value >>= 1
+            shift += 1
+        return min(value + (shift << self.SUB_BITS), self.BUCKETS - 1)
+
+    def _upper_bound(self, index):
+        if index < self.SUB_COUNT * 2:
+            return index
+        shift = (index >> self.SUB_BITS) - 1
+        return (((index & (self.SUB_COUNT - 1)) + self.SUB_COUNT + 1) << shift) - 1
+
+    def record(self, value):
+        if value < 0:
+            value = 0
+        index = self._index(value)
+        if self.counts[index] < 65535:
+            self.counts[index] += 1
+        self.count += 1
+        if value > self.max_us:
+            self.max_us = value
+
+    def percentile(self, pct):
+        if self.count == 0:
+            return 0
+        target = (self.count * pct + 99) // 100
+        seen = 0
+        for index in range(self.BUCKETS):
+            seen += self.counts[index]
+            if seen >= target:
+                return min(self._upper_bound(index), self.max_us)
+        return self.max_us
+
+    def reset(self):
+        for index in range(self.BUCKETS):
+            self.counts[index] = 0
+        self.count = 0
+        self.max_us = 0
+
+
+class Span:
+    # Context manager timing one code path; spans are shared per name, so they don't nest with themselves
+    def __init__(self, name, histogram, tracer=None):
+        self.name = name
+        self.histogram = histogram
+        self.tracer = None
+        self.trace_id = 0
+        self.start = 0
+        if tracer:
+            self.set_tracer(tracer)
+
+    def set_tracer(self, tracer):
+        self.tracer = tracer
+        self.trace_id = tracer.name_id(self.name)
+
+    def __enter__(self):
+        if self.tracer:
+            self.tracer.begin(self.trace_id)
+        self.start = utime.ticks_us()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.record(utime.ticks_diff(utime.ticks_us(), self.start))
+        if self.tracer:
+            self.tracer.end(self.trace_id)
+        return False
+
+
+class NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+class PerfManager:
+    def __init__(self):
+        self.enabled = False
+        self.histograms = {}
+        self.spans = {}
+        self.null_span = NullSpan()
+        self.tracer = None
+        self.lag_interval_ms = 100
+        self.publish_interval = 60
+
+    def configure(self, config):
+        self.enabled = bool(config.PERF_ENABLED)
+        self.lag_interval_ms = config.PERF_LOOP_LAG_INTERVAL_MS or 100
+        self.publish_interval = config.PERF_PUBLISH_INTERVAL or 60
+
+    def set_tracer(self, tracer):
+        # Attached by EnviroPi on the first trace command, so an unused recorder is never imported
+        self.tracer = tracer
+        for span in self.spans.values():
+            span.set_tracer(tracer)
+
+    def _histogram(self, name):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = Histogram()
+            self.histograms[name] = histogram
+        return histogram
+
+    def span(self, name):
+        # Spans also feed the trace recorder, so they are live while a trace runs even with perf off
+        if not self.enabled and not (self.tracer and self.tracer.active):
+            return self.null_span
+        span = self.spans.get(name)
+        if span is None:
+            span = Span(name, self._histogram(name), self.tracer)
+            self.spans[name] = span
+        return span
+
+    def record(self, name, duration_us):
+        # For code that already measures itself (e.g. MemoryManager.collect)
+        if self.enabled:
+            self._histogram(name).record(duration_us)
+
+    def timed(self, name):
+        # Decorator for plain functions; wrap coroutines with `with perf.span(...)` inside instead
+        def decorator(func):
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with self.span(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    async def run_heartbeat(self):
+        # Any delay beyond the requested sleep is time some other task held the event loop
+        if not self.enabled:
+            return
+        histogram = self._histogram("loop_lag")
+        interval_us = self.lag_interval_ms * 1000
+        while True:
+            start = utime.ticks_us()
+            await uasyncio.sleep_ms(self.lag_interval_ms)
+            histogram.record(utime.ticks_diff(utime.ticks_us(), start) - interval_us)
+
+    def get_report(self):
+        # {span: {count, p50_ms, p95_ms, max_ms}} since the last reset()
+        report = {}
+        for name, histogram in self.histograms.items():
+            report[name] = {
+                "count": histogram.count,
+                "p50_ms": histogram.percentile(50) / 1000,
+                "p95_ms": histogram.percentile(95) / 1000,
+                "max_ms": histogram.max_us / 1000
+            }
+        return report
+
+    def reset(self):
+        for histogram in self.histograms.values():
+            histogram.reset()
+
+
+# Shared instance so any module can open a span without being handed a manager
+perf = PerfManager()
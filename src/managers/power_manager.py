@@ -0,0 +1,99 @@
+import network
+import utime
+import uasyncio
+from managers.data_records import PowerRecord
+
+
+class PowerManager:
+    MODES = ("performance", "powersave", "duty_cycle")
+
+    def __init__(self, config, log_mgr, wifi_mgr, mqtt_mgr):
+        self.config = config
+        self.log_mgr = log_mgr
+        self.wifi_mgr = wifi_mgr
+        self.mqtt_mgr = mqtt_mgr
+
+        self.mode = config.POWER_MODE if config.POWER_MODE in self.MODES else "performance"
+        self.window_duration = config.POWER_WINDOW_DURATION or 10
+        self.connect_timeout = config.POWER_WINDOW_CONNECT_TIMEOUT or 15
+
+        self.state = "active"
+        self.state_since = utime.ticks_ms()
+        self.residency = {"active": 0, "powersave": 0, "radio_off": 0}
+        self.windows = 0
+        self.power_record = PowerRecord()
+
+    def _set_state(self, state):
+        now = utime.ticks_ms()
+        self.residency[self.state] += utime.ticks_diff(now, self.state_since)
+        self.state = state
+        self.state_since = now
+
+    def _set_wlan_pm(self, powersave):
+        wlan = self.wifi_mgr.wlan
+        pm = getattr(network.WLAN, "PM_POWERSAVE" if powersave else "PM_PERFORMANCE", None)
+        if pm is None:
+            return
+        try:
+            wlan.config(pm=pm)
+        except Exception as e:
+            self.log_mgr.log(f"Error setting WLAN power management: {e}")
+
+    def setup(self):
+        self.log_mgr.log(f"Power mode: {self.mode}")
+        if self.mode != "performance":
+            # Between windows nothing needs sub-second MQTT polling
+            self.mqtt_mgr.poll_interval_ms = self.config.POWER_MQTT_POLL_INTERVAL_MS or 1000
+        if self.mode == "powersave":
+            self._set_wlan_pm(True)
+            self._set_state("powersave")
+        elif self.mode == "duty_cycle":
+            self.mqtt_mgr.enable_offline_queue()
+
+    async def _open_window(self):
+        self.windows += 1
+        self._set_state("active")
+        self.wifi_mgr.resume()
+        # MQTTManager.run reconnects as soon as the link is back, sends the queued telemetry
+        # in one burst and picks up control messages the broker held for us
+        try:
+            await uasyncio.wait_for(self._wait_for_mqtt(), self.connect_timeout)
+        except uasyncio.TimeoutError:
+            self.log_mgr.log("Publish window: MQTT not available")
+
+    async def _wait_for_mqtt(self):
+        await self.wifi_mgr.wait_for_link()
+        while not self.mqtt_mgr.is_connected:
+            await uasyncio.sleep_ms(100)
+
+    def _close_window(self):
+        self.mqtt_mgr.disconnect()
+        self.wifi_mgr.suspend()
+        self._set_state("radio_off")
+
+    async def run(self):
+        if self.mode != "duty_cycle":
+            return
+        period = self.config.MQTT_UPDATE_INTERVAL or 60
+        while True:
+            window_start = utime.ticks_ms()
+            await self._open_window()
+            await uasyncio.sleep(self.window_duration)
+            self._close_window()
+            elapsed = utime.ticks_diff(utime.ticks_ms(), window_start) / 1000
+            await uasyncio.sleep(max(1, period - elapsed))
+
+    def get_power_data(self):
+        now = utime.ticks_ms()
+        current = utime.ticks_diff(now, self.state_since)
+        total = sum(self.residency.values()) + current
+        record = self.power_record
+        record.mode = self.mode
+        record.state = self.state
+        if total > 0:
+            record.active_pct = round((self.residency["active"] + (current if self.state == "active" else 0)) * 100 / total, 2)
+            record.powersave_pct = round((self.residency["powersave"] + (current if self.state == "powersave" else 0)) * 100 / total, 2)
+            record.radio_off_pct = round((self.residency["radio_off"] + (current if self.state == "radio_off" else 0)) * 100 / total, 2)
+        record.windows = self.windows
+        record.queued = len(self.mqtt_mgr.outbox)
+        return record
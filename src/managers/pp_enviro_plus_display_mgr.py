@@ -1,7 +1,7 @@
-import asyncio
 import uasyncio
-import gc
 import utime
+from managers import event_bus as events
+from managers.event_bus import event_bus
 
 
 class PicoEnviroPlusDisplayMgr:
@@ -34,6 +34,7 @@ class PicoEnviroPlusDisplayMgr:
         # Weather update cache
         self.last_weather_update_time = 0
         self.cached_weather_data = None
+        self.weather_task = None
         
         # Button configuration
         self.button_config = {
@@ -102,6 +103,7 @@ class PicoEnviroPlusDisplayMgr:
         
         self.enviro_plus.display_mode = self.display_modes[self.current_mode_index]
         self.log_mgr.log(f"Switched to {self.enviro_plus.display_mode} mode")
+        event_bus.publish(events.DISPLAY_MODE_CHANGED, self.enviro_plus.display_mode)
         return True  # Indicate that the mode has changed
        
     def read_all_sensors(self):
@@ -122,7 +124,7 @@ class PicoEnviroPlusDisplayMgr:
         self.display.update()
         self.system_mgr.clear_memory()
         utime.sleep(2)  # Allow time for the message to be displayed
-        self.update_system_display(self.system_mgr.get_system_data()[0]['system']) 
+        self.update_system_display(self.system_mgr.get_system_data()['system']) 
 
     def initiate_system_restart(self):
         self.log_mgr.log("System restart initiated")
@@ -237,19 +239,28 @@ class PicoEnviroPlusDisplayMgr:
         self.display.set_pen(self.MAGENTA)
         self.display.text("?", x + 15, y + 10, scale=3)
         
-    async def update_weather_display(self):
-
+    def refresh_weather_data(self):
+        # Runs as its own scheduler job; the request goes out from a task of its own, so waiting
+        # on the API holds up neither a frame nor the jobs queued behind this one
         now = utime.time()
         interval = self.data_mgr.config.WEATHER_UPDATE_INTERVAL_IN_MINUTES * 60
 
         if (
             self.enviro_plus.display_mode == "Weather" and
-            (now - self.last_weather_update_time) >= interval
+            self.weather_task is None and
+            (self.cached_weather_data is None or (now - self.last_weather_update_time) >= interval)
         ):
             self.log_mgr.log("Fetching weather data...")
-            self.cached_weather_data = self.data_mgr.get_weather_data_from_api()
             self.last_weather_update_time = now
+            self.weather_task = uasyncio.create_task(self.fetch_weather_data())
+
+    async def fetch_weather_data(self):
+        try:
+            self.cached_weather_data = await self.data_mgr.get_weather_data_from_api()
+        finally:
+            self.weather_task = None
 
+    async def update_weather_display(self):
         weather = self.cached_weather_data
 
         if not weather:
@@ -518,8 +529,17 @@ class PicoEnviroPlusDisplayMgr:
         self.display.text(f"{system_data['chip_temperature']:.1f}°C", right_x, y_offset, scale=label_scale)
 
         y_offset += line_gap
-        self.display.text("CPU Freq:", left_x, y_offset, scale=label_scale)
-        self.display.text(f"{system_data['cpu_frequency']:.2f} MHz", right_x, y_offset, scale=label_scale)
+        heap_profiler = self.enviro_plus.heap_profiler
+        if heap_profiler and heap_profiler.enabled:
+            # The frequency rarely changes; while profiling its row shows the heaviest allocating stage
+            top = heap_profiler.top(1)
+            self.display.set_pen(self.YELLOW)
+            self.display.text("Top alloc:", left_x, y_offset, scale=label_scale)
+            self.display.text(f"{top[0][0]} {top[0][1]}B" if top else "-", right_x, y_offset, scale=label_scale)
+            self.display.set_pen(self.WHITE)
+        else:
+            self.display.text("CPU Freq:", left_x, y_offset, scale=label_scale)
+            self.display.text(f"{system_data['cpu_frequency']:.2f} MHz", right_x, y_offset, scale=label_scale)
 
         y_offset += line_gap
         self.display.text("CPU Usage:", left_x, y_offset, scale=label_scale)
@@ -538,4 +558,4 @@ class PicoEnviroPlusDisplayMgr:
 
     def cleanup_display(self):
         self.clear_display()
-        gc.collect()
\ No newline at end of file
+        self.system_mgr.memory_mgr.on_idle()
\ No newline at end of file
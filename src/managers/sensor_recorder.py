@@ -0,0 +1,235 @@
+import json
+import struct
+import utime
+import uasyncio
+from array import array
+from managers.adc_manager import adc_manager
+from managers.data_manager import DataManager
+from managers.data_records import EnviroRecord, ADCRecord
+
+
+class SensorRecorder:
+    # Capture layout (little endian), read back by SensorReplay on the device or the host:
+    #   b"EPSR", version u8, ADC count u8, record size u16, start time u32 (epoch seconds)
+    #   per ADC: pin u8
+    #   per record: offset ms u32, temperature f32, pressure f32, humidity f32, gas f32,
+    #               status u8, flags u8, mic u16, lux f32, then per ADC the raw u16 reading
+    # Values are the raw driver readings, before any DataManager correction.
+    MAGIC = b"EPSR"
+    VERSION = 1
+    HEADER_FORMAT = "<4sBBHI"
+    RECORD_FORMAT = "<IffffBBHf"
+    BASE_SIZE = 28
+    FLAG_MIC_FILTERED = 1
+    FLAG_NO_LUX = 2
+    BUFFERED_RECORDS = 16  # Flash is written once per this many records
+
+    def __init__(self):
+        self.active = False
+        self.file = "/sensors.bin"
+        self.max_bytes = 256 * 1024
+        self.log_mgr = None
+        self.pins = ()
+        self.channels = []
+        self.record_size = self.BASE_SIZE
+        self.buffer = None
+        self.buffered = 0
+        self.written = 0
+        self.recorded = 0
+        self.started = 0
+        self.stop_at = None
+
+    def configure(self, config, log_mgr):
+        self.log_mgr = log_mgr
+        self.file = config.SENSOR_RECORD_FILE or "/sensors.bin"
+        self.max_bytes = (config.SENSOR_RECORD_MAX_KB or 256) * 1024
+        self.pins = tuple(config.ADC_PINS_TO_MONITOR or ())
+
+    def start(self, duration_s=None):
+        if self.active:
+            self.stop()
+        if len(self.channels) != len(self.pins):
+            self.channels = [adc_manager.channel(pin, "system") for pin in self.pins]
+        self.record_size = self.BASE_SIZE + 2 * len(self.pins)
+        if self.buffer is None or len(self.buffer) != self.record_size * self.BUFFERED_RECORDS:
+            self.buffer = bytearray(self.record_size * self.BUFFERED_RECORDS)
+        header = bytearray(struct.pack(self.HEADER_FORMAT, self.MAGIC, self.VERSION, len(self.pins),
+                                       self.record_size, utime.time()))
+        header.extend(bytes(self.pins))
+        try:
+            with open(self.file, "wb") as f:
+                f.write(header)
+        except Exception as e:
+            self._log(f"Error starting sensor recording: {e}")
+            return False
+        self.written = len(header)
+        self.buffered = 0
+        self.recorded = 0
+        self.started = utime.ticks_ms()
+        self.stop_at = utime.ticks_add(self.started, int(duration_s * 1000)) if duration_s else None
+        self.active = True
+        self._log(f"Sensor recording to {self.file}{f' for {duration_s}s' if duration_s else ''}")
+        return True
+
+    def stop(self):
+        if not self.active:
+            return
+        self.active = False
+        self.stop_at = None
+        self.flush()
+        self._log(f"Sensor recording stopped, {self.recorded} samples ({self.written} bytes)")
+
+    def record(self, bme_data, lux, mic, mic_filtered):
+        now = utime.ticks_ms()
+        if self.stop_at is not None and utime.ticks_diff(now, self.stop_at) >= 0:
+            self.stop()
+            return
+        if self.written + (self.buffered + 1) * self.record_size > self.max_bytes:
+            self._log("Sensor recording reached SENSOR_RECORD_MAX_KB")
+            self.stop()
+            return
+        flags = self.FLAG_MIC_FILTERED if mic_filtered else 0
+        if lux is None:
+            flags |= self.FLAG_NO_LUX
+            lux = 0
+        offset = self.buffered * self.record_size
+        struct.pack_into(self.RECORD_FORMAT, self.buffer, offset, utime.ticks_diff(now, self.started),
+                         bme_data[0], bme_data[1], bme_data[2], bme_data[3], bme_data[4], flags, mic, lux)
+        offset += self.BASE_SIZE
+        for channel in self.channels:
+            # The value the system manager reports from, as the scan last read it
+            struct.pack_into("<H", self.buffer, offset, int(channel.value))
+            offset += 2
+        self.buffered += 1
+        self.recorded += 1
+        if self.buffered == self.BUFFERED_RECORDS:
+            self.flush()
+
+    def flush(self):
+        if not self.buffered:
+            return
+        try:
+            with open(self.file, "ab") as f:
+                f.write(memoryview(self.buffer)[:self.buffered * self.record_size])
+            self.written += self.buffered * self.record_size
+        except Exception as e:
+            self._log(f"Error writing sensor recording: {e}")
+            self.active = False
+        self.buffered = 0
+
+    def _log(self, message):
+        if self.log_mgr:
+            self.log_mgr.log(message)
+
+
+class SensorReplay:
+    # Reads a SensorRecorder capture one record at a time into preallocated fields and runs it
+    # through the same corrections as live readings, with its own DataManager and records
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        header = self.file.read(12)
+        magic, version, adc_count, record_size, start_time = struct.unpack(SensorRecorder.HEADER_FORMAT, header)
+        if magic != SensorRecorder.MAGIC or version != SensorRecorder.VERSION:
+            self.file.close()
+            raise ValueError(f"{path} is not a sensor recording")
+        self.pins = tuple(self.file.read(adc_count))
+        self.record_size = record_size
+        self.start_time = start_time
+        self.buffer = bytearray(record_size)
+        self.offset_ms = 0
+        self.bme = [0, 0, 0, 0, 0]
+        self.lux = 0
+        self.mic = 0
+        self.mic_filtered = False
+        self.adc = array('H', [0] * adc_count)
+        self.samples = 0
+
+    def read(self):
+        # Advances to the next record; False at the end of the capture
+        if self.file.readinto(self.buffer) != self.record_size:
+            return False
+        (self.offset_ms, self.bme[0], self.bme[1], self.bme[2], self.bme[3], self.bme[4],
+         flags, self.mic, self.lux) = struct.unpack_from(SensorRecorder.RECORD_FORMAT, self.buffer)
+        self.mic_filtered = bool(flags & SensorRecorder.FLAG_MIC_FILTERED)
+        if flags & SensorRecorder.FLAG_NO_LUX:
+            self.lux = None
+        offset = SensorRecorder.BASE_SIZE
+        for index in range(len(self.adc)):
+            self.adc[index] = struct.unpack_from("<H", self.buffer, offset)[0]
+            offset += 2
+        self.samples += 1
+        return True
+
+    def read_adc(self, pin):
+        # Pins missing from the capture read as 0, like an unconnected input
+        for index, recorded_pin in enumerate(self.pins):
+            if recorded_pin == pin:
+                return self.adc[index]
+        return 0
+
+    def close(self):
+        self.file.close()
+
+    async def run(self, app, speed=0, publish=False, output=None):
+        # Feeds the capture through PicoEnviroPlus.process_reading -> DataManager -> MQTT formatting
+        # (and publishing when asked). speed 0 runs as fast as possible, otherwise recorded time is
+        # divided by speed. Filter state starts empty for every replay and live state isn't touched.
+        enviro_plus = app.enviro_plus
+        system_mgr = app.system_mgr
+        data_mgr = DataManager(app.config_mgr, app.log_mgr, system_mgr)
+        sensor_record = EnviroRecord()
+        adc_record = ADCRecord(system_mgr.ADC_PINS)
+        system_data = {"system": system_mgr.system_record, "adc": adc_record}
+        out = open(output, "w") if output else None
+        published = 0
+        errors = 0
+        previous_offset = None
+        started = utime.ticks_us()
+        try:
+            while self.read():
+                if speed and previous_offset is not None:
+                    await uasyncio.sleep_ms(int(utime.ticks_diff(self.offset_ms, previous_offset) / speed))
+                previous_offset = self.offset_ms
+
+                try:
+                    sensor_data = enviro_plus.process_reading(self.bme, self.lux, self.mic, self.mic_filtered,
+                                                              data_mgr, sensor_record)
+                except Exception as e:
+                    app.log_mgr.log(f"Error replaying sample {self.samples}: {e}")
+                    errors += 1
+                    continue
+                values = adc_record.values
+                for index, pin in enumerate(adc_record.pins):
+                    values[index] = round(system_mgr.adc_voltage(self.read_adc(pin)), 2)
+                mqtt_data = data_mgr.prepare_mqtt_sensor_data_for_publishing(
+                    sensor_data, system_data, system_mgr.get_current_config_data(),
+                    app.wifi_mgr.get_wifi_data(), app.get_power_data())
+                if publish and app.mqtt_mgr and await app.mqtt_mgr.publish_data(mqtt_data):
+                    published += 1
+                if out:
+                    # Only what the pipeline derived from the capture, so outputs of two versions diff cleanly
+                    out.write(json.dumps({"t": self.offset_ms, "enviro-plus": dict(sensor_data.items()),
+                                          "adc": dict(system_data["adc"].items())}))
+                    out.write("\n")
+                if not speed:
+                    await uasyncio.sleep_ms(0)  # Keep the watchdog and the other jobs running
+        finally:
+            if out:
+                out.close()
+            self.close()
+
+        elapsed_us = utime.ticks_diff(utime.ticks_us(), started)
+        return {
+            "file": self.path,
+            "samples": self.samples,
+            "errors": errors,
+            "published": published,
+            "elapsed_ms": elapsed_us // 1000,
+            "samples_per_s": round(self.samples * 1000000 / elapsed_us, 1) if elapsed_us > 0 else 0,
+            "speed": speed,
+        }
+
+
+# Shared instance so PicoEnviroPlus can hand every raw reading to it while a recording runs
+sensor_recorder = SensorRecorder()
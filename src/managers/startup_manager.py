@@ -0,0 +1,74 @@
+import utime
+import uasyncio
+
+
+class StartupPhase:
+    def __init__(self, name, action, depends_on, timeout):
+        self.name = name
+        self.action = action
+        self.depends_on = depends_on
+        self.timeout = timeout
+        self.done = uasyncio.Event()
+        self.ok = False
+        self.start_ms = 0
+        self.duration_ms = 0
+
+
+class StartupManager:
+    def __init__(self, log_mgr):
+        self.log_mgr = log_mgr
+        self.boot_start = utime.ticks_ms()
+        self.phases = {}
+        self.milestones = {}
+
+    def add_phase(self, name, action, depends_on=(), timeout=None):
+        self.phases[name] = StartupPhase(name, action, depends_on, timeout)
+
+    def mark(self, milestone):
+        if milestone not in self.milestones:
+            self.milestones[milestone] = utime.ticks_diff(utime.ticks_ms(), self.boot_start)
+
+    def start(self):
+        for phase in self.phases.values():
+            uasyncio.create_task(self._run_phase(phase))
+
+    async def _run_phase(self, phase):
+        # Dependencies only order the phases; each action checks what it needs itself
+        for dependency in phase.depends_on:
+            await self.phases[dependency].done.wait()
+
+        start = utime.ticks_ms()
+        phase.start_ms = utime.ticks_diff(start, self.boot_start)
+        try:
+            if phase.timeout:
+                result = await uasyncio.wait_for(phase.action(), phase.timeout)
+            else:
+                result = await phase.action()
+            phase.ok = result is not False
+        except uasyncio.TimeoutError:
+            self.log_mgr.log(f"Startup phase {phase.name} timed out")
+        except Exception as e:
+            self.log_mgr.log(f"Startup phase {phase.name} failed: {e}")
+
+        phase.duration_ms = utime.ticks_diff(utime.ticks_ms(), start)
+        self.log_mgr.log(f"Startup phase {phase.name} {'done' if phase.ok else 'failed'} in {phase.duration_ms}ms")
+        phase.done.set()
+
+    async def wait_for(self, *names):
+        for name in names:
+            await self.phases[name].done.wait()
+
+    async def wait_all(self):
+        for phase in self.phases.values():
+            await phase.done.wait()
+        self.mark("startup_complete")
+
+    def get_boot_report(self):
+        report = {
+            "phases": {
+                phase.name: {"start_ms": phase.start_ms, "duration_ms": phase.duration_ms, "ok": phase.ok}
+                for phase in self.phases.values()
+            }
+        }
+        report.update(self.milestones)
+        return report
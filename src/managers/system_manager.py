@@ -1,11 +1,15 @@
 import machine
-from machine import ADC, Pin, freq
+from machine import freq
 import utime
-import ntptime
 import uasyncio
-import gc
 import micropython
 from managers.led_manager import LEDManager
+from managers.memory_manager import MemoryManager
+from managers.ntp_manager import NTPManager
+from managers.data_records import SystemRecord, ADCRecord
+from managers.adc_manager import adc_manager
+from managers import event_bus as events
+from managers.event_bus import event_bus
 
 class SystemManager:
     def __init__(self, config, log_mgr, data_mgr):
@@ -16,13 +20,22 @@ class SystemManager:
         self.client_name = self.config.MQTT_CLIENT_NAME
         self.log_mgr = log_mgr
         self.data_mgr = data_mgr
+        self.memory_mgr = MemoryManager(config, log_mgr)
+        self.ntp_mgr = NTPManager(config, log_mgr)
+        self.scheduler = None
+        self.acquisition_mgr = None
         self.ADC_PINS = self.config.ADC_PINS_TO_MONITOR if hasattr(self.config, 'ADC_PINS_TO_MONITOR') else []
-        self.adc_readings = {}
+        self.system_record = SystemRecord()
+        self.adc_record = ADCRecord(self.ADC_PINS)
+        # Read from the values the adc_scan job keeps, not converted again on every update
+        self.adc_channels = [adc_manager.channel(pin, "system") for pin in self.ADC_PINS]
+        self.temperature_channel = adc_manager.channel(adc_manager.TEMPERATURE, "system")
+        self.vsys_channel = adc_manager.channel(adc_manager.VSYS, "system")
+        self.spike_window = config.ADC_SPIKE_WINDOW or 2
+        self.system_data = {"system": self.system_record, "adc": self.adc_record}
         self.internal_voltage = 0
         self.chip_temperature = 0
         self.cpu_freq = freq()
-        self.last_time = utime.ticks_ms()
-        self.last_run_time = 0
         self.start_time = utime.ticks_ms()
         self.uptime = 0
         self.mem_alloc_threshold = 0.9  # 90% memory allocation threshold
@@ -41,23 +54,9 @@ class SystemManager:
             self.last_wdt_feed = current_time
 
 
-    def sync_time(self, max_retries=5):
-        for i in range(max_retries):
-            try:
-                ntptime.settime()
-                return True
-            except Exception as e:
-                self.log_mgr.log(f"Error synchronizing time (attempt {i+1}/{max_retries}): {str(e)}")
-                utime.sleep(1)
-        
-        self.set_time_from_compile()
-        return False
-
-
-    def set_time_from_compile(self):
-        compile_time = utime.localtime()
-        machine.RTC().datetime((compile_time[0], compile_time[1], compile_time[2], compile_time[6], compile_time[3], compile_time[4], compile_time[5], 0))
-        self.log_mgr.log(f"Time set from compile time: {compile_time}")
+    async def sync_time(self):
+        # Failed syncs are retried by NTPManager.run every NTP_RETRY_INTERVAL
+        return await self.ntp_mgr.sync()
 
 
     def get_local_time(self):
@@ -78,6 +77,12 @@ class SystemManager:
     def set_led(self, led):
         self.led_manager = LEDManager(led)
 
+    def set_scheduler(self, scheduler):
+        self.scheduler = scheduler
+
+    def set_acquisition_manager(self, acquisition_mgr):
+        self.acquisition_mgr = acquisition_mgr
+
     async def run(self):
         while True:
             self.update_status()
@@ -92,19 +97,19 @@ class SystemManager:
         self.log_mgr.clear_logs()
 
         # Clear system manager's own caches
-        self.adc_readings.clear()
+        self.adc_record.clear()
         self.errors.clear()
         self.processing_tasks.clear()
         
         # Perform garbage collection
-        gc.collect()
+        self.memory_mgr.collect()
         
         self.log_mgr.log("System memory cleared")
 
 
     def restart_system(self):
         self.log_mgr.log("System restart initiated by SystemManager")
-        # Perform any necessary cleanup here
+        self.log_mgr.flush()  # Persist buffered log entries before the reset wipes them
         utime.sleep(1)  # Short delay to allow for cleanup
         machine.reset()  # Perform a soft reset of the system
 
@@ -121,6 +126,7 @@ class SystemManager:
             self.status = new_status
             if self.led_manager:
                 self.led_manager.update_led(self.status)
+            event_bus.publish(events.STATUS_CHANGED, new_status)
 
 
     def start_processing(self, task_name):
@@ -160,24 +166,24 @@ class SystemManager:
         return f"{days}d {hours:02d}:{minutes:02d}:{seconds:02d}"
 
 
-    def check_voltage(self, adc_pin):
+    def adc_voltage(self, raw):
+        return (raw * 3.3) / 65535
+
+
+    def check_voltage(self, channel):
         try:
-            adc = ADC(Pin(adc_pin))
-            raw = adc.read_u16()
-            voltage = (raw * 3.3) / 65535
-            return voltage
+            return self.adc_voltage(channel.value)
         except Exception as e:
-            self.log_mgr.log(f"Error reading ADC pin {adc_pin}: {e}")
+            self.log_mgr.log(f"Error reading ADC pin {channel.pin}: {e}")
             return 0
 
 
     def check_system(self):
         try:
-            temp_sensor = machine.ADC(4)
-            reading = temp_sensor.read_u16() * (3.3 / 65535)
+            reading = self.temperature_channel.value * (3.3 / 65535)
             temperature = 27 - (reading - 0.706) / 0.001721
-            temperature = self.data_mgr.filter_spike("chip_temperature", temperature)
-            return machine.ADC(29).read_u16() * (3.3 / 65535), temperature
+            temperature = self.data_mgr.filter_spike("chip_temperature", temperature, self.spike_window)
+            return self.vsys_channel.value * (3.3 / 65535), temperature
         except Exception as e:
             self.log_mgr.log(f"Error reading system data: {e}")
             return 0, 0
@@ -186,36 +192,18 @@ class SystemManager:
     def update_system_data(self):
         self.internal_voltage, self.chip_temperature = self.check_system()
         self.update_uptime()
-        for pin in self.ADC_PINS:
-            self.adc_readings[f"adc_{pin}"] = self.check_voltage(pin)
+        values = self.adc_record.values
+        for index, channel in enumerate(self.adc_channels):
+            values[index] = round(self.check_voltage(channel), 2)
 
 
     def estimate_cpu_usage(self):
-        def busy_wait():
-            start = utime.ticks_us()
-            while utime.ticks_diff(utime.ticks_us(), start) < 10000:
-                pass
-        
-        start = utime.ticks_ms()
-        busy_wait()
-        end = utime.ticks_ms()
-        
-        run_time = utime.ticks_diff(end, start)
-        total_time = utime.ticks_diff(end, self.last_time)
-        
-        usage = (run_time / total_time) if total_time > 0 else 0
-        self.last_time = end
-        self.last_run_time = run_time
-        
-        return usage
+        # Share of time spent in scheduled jobs; a busy-wait probe only ever measured itself
+        return self.scheduler.get_load() / 100 if self.scheduler else 0
 
 
     def get_ram_usage(self):
-        gc.collect()
-        free = gc.mem_free()
-        alloc = gc.mem_alloc()
-        total = free + alloc
-        return alloc / total if total > 0 else 0
+        return self.memory_mgr.heap_usage()
 
 
     def check_resources(self):
@@ -223,8 +211,7 @@ class SystemManager:
         ram_usage = self.get_ram_usage()
         
         if ram_usage > self.mem_alloc_threshold:
-            self.log_mgr.log(f"Warning: High memory usage ({ram_usage:.2%}). Performing garbage collection.")
-            gc.collect()
+            self.log_mgr.log(f"Warning: High memory usage ({ram_usage:.2%}).")
         
         if cpu_usage > self.cpu_usage_threshold:
             self.log_mgr.log(f"Warning: High CPU usage ({cpu_usage:.2%}). Consider optimizing or reducing workload.")
@@ -235,22 +222,24 @@ class SystemManager:
     def get_system_data(self):
         self.update_system_data()
         cpu_usage, ram_usage = self.check_resources()
-        timestamp = utime.time()
-
-        mqtt_data = {
-            "system": {
-                "internal_voltage": round(self.internal_voltage, 2),
-                "chip_temperature": round(self.chip_temperature, 2),
-                "cpu_frequency": self.data_mgr.adjust_cpu_frequency(self.cpu_freq),
-                "cpu_usage": round(cpu_usage * 100, 2),
-                "ram_usage": round(ram_usage * 100, 2),
-                "timestamp": timestamp,
-                "uptime": self.get_uptime_string()
-            },
-            "adc": {f"adc_{pin}": round(self.adc_readings.get(f"adc_{pin}", 0), 2) for pin in self.ADC_PINS}
-        }
+
+        record = self.system_record
+        record.internal_voltage = round(self.internal_voltage, 2)
+        record.chip_temperature = round(self.chip_temperature, 2)
+        record.cpu_frequency = self.data_mgr.adjust_cpu_frequency(self.cpu_freq)
+        record.cpu_usage = round(cpu_usage * 100, 2)
+        record.ram_usage = round(ram_usage * 100, 2)
+        record.timestamp = utime.time()
+        record.uptime = self.get_uptime_string()
+        self.memory_mgr.update_stats(record)
+        self.ntp_mgr.update_record(record)
+        # Core 0 load covers the scheduled jobs; core 1 is measured by the acquisition worker itself
+        if self.scheduler:
+            record.core0_load = self.scheduler.get_load()
+        if self.acquisition_mgr:
+            self.acquisition_mgr.update_record(record)
         
-        return mqtt_data
+        return self.system_data
 
 
     def get_current_config_data(self):
@@ -265,7 +254,7 @@ class SystemManager:
 
 
     def print_system_data(self):
-        mqtt_data, influx_data = self.get_system_data()
+        mqtt_data = self.get_system_data()
         self.log_mgr.log("System Data:")
         for category, values in mqtt_data.items():
             self.log_mgr.log(f"  {category}:")
@@ -0,0 +1,162 @@
+import struct
+import utime
+import uasyncio
+
+
+class TraceRecorder:
+    # Dump layout (little endian), decoded by tools/trace2chrome.py:
+    #   b"EPTR", version u8, name count u8, event count u16, ticks period u32
+    #   per name: length u8 + utf-8 bytes
+    #   per event: ticks_us u32, name id u16, phase u8, task id u8
+    MAGIC = b"EPTR"
+    VERSION = 1
+    EVENT_SIZE = 8
+    EVENT_FORMAT = "<IHBB"
+    TICKS_PERIOD = 1 << 30  # utime.ticks_us() wraps here on MicroPython ports
+    BEGIN = 0
+    END = 1
+    INSTANT = 2
+    MAX_NAMES = 255
+    MAX_TASKS = 255
+
+    def __init__(self, event_count=512):
+        self.event_count = event_count
+        self.ring = None  # Allocated on the first start() so an unused recorder costs no heap
+        self.head = 0
+        self.recorded = 0
+        self.names = []
+        self.name_ids = {}
+        self.task_ids = {}
+        self.active = False
+        self.stop_at = None
+        self.log_mgr = None
+        self.file = "/trace.bin"
+        self.chunk_size = 1024
+
+    def configure(self, config, log_mgr):
+        self.log_mgr = log_mgr
+        self.file = config.TRACE_FILE or "/trace.bin"
+        self.chunk_size = config.TRACE_CHUNK_SIZE or 1024
+        self.event_count = config.TRACE_EVENT_COUNT or self.event_count
+
+    def name_id(self, name):
+        # Call sites register their names once, events then only carry the 16-bit id
+        name_id = self.name_ids.get(name)
+        if name_id is None:
+            if len(self.names) >= self.MAX_NAMES:
+                return self.MAX_NAMES - 1
+            name_id = len(self.names)
+            self.names.append(name)
+            self.name_ids[name] = name_id
+        return name_id
+
+    def _task_id(self):
+        # Coroutines have no names on MicroPython, so each task gets a small number instead
+        try:
+            task = uasyncio.current_task()
+        except Exception:
+            return 0
+        key = id(task)
+        task_id = self.task_ids.get(key)
+        if task_id is None:
+            task_id = min(len(self.task_ids) + 1, self.MAX_TASKS)
+            self.task_ids[key] = task_id
+        return task_id
+
+    def _emit(self, name_id, phase):
+        now = utime.ticks_us()
+        if self.stop_at is not None and utime.ticks_diff(now, self.stop_at) >= 0:
+            self.active = False
+            self.stop_at = None
+            return
+        struct.pack_into(self.EVENT_FORMAT, self.ring, self.head * self.EVENT_SIZE,
+                         now, name_id, phase, self._task_id())
+        self.head += 1
+        if self.head == self.event_count:
+            self.head = 0
+        self.recorded += 1
+
+    def begin(self, name_id):
+        if self.active:
+            self._emit(name_id, self.BEGIN)
+
+    def end(self, name_id):
+        if self.active:
+            self._emit(name_id, self.END)
+
+    def instant(self, name_id):
+        if self.active:
+            self._emit(name_id, self.INSTANT)
+
+    def start(self, duration_s=None):
+        if self.ring is None:
+            self.ring = bytearray(self.event_count * self.EVENT_SIZE)
+        self.head = 0
+        self.recorded = 0
+        self.task_ids.clear()
+        self.stop_at = utime.ticks_add(utime.ticks_us(), int(duration_s * 1000000)) if duration_s else None
+        self.active = True
+        self._log(f"Trace started{f' for {duration_s}s' if duration_s else ''}")
+
+    def stop(self):
+        self.active = False
+        self.stop_at = None
+        self._log(f"Trace stopped, {self.recorded} events recorded")
+
+    def _log(self, message):
+        if self.log_mgr:
+            self.log_mgr.log(message)
+
+    def _header(self):
+        count = min(self.recorded, self.event_count)
+        header = bytearray(struct.pack("<4sBBHI", self.MAGIC, self.VERSION, len(self.names), count, self.TICKS_PERIOD))
+        for name in self.names:
+            encoded = name.encode()[:255]
+            header.append(len(encoded))
+            header.extend(encoded)
+        return header
+
+    def iter_dump(self):
+        # Yields the header, then the ring oldest-first as memoryview slices (no copy of the events)
+        yield self._header()
+        if self.ring is None:
+            return
+        view = memoryview(self.ring)
+        if self.recorded >= self.event_count:
+            start = self.head * self.EVENT_SIZE
+            yield view[start:]
+            yield view[:start]
+        else:
+            yield view[:self.head * self.EVENT_SIZE]
+
+    def save(self):
+        was_active = self.active
+        self.active = False  # Keep the ring still while it is written out
+        try:
+            with open(self.file, "wb") as f:
+                for part in self.iter_dump():
+                    f.write(part)
+            self._log(f"Trace saved to {self.file}")
+            return True
+        except Exception as e:
+            self._log(f"Error saving trace: {e}")
+            return False
+        finally:
+            self.active = was_active
+
+    def iter_chunks(self):
+        # MQTT-sized pieces; each is prefixed with seq/total/length so the host can reassemble them
+        data = bytearray()
+        for part in self.iter_dump():
+            data.extend(part)
+        total = (len(data) + self.chunk_size - 1) // self.chunk_size
+        view = memoryview(data)
+        for seq in range(total):
+            chunk = view[seq * self.chunk_size:(seq + 1) * self.chunk_size]
+            message = bytearray(struct.pack("<HHH", seq, total, len(chunk)))
+            message.extend(chunk)
+            yield message
+
+
+# Shared instance so spans and jobs anywhere can emit events
+tracer = TraceRecorder()
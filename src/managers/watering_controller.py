@@ -0,0 +1,208 @@
+import json
+import uasyncio
+import utime
+from managers import event_bus as events
+from managers.event_bus import event_bus
+from managers.data_records import WateringRecord
+
+
+class DrySpell:
+    # Below threshold a pot counts as dry until it is back above threshold + hysteresis; while dry
+    # it gets one cycle per pause (time for the water to soak in and reach the probe), at most
+    # max_cycles per cycle_window so a failed probe can't empty the tank into the pot. Timed on
+    # ticks, the RTC jumps when NTP sets it.
+    def __init__(self):
+        self.configure()
+        self.reset()
+
+    def configure(self, threshold=40, hysteresis=10, pause=3600, max_cycles=1, cycle_window=86400):
+        self.threshold = threshold
+        self.hysteresis = hysteresis
+        self.pause = pause
+        self.max_cycles = max_cycles
+        self.cycle_window = cycle_window
+
+    def reset(self):
+        self.dry = False
+        self.cycles = 0
+        self.window_start = 0
+        self.last_cycle = None
+
+    def assess(self, moisture, now, on_ms):
+        # Returns (state, reason); "dry" means a cycle of on_ms may start now
+        if moisture >= self.threshold + self.hysteresis:
+            self.dry = False
+            self.cycles = 0
+        elif moisture < self.threshold:
+            self.dry = True
+        if self.cycles and utime.ticks_diff(now, self.window_start) >= self.cycle_window * 1000:
+            self.cycles = 0
+        if not self.dry:
+            return "moist", "above threshold" if moisture >= self.threshold else "within hysteresis band"
+        if self.last_cycle is not None:
+            paused = self.pause - (utime.ticks_diff(now, self.last_cycle) - on_ms) // 1000
+            if paused > 0:
+                return "soaking", f"{paused}s of pause left"
+        if self.cycles >= self.max_cycles:
+            return "capped", f"{self.cycle_window - utime.ticks_diff(now, self.window_start) // 1000}s until more cycles"
+        return "dry", f"cycle {self.cycles + 1} of {self.max_cycles}"
+
+    def start_cycle(self, now):
+        if self.cycles == 0:
+            self.window_start = now
+        self.cycles += 1
+        self.last_cycle = now
+
+
+class WateringController:
+    # Closed loop around the M5 watering unit: a DrySpell on MOISTURE_THRESHOLD,
+    # MOISTURE_HYSTERESIS, WATERING_PAUSE_DURATION, WATERING_MAX_CYCLES and WATERING_CYCLE_WINDOW,
+    # where a cycle is a WATERING_DOSE_ML dose if set, else WATERING_DURATION seconds of pump.
+    # The jobs only read and decide, the pump runs in a task of its own.
+    def __init__(self, config, log_mgr, watering_unit, moisture_sensor=None, mqtt_mgr=None):
+        self.config = config
+        self.log_mgr = log_mgr
+        self.watering_unit = watering_unit
+        self.moisture_sensor = moisture_sensor
+        self.mqtt_mgr = mqtt_mgr
+        self.record = WateringRecord()
+        self.decision = {"t": 0, "m5": None, "dfr": None, "moisture": None, "state": "", "action": "",
+                         "reason": "", "cycles": 0}
+        self.auto = True
+        self.spell = DrySpell()
+        self.pump_task = None
+        self.moisture = None
+        self.load_config()
+        event_bus.subscribe(events.CONFIG_CHANGED, self.on_config_changed)
+        event_bus.subscribe(events.CONTROL_COMMAND, self.on_control_command)
+
+    def load_config(self):
+        config = self.config
+        self.spell.configure(config.MOISTURE_THRESHOLD or 40, config.MOISTURE_HYSTERESIS or 10,
+                             config.WATERING_PAUSE_DURATION or 3600, config.WATERING_MAX_CYCLES or 1,
+                             config.WATERING_CYCLE_WINDOW or 86400)
+        self.max_spread = config.MOISTURE_SENSOR_MAX_SPREAD or 25
+        self.duration = config.WATERING_DURATION or 5
+        self.dose_ml = config.WATERING_DOSE_ML
+
+    def on_config_changed(self, key):
+        # MicroPython's startswith takes no tuple of prefixes
+        for prefix in ("MOISTURE_", "WATERING_", "M5_WATER_PUMP"):
+            if key.startswith(prefix):
+                self.load_config()
+                return
+
+    def on_control_command(self, command):
+        # control/watering-mode accepts "auto", "manual" (decisions are still traced, the pump
+        # stays off) and "reset" (forget the dry spell and its cycle count)
+        name, argument = command
+        if name != "watering-mode":
+            return
+        if argument in ("auto", "manual"):
+            self.auto = argument == "auto"
+            self.log_mgr.log(f"Watering controller: {argument}")
+        elif argument == "reset":
+            self.spell.reset()
+            self.log_mgr.log("Watering controller reset")
+        else:
+            self.log_mgr.log(f"Unknown watering-mode command: {argument}")
+
+    async def read_sensors(self):
+        # Scheduler job, every MOISTURE_CHECK_INTERVAL
+        await self.watering_unit.read_moisture()
+        if self.moisture_sensor:
+            await self.moisture_sensor.read_moisture()
+        self.moisture = self.fuse(self.watering_unit.current_moisture_percent,
+                                  self.moisture_sensor.moisture_percent if self.moisture_sensor else None)
+
+    def fuse(self, m5, dfr):
+        if m5 is None:
+            return dfr
+        if dfr is None:
+            return m5
+        if abs(m5 - dfr) > self.max_spread:
+            # The probes disagree, one has likely failed or lost contact with the soil. Going by
+            # the wetter one errs on the side of a thirsty plant rather than a flooded pot.
+            return max(m5, dfr)
+        return (m5 + dfr) / 2
+
+    def decide(self):
+        # Scheduler job, every WATERING_CHECK_INTERVAL
+        now = utime.ticks_ms()
+        moisture = self.moisture
+        spell = self.spell
+        action = "none"
+        if moisture is None:
+            state, reason = "no_sensor", "no valid moisture reading"
+        elif self.pump_task is not None or self.watering_unit.is_watering:
+            state, reason = "watering", "pump running"
+        else:
+            unit = self.watering_unit
+            if self.dose_ml:
+                dose_ml, on_ms = self.dose_ml, unit.on_time_for_ml(self.dose_ml)
+            else:
+                on_ms = self.duration * 1000
+                dose_ml = unit.ml_for_on_time(on_ms)
+            was_dry, cycles = spell.dry, spell.cycles
+            state, reason = spell.assess(moisture, now, on_ms)
+            if was_dry and not spell.dry:
+                self.log_mgr.log(f"Soil moisture back at {moisture:.1f}% after {cycles} cycles")
+            if state == "soaking":
+                action = "wait"
+            elif state == "capped":
+                action = "hold"
+                if self.decision["state"] != "capped":
+                    self.log_mgr.log(f"Watering stopped after {spell.cycles} cycles, soil still at {moisture:.1f}%")
+            elif state == "dry":
+                if unit.water_tank.get_capacity() < dose_ml:
+                    action, reason = "hold", "water tank empty"
+                elif not self.auto:
+                    action, reason = "hold", "manual mode"
+                elif utime.time() < unit.watering_block_timer:
+                    action, reason = "wait", "pump blocked"
+                else:
+                    spell.start_cycle(now)
+                    self.pump_task = uasyncio.create_task(self.run_pump(self.dose_ml))
+                    state, action = "watering", "water"
+                    self.log_mgr.log(f"Soil at {moisture:.1f}%, watering {dose_ml:.0f}ml in {on_ms}ms ({reason})")
+        self.trace(moisture, state, action, reason)
+
+    async def run_pump(self, dose_ml):
+        try:
+            if dose_ml:
+                await self.watering_unit.dose(dose_ml)
+            else:
+                await self.watering_unit.control_pump(self.duration)
+        finally:
+            self.watering_unit.cleanup()
+            self.pump_task = None
+
+    def trace(self, moisture, state, action, reason):
+        decision = self.decision
+        decision["t"] = utime.time()
+        m5 = self.watering_unit.current_moisture_percent
+        dfr = self.moisture_sensor.moisture_percent if self.moisture_sensor else None
+        decision["m5"] = round(m5, 2) if m5 is not None else None
+        decision["dfr"] = round(dfr, 2) if dfr is not None else None
+        decision["moisture"] = round(moisture, 2) if moisture is not None else None
+        decision["state"] = state
+        decision["action"] = action
+        decision["reason"] = reason
+        decision["cycles"] = self.spell.cycles
+        if self.mqtt_mgr:
+            self.mqtt_mgr.publish_message("watering/decision", json.dumps(decision).encode())
+
+    def get_watering_data(self):
+        unit = self.watering_unit
+        record = self.record
+        record.moisture = round(self.moisture, 2) if self.moisture is not None else None
+        record.m5_moisture = round(unit.current_moisture_percent, 2) if unit.current_moisture_percent is not None else None
+        record.dfr_moisture = self.moisture_sensor.get_moisture_data()["moisture_percent"] if self.moisture_sensor else None
+        record.water_used = round(unit.water_used, 2)
+        record.water_left = round(unit.water_tank.get_capacity(), 2)
+        record.is_watering = unit.is_watering
+        record.watering_cycles = self.spell.cycles
+        record.watering_cycles_configured = self.spell.max_cycles
+        record.state = self.decision["state"]
+        record.last_watered = unit.last_watered
+        return record
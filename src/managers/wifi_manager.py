@@ -1,8 +1,14 @@
 import network
+import random
+import utime
 import uasyncio
 from machine import Pin
+from managers.data_records import WiFiRecord
+from managers.perf_manager import perf
 
 class WiFiManager:
+    STAT_GOT_IP = 3
+
     def __init__(self, config, log_manager):
         self.led = Pin("LED", Pin.OUT)
         self.ssid = config.WIFI_SSID
@@ -11,26 +17,68 @@ class WiFiManager:
         self.wlan = network.WLAN(network.STA_IF)
         self.system_manager = None
 
+        # Supervisor settings
+        self.check_interval = config.WIFI_SUPERVISOR_INTERVAL or 1
+        self.backoff_min = config.WIFI_RECONNECT_BACKOFF_MIN or 2
+        self.backoff_max = config.WIFI_RECONNECT_BACKOFF_MAX or 300
+        self.reuse_lease = bool(config.WIFI_REUSE_DHCP_LEASE)
+        self.lease_ttl = (config.WIFI_DHCP_LEASE_TTL or 3600) * 1000
+        self.rssi_interval = (config.WIFI_RSSI_SAMPLE_INTERVAL or 10) * 1000
+
+        # DHCP lease kept for fast reconnects (WIFI_REUSE_DHCP_LEASE)
+        self.cached_lease = None
+        self.lease_time = 0
+
+        # Link state and statistics
+        self.link_up = False
+        self.suspended = False
+        self.link_event = uasyncio.Event()
+        self.connected_since = 0
+        self.disconnects = 0
+        self.reconnect_attempts = 0
+        self.fast_reconnects = 0
+        self.last_rssi_sample = 0
+        self.rssi_count = 0
+        self.rssi_sum = 0
+        self.wifi_record = WiFiRecord()
+
     def set_system_manager(self, system_manager):
         self.system_manager = system_manager
 
-    async def connect(self):
-        if self.system_manager:
-            self.system_manager.start_processing("wifi_connect")
-        
+    async def _connect_once(self, fast=False):
+        with perf.span("wifi_connect"):
+            return await self._associate(fast)
+
+    def _lease_valid(self):
+        return self.cached_lease is not None and utime.ticks_diff(utime.ticks_ms(), self.lease_time) < self.lease_ttl
+
+    async def _associate(self, fast):
         self.wlan.active(True)
+        if fast and self._lease_valid():
+            self.wlan.ifconfig(self.cached_lease)  # Skip the DHCP exchange
+        else:
+            # Back to DHCP, or a static config left by an earlier fast reconnect would stick
+            self.wlan.ifconfig('dhcp')
         self.wlan.connect(self.ssid, self.wifi_password)
 
         max_wait = 10
         while max_wait > 0:
-            if self.wlan.status() < 0 or self.wlan.status() >= 3:
+            if self.wlan.status() < 0 or self.wlan.status() >= self.STAT_GOT_IP:
                 break
             self.log_manager.log("Waiting for WiFi connection...")
             self.led.toggle()
             await uasyncio.sleep(1)
             max_wait -= 1
 
-        if self.wlan.status() != 3:
+        return self.wlan.status() == self.STAT_GOT_IP
+
+    async def connect(self):
+        if self.system_manager:
+            self.system_manager.start_processing("wifi_connect")
+
+        connected = await self._connect_once()
+
+        if not connected:
             self.led.value(0)  # Turn off LED on connection failure
             if self.system_manager:
                 self.system_manager.add_error("wifi_connection")
@@ -38,12 +86,124 @@ class WiFiManager:
             raise RuntimeError('WiFi connection failed.')
         else:
             self.log_manager.log("WiFi connection successful.")
-            self.led.value(1)  # Turn on LED to indicate connection
-            status = self.wlan.ifconfig()
-            self.log_manager.log(f"Assigned IP: {status[0]}")
+            self._on_link_up()
+            self._cache_lease()
             if self.system_manager:
                 self.system_manager.stop_processing("wifi_connect")
-                self.system_manager.clear_error("wifi_connection")
+
+    def _cache_lease(self):
+        # The driver doesn't report which AP it associated with, so only the lease is kept
+        self.cached_lease = self.wlan.ifconfig() if self.reuse_lease else None
+        self.lease_time = utime.ticks_ms()
+
+    def _on_link_up(self):
+        self.link_up = True
+        self.link_event.set()
+        self.connected_since = utime.ticks_ms()
+        self.led.value(1)  # Turn on LED to indicate connection
+        status = self.wlan.ifconfig()
+        self.log_manager.log(f"Assigned IP: {status[0]}")
+        if self.system_manager:
+            self.system_manager.clear_error("wifi_connection")
+
+    def _on_link_down(self):
+        self.link_up = False
+        self.link_event.clear()
+        self.disconnects += 1
+        self.led.value(0)
+        self.log_manager.log(f"WiFi link lost (status {self.wlan.status()})")
+        if self.system_manager:
+            self.system_manager.add_error("wifi_connection")
+
+    def _next_backoff(self, backoff):
+        # Exponential backoff with +/-25% jitter so several devices don't retry in lockstep
+        jitter = (random.getrandbits(8) / 255 - 0.5) * 0.5
+        return min(self.backoff_max, backoff * 2), backoff * (1 + jitter)
+
+    async def supervise(self):
+        backoff = self.backoff_min
+        next_attempt = utime.ticks_ms()
+        while True:
+            if self.suspended:
+                # The radio is down on purpose (power duty cycling), not an outage
+                backoff = self.backoff_min
+                next_attempt = utime.ticks_ms()
+                await uasyncio.sleep(self.check_interval)
+                continue
+
+            link = self.wlan.status() == self.STAT_GOT_IP
+            now = utime.ticks_ms()
+
+            if link and not self.link_up:
+                self._on_link_up()
+                backoff = self.backoff_min
+            elif not link and self.link_up:
+                self._on_link_down()
+                next_attempt = now
+
+            if link:
+                if utime.ticks_diff(now, self.last_rssi_sample) >= self.rssi_interval:
+                    self._sample_rssi()
+                    self.last_rssi_sample = now
+            elif utime.ticks_diff(now, next_attempt) >= 0:
+                self.reconnect_attempts += 1
+                fast = self._lease_valid() and backoff == self.backoff_min
+                self.log_manager.log(f"WiFi reconnect attempt {self.reconnect_attempts}{' (fast)' if fast else ''}")
+                try:
+                    if await self._connect_once(fast):
+                        if fast:
+                            self.fast_reconnects += 1
+                        self._on_link_up()
+                        backoff = self.backoff_min
+                        continue
+                except Exception as e:
+                    self.log_manager.log(f"WiFi reconnect failed: {e}")
+                backoff, delay = self._next_backoff(backoff)
+                next_attempt = utime.ticks_add(utime.ticks_ms(), int(delay * 1000))
+
+            await uasyncio.sleep(self.check_interval)
+
+    def _sample_rssi(self):
+        try:
+            rssi = self.wlan.status('rssi')
+        except Exception:
+            return
+        record = self.wifi_record
+        if self.rssi_count == 0:
+            record.rssi_min = rssi
+            record.rssi_max = rssi
+        record.rssi = rssi
+        record.rssi_min = min(record.rssi_min, rssi)
+        record.rssi_max = max(record.rssi_max, rssi)
+        self.rssi_count += 1
+        self.rssi_sum += rssi
+
+    def get_wifi_data(self):
+        record = self.wifi_record
+        record.connected = self.link_up
+        record.uptime = utime.ticks_diff(utime.ticks_ms(), self.connected_since) // 1000 if self.link_up else 0
+        record.disconnects = self.disconnects
+        record.reconnect_attempts = self.reconnect_attempts
+        record.rssi_avg = round(self.rssi_sum / self.rssi_count, 1) if self.rssi_count else 0
+        return record
+
+    def suspend(self):
+        self.suspended = True
+        self.link_up = False
+        self.link_event.clear()
+        try:
+            self.wlan.disconnect()
+            self.wlan.active(False)
+        except Exception as e:
+            self.log_manager.log(f"Error suspending WiFi: {e}")
+        self.led.value(0)
+
+    def resume(self):
+        # The supervisor notices the missing link and runs a (fast) reconnect right away
+        self.suspended = False
+
+    async def wait_for_link(self):
+        await self.link_event.wait()
 
     async def ensure_connection(self):
         if not self.wlan.isconnected():
@@ -53,4 +213,4 @@ class WiFiManager:
         return self.wlan.isconnected()
 
     def get_ip(self):
-        return self.wlan.ifconfig()[0] if self.wlan.isconnected() else None
\ No newline at end of file
+        return self.wlan.ifconfig()[0] if self.wlan.isconnected() else None
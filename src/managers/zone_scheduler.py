@@ -0,0 +1,207 @@
+import json
+import uasyncio
+import utime
+from machine import Pin
+from managers import event_bus as events
+from managers.event_bus import event_bus
+from components.watering_zone import WateringZone
+
+
+class ZoneScheduler:
+    # Waters a rack of WATERING_ZONES, each zone a DrySpell of its own. One job reads every probe
+    # in a single pass and one job decides for every zone, so the loop costs the same for one pot
+    # as for a rack. Dry zones join one pump queue that serves the driest first, with at most
+    # WATERING_MAX_CONCURRENT_PUMPS running so the pumps stay within what the supply can deliver.
+    def __init__(self, config, log_mgr, water_tank, mqtt_mgr=None, system_mgr=None):
+        self.config = config
+        self.log_mgr = log_mgr
+        self.water_tank = water_tank
+        self.mqtt_mgr = mqtt_mgr
+        self.system_mgr = system_mgr
+        self.zones = [WateringZone(index, settings, config, log_mgr)
+                      for index, settings in enumerate(config.WATERING_ZONES or ())]
+        self.mux = [Pin(pin, Pin.OUT) for pin in config.WATERING_ZONE_MUX_PINS or ()]
+        self.queue = []
+        self.running = 0
+        self.reserved_ml = 0  # Doses of the runs in progress, not yet charged to the tank
+        self.auto = True
+        self.decision = {"t": 0, "zone": 0, "name": "", "moisture": None, "state": "", "action": "",
+                         "reason": "", "cycles": 0}
+        self.load_config()
+        event_bus.subscribe(events.CONFIG_CHANGED, self.on_config_changed)
+        event_bus.subscribe(events.CONTROL_COMMAND, self.on_control_command)
+        self.log_mgr.log(f"ZoneScheduler initialized with {len(self.zones)} zones.")
+
+    def load_config(self):
+        config = self.config
+        self.max_pumps = max(1, config.WATERING_MAX_CONCURRENT_PUMPS or 1)
+        # Pause after each run so the supply recovers before the next pump's inrush current
+        self.pump_gap_ms = config.WATERING_PUMP_GAP_MS if config.WATERING_PUMP_GAP_MS is not None else 500
+        self.mux_settle_us = config.WATERING_ZONE_MUX_SETTLE_US or 100
+        # Zones are built once; a changed WATERING_ZONES list updates their settings, not their number
+        for zone, settings in zip(self.zones, config.WATERING_ZONES or ()):
+            zone.configure(settings, config)
+
+    def on_config_changed(self, key):
+        # MicroPython's startswith takes no tuple of prefixes
+        for prefix in ("MOISTURE_", "WATERING_", "M5_WATER_PUMP", "M5_MOISTURE", "ADC_"):
+            if key.startswith(prefix):
+                self.load_config()
+                return
+
+    def on_control_command(self, command):
+        # control/zones accepts "auto", "manual", "reset[:<n>]" and "water:<n>" (queue zone n now,
+        # dry or not)
+        name, argument = command
+        if name == "reset-water-tank" and argument == "reset":
+            self.water_tank.reset_capacity()  # The M5 unit that handles it otherwise isn't built
+            return
+        if name != "zones":
+            return
+        action, _, number = argument.partition(":")
+        zone = None
+        if number:
+            try:
+                zone = self.zones[int(number)]
+            except (ValueError, IndexError):
+                self.log_mgr.log(f"Unknown zone: {number}")
+                return
+        if action in ("auto", "manual"):
+            self.auto = action == "auto"
+            self.log_mgr.log(f"Zone scheduler: {action}")
+        elif action == "reset":
+            for each in (zone,) if zone else self.zones:
+                each.spell.reset()
+            self.log_mgr.log(f"Zone watering reset: {zone.name if zone else 'all zones'}")
+        elif action == "water" and zone:
+            if not (zone.queued or zone.is_watering):
+                self.log_mgr.log(f"Watering {zone.name} via MQTT control")
+                zone.queued = True
+                self.queue.append(zone)
+                self.pump_next()
+        else:
+            self.log_mgr.log(f"Unknown zones command: {argument}")
+
+    def select(self, channel):
+        for bit, pin in enumerate(self.mux):
+            pin.value((channel >> bit) & 1)
+
+    async def read_sensors(self):
+        # Scheduler job, every MOISTURE_CHECK_INTERVAL: every probe back to back in one pass
+        for zone in self.zones:
+            if zone.mux_channel is not None:
+                self.select(zone.mux_channel)
+                utime.sleep_us(self.mux_settle_us)
+            try:
+                zone.read()
+            except Exception as e:
+                zone.moisture = None
+                self.log_mgr.log(f"Error reading {zone.name} moisture: {e}")
+
+    def decide(self):
+        # Scheduler job, every WATERING_CHECK_INTERVAL
+        now = utime.ticks_ms()
+        for zone in self.zones:
+            self.assess(zone, now)
+        self.pump_next()
+
+    def assess(self, zone, now):
+        moisture = zone.moisture
+        action = "none"
+        if moisture is None:
+            state, reason = "no_sensor", "no valid moisture reading"
+        elif zone.is_watering:
+            state, reason = "watering", "pump running"
+        elif zone.queued:
+            state, reason = "queued", "waiting for the pump queue"
+        else:
+            state, reason = zone.spell.assess(moisture, now, zone.on_ms)
+            if state == "soaking":
+                action = "wait"
+            elif state == "capped":
+                action = "hold"
+                if zone.state != "capped":
+                    self.log_mgr.log(f"{zone.name}: stopped after {zone.spell.cycles} cycles, soil still at {moisture:.1f}%")
+            elif state == "dry":
+                if self.available_ml() < zone.dose_ml:
+                    action, reason = "hold", "water tank empty"
+                elif not self.auto:
+                    action, reason = "hold", "manual mode"
+                else:
+                    zone.queued = True
+                    self.queue.append(zone)
+                    state, action = "queued", "queue"
+        self.trace(zone, state, action, reason)
+
+    def available_ml(self):
+        return self.water_tank.get_capacity() - self.reserved_ml
+
+    def pump_next(self):
+        while self.queue and self.running < self.max_pumps:
+            zone = self.queue[0]
+            for other in self.queue:
+                if other.deficit() > zone.deficit():
+                    zone = other
+            self.queue.remove(zone)
+            zone.queued = False
+            if self.available_ml() < zone.dose_ml:
+                self.trace(zone, "dry", "hold", "water tank empty")
+                continue
+            # Held back from the tank until the run is charged, so concurrent pumps can't share one dose
+            self.reserved_ml += zone.dose_ml
+            zone.spell.start_cycle(utime.ticks_ms())
+            zone.is_watering = True
+            self.running += 1
+            self.trace(zone, "watering", "water", f"cycle {zone.spell.cycles} of {zone.spell.max_cycles}")
+            uasyncio.create_task(self.water(zone))
+
+    async def water(self, zone):
+        try:
+            if self.system_mgr:
+                self.system_mgr.start_processing("watering")
+            on_time = await zone.pump.run(zone.on_ms)
+            # The tank is charged for what the pump actually ran
+            water_used = zone.pump.ml_for_on_time(on_time)
+            self.water_tank.reduce_capacity(water_used)
+            zone.water_used += water_used
+            zone.last_watered = utime.time()
+            self.log_mgr.log(f"{zone.name}: watered {water_used:.1f}ml in {on_time / 1000:.2f}s")
+        except Exception as e:
+            zone.pump.off()
+            self.log_mgr.log(f"{zone.name}: error controlling pump: {e}")
+            if self.system_mgr:
+                self.system_mgr.add_error("watering")
+        finally:
+            self.reserved_ml -= zone.dose_ml
+            zone.is_watering = False
+            if self.system_mgr and not any(other.is_watering for other in self.zones):
+                self.system_mgr.stop_processing("watering")
+            if self.pump_gap_ms:
+                await uasyncio.sleep_ms(self.pump_gap_ms)
+            self.running -= 1
+            self.pump_next()
+
+    def trace(self, zone, state, action, reason):
+        # Only changes are published, a rack of zones sitting moist costs no traffic
+        changed = state != zone.state or action != zone.action
+        zone.state = state
+        zone.action = action
+        zone.reason = reason
+        if not (changed and self.mqtt_mgr):
+            return
+        decision = self.decision
+        decision["t"] = utime.time()
+        decision["zone"] = zone.index
+        decision["name"] = zone.name
+        decision["moisture"] = round(zone.moisture, 2) if zone.moisture is not None else None
+        decision["state"] = state
+        decision["action"] = action
+        decision["reason"] = reason
+        decision["cycles"] = zone.spell.cycles
+        self.mqtt_mgr.publish_message(zone.decision_topic, json.dumps(decision).encode())
+
+    def publish_status(self):
+        # Called with the regular MQTT publish: one <client>/zones/<n>/status message per zone
+        for zone in self.zones:
+            record = zone.get_record()
+            self.mqtt_mgr.publish_message(zone.status_topic, json.dumps(dict(record.items())).encode())
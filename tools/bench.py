@@ -0,0 +1,233 @@
+"""End-to-end benchmarks of the firmware pipeline on simulated hardware.
+
+Boots ``EnviroPi`` from ``src/`` on the ``tools/sim`` board and lets it run until it reaches a
+steady state. Then it times single pipeline stages while the scheduler is paused between
+awaits. Each stage also gets an allocation pass under tracemalloc. Results are written as JSON
+and compared against a stored baseline. A stage fails when it is slower than the time
+tolerance allows, when it allocates more than the allocation tolerance allows, or when it
+calls gc.collect() more often than before.
+
+    python tools/bench.py                       # compare against tools/bench_baseline.json
+    python tools/bench.py -o results.json       # also keep the results
+    python tools/bench.py --update-baseline     # accept the current numbers
+
+Times are host (CPython) microseconds. Compare them between builds on the same machine, not
+with the device. Allocations are CPython bytes, larger than on MicroPython, but they move
+together with them.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import sim  # noqa: E402
+from sim import firmware  # noqa: E402
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json")
+WARMUP_S = 30  # Past the BME688 heater warm-up, WiFi, NTP and MQTT are up by then
+
+# name -> (sim scenario, extra stages)
+SCENARIOS = {
+    "steady": ({}, ()),
+    # The broker disappears once the device is connected; every publish runs into the outage
+    "broker_outage": ({"outages": [["broker", WARMUP_S - 5, 1e9]]}, ()),
+    # Weather screen with fresh API data instead of the "unavailable" placeholder
+    "weather_refresh": ({}, ("weather_refresh",)),
+}
+
+
+class Pipeline:
+    # The stages, each a call into the real firmware objects of a booted EnviroPi
+    def __init__(self, app):
+        self.app = app
+        self.spike_value = 0
+        self.sensor_data = app.enviro_plus.read_sensors()
+        self.mqtt_data = app.data_mgr.prepare_mqtt_sensor_data_for_publishing(
+            self.sensor_data,
+            app.system_mgr.get_system_data(),
+            app.system_mgr.get_current_config_data(),
+            app.wifi_mgr.get_wifi_data(),
+            app.get_power_data()
+        )
+
+    def stages(self, extra=()):
+        # Extra stages go first, they prepare state (cached weather) the renders then show
+        stages = {name: getattr(self, name) for name in extra}
+        stages["sensor_read"] = self.sensor_read
+        stages["filter_spike"] = self.filter_spike
+        for mode in self.app.enviro_plus.display_modes:
+            stages[f"render_{mode.lower()}"] = self.render(mode)
+        stages["publish_data"] = self.publish_data
+        stages["get_system_data"] = self.get_system_data
+        return stages
+
+    async def sensor_read(self):
+        self.app.enviro_plus.read_sensors()
+
+    async def filter_spike(self):
+        self.spike_value = (self.spike_value + 7) % 50
+        self.app.data_mgr.filter_spike("bench", 20 + self.spike_value / 10)
+
+    def render(self, mode):
+        async def stage():
+            self.app.enviro_plus.display_mode = mode
+            await self.app.update_display(self.sensor_data)
+        return stage
+
+    async def publish_data(self):
+        await self.app.mqtt_mgr.publish_data(self.mqtt_data)
+
+    async def get_system_data(self):
+        self.app.system_mgr.get_system_data()
+
+    async def weather_refresh(self):
+        display_mgr = self.app.enviro_plus_display_mgr
+        display_mgr.cached_weather_data = await self.app.data_mgr.get_weather_data_from_api()
+
+
+async def measure(stage, iterations, alloc_iterations):
+    collector = sys.modules["gc"]
+    collections = collector.collections
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter_ns()
+        await stage()
+        samples.append(time.perf_counter_ns() - start)
+    gc_collects = collector.collections - collections
+
+    # Separate pass, tracemalloc slows every allocation down
+    tracemalloc.start()
+    peaks = []
+    retained = 0
+    try:
+        for _ in range(alloc_iterations):
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            await stage()
+            current, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - before)
+            retained += current - before
+    finally:
+        tracemalloc.stop()
+
+    samples.sort()
+    peaks.sort()
+    return {
+        "median_us": round(samples[len(samples) // 2] / 1000, 1),
+        "p95_us": round(samples[len(samples) * 95 // 100] / 1000, 1),
+        "alloc_peak_bytes": peaks[len(peaks) // 2],
+        "retained_bytes": retained // alloc_iterations,
+        "gc_collects": round(gc_collects / iterations, 3),
+    }
+
+
+def run_scenario(name, iterations, alloc_iterations):
+    scenario, extra = SCENARIOS[name]
+    results = {}
+    # Keep the simulation itself out of the numbers: no recorded history, no modelled latency
+    # (blocking network calls back to back would also starve the paused watchdog job)
+    sim.board.frame_history = 1
+    sim.loopback.broker.history = 0
+    sim.loopback.http_latency_ms = 0
+    sim.loopback.mqtt_connect_ms = 0
+    with firmware.session(scenario, quiet=True):
+        import uasyncio
+        from enviro_pi import EnviroPi
+
+        async def bench():
+            app = EnviroPi()
+            task = uasyncio.create_task(app.run())
+            await uasyncio.sleep(WARMUP_S)
+            pipeline = Pipeline(app)
+            for stage_name, stage in pipeline.stages(extra).items():
+                results[stage_name] = await measure(stage, iterations, alloc_iterations)
+            task.cancel()
+
+        sim.clock.run(bench())
+    return results
+
+
+def compare(results, baseline, time_tolerance, alloc_tolerance, min_us=20, min_bytes=256):
+    failures = []
+    for scenario, stages in results.items():
+        for stage, current in stages.items():
+            reference = baseline.get(scenario, {}).get(stage)
+            if reference is None:
+                continue
+            label = f"{scenario}/{stage}"
+            limit = reference["median_us"] * (1 + time_tolerance) + min_us
+            if current["median_us"] > limit:
+                failures.append(f"{label}: median {current['median_us']}us, baseline {reference['median_us']}us")
+            limit = reference["alloc_peak_bytes"] * (1 + alloc_tolerance) + min_bytes
+            if current["alloc_peak_bytes"] > limit:
+                failures.append(f"{label}: allocates {current['alloc_peak_bytes']}B, baseline {reference['alloc_peak_bytes']}B")
+            limit = reference["retained_bytes"] * (1 + alloc_tolerance) + min_bytes
+            if current["retained_bytes"] > limit:
+                failures.append(f"{label}: retains {current['retained_bytes']}B per call, baseline {reference['retained_bytes']}B")
+            if current["gc_collects"] > reference["gc_collects"]:
+                failures.append(f"{label}: {current['gc_collects']} gc.collect() per call, baseline {reference['gc_collects']}")
+    return failures
+
+
+def print_table(results, out=sys.stderr):
+    print(f"{'stage':<32}{'median us':>11}{'p95 us':>10}{'alloc B':>10}{'kept B':>9}{'gc':>6}", file=out)
+    for scenario, stages in results.items():
+        for stage, r in stages.items():
+            print(f"{scenario + '/' + stage:<32}{r['median_us']:>11}{r['p95_us']:>10}"
+                  f"{r['alloc_peak_bytes']:>10}{r['retained_bytes']:>9}{r['gc_collects']:>6}", file=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), help="default: all")
+    parser.add_argument("--iterations", type=int, default=200, help="timed calls per stage")
+    parser.add_argument("--alloc-iterations", type=int, default=20, help="traced calls per stage")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--update-baseline", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--time-tolerance", type=float, default=1.0, help="allowed slowdown (1.0 = 2x)")
+    parser.add_argument("--alloc-tolerance", type=float, default=0.25, help="allowed allocation growth")
+    parser.add_argument("-o", "--output", help="write the results JSON here")
+    args = parser.parse_args(argv)
+
+    # Firmware behaviour (what runs when) only depends on device time, keep it repeatable
+    sim.clock.realtime_compute = False
+    results = {}
+    for name in args.scenario or SCENARIOS:
+        results[name] = run_scenario(name, args.iterations, args.alloc_iterations)
+    report = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "iterations": args.iterations,
+        "results": results,
+    }
+    print_table(results)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline written to {args.baseline}", file=sys.stderr)
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}, run with --update-baseline first", file=sys.stderr)
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    failures = compare(results, baseline["results"], args.time_tolerance, args.alloc_tolerance)
+    for failure in failures:
+        print(f"REGRESSION {failure}", file=sys.stderr)
+    if not failures:
+        print("No regressions against the baseline", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
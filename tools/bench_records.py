@@ -0,0 +1,153 @@
+"""Allocation benchmark for the per-tick sensor/system records.
+
+Compares the previous dict-per-reading data path with the preallocated
+records in ``managers/data_records.py`` and prints the heap churn per tick.
+Under MicroPython (the unix port, or the device with src/ on the path) it
+measures gc.mem_alloc() deltas with automatic collection off, which is what
+the device sees. Under CPython it falls back to tracemalloc; CPython lays
+out __slots__ classes differently and MicroPython ignores __slots__, so
+those figures only show the direction of the change, not device bytes.
+
+    micropython tools/bench_records.py [ticks]
+    python tools/bench_records.py [ticks]
+"""
+import gc
+import sys
+
+sys.path.insert(0, __file__.rsplit("/", 1)[0] + "/../src" if "/" in __file__ else "../src")
+
+from managers.data_records import EnviroRecord, SystemRecord, ADCRecord  # noqa: E402
+
+ADC_PINS = [26, 27, 28, 29]
+
+
+def reading(tick):
+    # Vary the values so floats are freshly allocated on both paths
+    return 21.5 + (tick % 7) * 0.1, 1013.25 + tick % 3, 55.0 + tick % 5
+
+
+def dict_tick(tick, state):
+    temperature, pressure, humidity = reading(tick)
+    sensor_data = {
+        "temperature": temperature,
+        "humidity": humidity,
+        "pressure": pressure,
+        "gas": 42000,
+        "gas_quality": "Good",
+        "lux": 120.0,
+        "mic": 35.5,
+        "status": 0xB0,
+    }
+    adc_readings = state.setdefault("adc", {})
+    for pin in ADC_PINS:
+        adc_readings[f"adc_{pin}"] = temperature / 10
+    system_data = {
+        "system": {
+            "internal_voltage": round(temperature / 5, 2),
+            "chip_temperature": round(temperature, 2),
+            "cpu_frequency": 125.0,
+            "cpu_usage": 1.0,
+            "ram_usage": round(humidity, 2),
+            "timestamp": tick,
+            "uptime": "0d 00:00:00",
+        },
+        "adc": {f"adc_{pin}": round(adc_readings.get(f"adc_{pin}", 0), 2) for pin in ADC_PINS},
+    }
+    state["mqtt"] = {
+        "enviro-plus": sensor_data,
+        "system": system_data["system"],
+        "adc": system_data["adc"],
+        "current_config": None,
+    }
+
+
+def record_tick(tick, state):
+    if not state:
+        state["enviro"] = EnviroRecord()
+        state["system"] = SystemRecord()
+        state["adc"] = ADCRecord(ADC_PINS)
+        state["system_data"] = {"system": state["system"], "adc": state["adc"]}
+        state["mqtt"] = {"enviro-plus": None, "system": None, "adc": None, "current_config": None}
+
+    temperature, pressure, humidity = reading(tick)
+    record = state["enviro"]
+    record.temperature = temperature
+    record.humidity = humidity
+    record.pressure = pressure
+    record.gas = 42000
+    record.gas_quality = "Good"
+    record.lux = 120.0
+    record.mic = 35.5
+    record.status = 0xB0
+
+    values = state["adc"].values
+    for index in range(len(ADC_PINS)):
+        values[index] = round(temperature / 10, 2)
+
+    system = state["system"]
+    system.internal_voltage = round(temperature / 5, 2)
+    system.chip_temperature = round(temperature, 2)
+    system.cpu_frequency = 125.0
+    system.cpu_usage = 1.0
+    system.ram_usage = round(humidity, 2)
+    system.timestamp = tick
+    system.uptime = "0d 00:00:00"
+
+    mqtt = state["mqtt"]
+    mqtt["enviro-plus"] = record
+    mqtt["system"] = state["system_data"]["system"]
+    mqtt["adc"] = state["system_data"]["adc"]
+
+
+def measure_mem_alloc(tick_fn, ticks):
+    state = {}
+    tick_fn(0, state)  # Warm-up so one-off allocations are not counted
+    gc.collect()
+    gc.disable()  # A collection would make a delta negative
+    churn = 0
+    try:
+        for tick in range(1, ticks + 1):
+            before = gc.mem_alloc()
+            tick_fn(tick, state)
+            churn += gc.mem_alloc() - before
+            if tick % 100 == 0:
+                gc.collect()  # Between ticks, outside any measured delta
+    finally:
+        gc.enable()
+    return churn / ticks
+
+
+def measure_tracemalloc(tick_fn, ticks):
+    import tracemalloc
+    state = {}
+    tick_fn(0, state)
+    tracemalloc.start()
+    churn = 0
+    for tick in range(1, ticks + 1):
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        tick_fn(tick, state)
+        _, peak = tracemalloc.get_traced_memory()
+        churn += peak - before
+    tracemalloc.stop()
+    return churn / ticks
+
+
+def main():
+    ticks = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    if hasattr(gc, "mem_alloc"):
+        measure, method = measure_mem_alloc, "gc.mem_alloc (MicroPython)"
+    else:
+        measure, method = measure_tracemalloc, "tracemalloc (CPython, not device bytes)"
+    dict_bytes = measure(dict_tick, ticks)
+    record_bytes = measure(record_tick, ticks)
+    print(f"method: {method}")
+    print(f"ticks: {ticks}")
+    print(f"dict per tick:   {dict_bytes:8.1f} bytes")
+    print(f"record per tick: {record_bytes:8.1f} bytes")
+    if dict_bytes:
+        print(f"reduction:       {(1 - record_bytes / dict_bytes) * 100:8.1f} %")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""Record sensor captures on the simulated board, replay them through the pipeline and diff outputs.
+
+A capture holds the raw BME68X, LTR559, microphone and ADC readings in the layout written by
+``managers/sensor_recorder.py``. Captures taken on the device (``control/record``, then copy
+``SENSOR_RECORD_FILE`` off the flash) replay the same way:
+
+    python tools/replay.py record --seconds 3600 capture.bin --scenario outage.json
+    python tools/replay.py run capture.bin -o new.jsonl                  # as fast as possible
+    python tools/replay.py run capture.bin --speed 60 --no-publish
+    python tools/replay.py run capture.bin --src ../enviro-pi-main/src -o old.jsonl
+    python tools/replay.py diff old.jsonl new.jsonl --tolerance 0.01
+
+``run`` prints the replay report (samples per second, publishes) as JSON. ``--diff`` compares the
+outputs with an earlier run and exits with 1 when a value moved by more than the tolerance.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import sim  # noqa: E402
+from sim import firmware, scenario as scenarios  # noqa: E402
+
+WARMUP_S = 30  # WiFi and MQTT are up by then, so replayed samples can be published
+
+
+def record(seconds, output, scenario=None):
+    with firmware.session(scenario, quiet=True) as flash:
+        import uasyncio
+        from enviro_pi import EnviroPi
+
+        async def capture():
+            app = EnviroPi()
+            task = uasyncio.create_task(app.run())
+            app.handle_record_command("start")
+            await uasyncio.sleep(seconds)
+            app.handle_record_command("stop")
+            task.cancel()
+            return app.sensor_recorder
+
+        recorder = sim.clock.run(capture())
+        shutil.copyfile(os.path.join(flash, recorder.file), output)
+    return recorder.recorded
+
+
+def replay(path, speed=0, publish=True, output=None):
+    path = os.path.abspath(path)
+    output = os.path.abspath(output) if output else None
+    with firmware.session(quiet=True):
+        import uasyncio
+        from enviro_pi import EnviroPi
+
+        async def run():
+            app = EnviroPi()
+            task = uasyncio.create_task(app.run())
+            await uasyncio.sleep(WARMUP_S)
+            report = await app.replay_sensors(path, speed, publish, output)
+            task.cancel()
+            return report
+
+        return sim.clock.run(run())
+
+
+def load_outputs(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def diff(old_path, new_path, tolerance=0.0):
+    # Per field: how many samples moved by more than `tolerance` and the largest move
+    old, new = load_outputs(old_path), load_outputs(new_path)
+    fields = {}
+    for before, after in zip(old, new):
+        for group in ("enviro-plus", "adc"):
+            for key, value in after.get(group, {}).items():
+                previous = before.get(group, {}).get(key)
+                name = f"{group}/{key}"
+                if isinstance(value, (int, float)) and isinstance(previous, (int, float)):
+                    delta = abs(value - previous)
+                    changed = delta > tolerance
+                else:
+                    delta = None
+                    changed = value != previous
+                if changed:
+                    entry = fields.setdefault(name, {"changed": 0, "max_delta": 0, "first_t": after.get("t")})
+                    entry["changed"] += 1
+                    if delta is not None:
+                        entry["max_delta"] = max(entry["max_delta"], round(delta, 6))
+    return {"samples_old": len(old), "samples_new": len(new), "fields": fields}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    record_parser = commands.add_parser("record", help="capture raw readings on the simulated board")
+    record_parser.add_argument("output")
+    record_parser.add_argument("--seconds", type=float, default=600, help="device seconds to record")
+    record_parser.add_argument("--scenario", help="scenario JSON file shaping the signals")
+
+    run_parser = commands.add_parser("run", help="replay a capture through the firmware pipeline")
+    run_parser.add_argument("capture")
+    run_parser.add_argument("--speed", type=float, default=0, help="time acceleration, 0 = as fast as possible")
+    run_parser.add_argument("--no-publish", action="store_true", help="stop before MQTTManager.publish_data")
+    run_parser.add_argument("--src", help="firmware tree to replay through instead of src/")
+    run_parser.add_argument("-o", "--output", help="write the pipeline outputs as JSON lines")
+    run_parser.add_argument("--diff", help="outputs of an earlier run to compare against")
+    run_parser.add_argument("--tolerance", type=float, default=0.0)
+
+    diff_parser = commands.add_parser("diff", help="compare the outputs of two runs")
+    diff_parser.add_argument("old")
+    diff_parser.add_argument("new")
+    diff_parser.add_argument("--tolerance", type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    if args.command == "record":
+        scenario = scenarios.load(args.scenario) if args.scenario else None
+        samples = record(args.seconds, args.output, scenario)
+        print(f"{samples} samples written to {args.output}", file=sys.stderr)
+        return 0
+
+    if args.command == "diff":
+        result = diff(args.old, args.new, args.tolerance)
+        print(json.dumps(result, indent=2))
+        return 1 if result["fields"] else 0
+
+    if args.src:
+        firmware.SRC_DIR = os.path.abspath(args.src)
+    output = args.output
+    if args.diff and not output:
+        output = os.path.splitext(args.capture)[0] + ".out.jsonl"
+    report = replay(args.capture, args.speed, not args.no_publish, output)
+    if report is None:
+        print("Replay failed, see the firmware log", file=sys.stderr)
+        return 1
+    print(json.dumps(report, indent=2))
+    if args.diff:
+        result = diff(args.diff, output, args.tolerance)
+        print(json.dumps(result, indent=2))
+        return 1 if result["fields"] else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,66 @@
+"""Host-side simulation of the Enviro-Pi hardware.
+
+Importing this package creates one simulated board; ``install()`` then puts the stand-in
+modules under ``tools/sim/modules`` (``machine``, ``picographics``, ``network``, ``utime``,
+``uasyncio``, ...) in front of the import path so ``src/`` runs unmodified under CPython:
+
+    clock     VirtualClock: ticks, RTC and an event loop that skips idle time
+    signals   scripted sensor waveforms, read by the sensor and ADC stand-ins
+    board     GPIO levels, button presses, ADC channels, watchdog, lightsleep
+    loopback  WiFi access point, MQTT broker, HTTP services and an NTP server
+
+``tools/simulate.py`` runs the whole firmware on top of it.
+"""
+import importlib.util
+import os
+import socket
+import sys
+
+from sim.clock import VirtualClock
+from sim.waveforms import Signals, Waveform
+from sim.board import Board, MachineReset, WatchdogStarved
+from sim.loopback import Loopback
+
+MODULES_DIR = os.path.join(os.path.dirname(__file__), "modules")
+
+clock = VirtualClock()
+signals = Signals(clock)
+board = Board(clock, signals)
+loopback = Loopback(clock, signals)
+
+
+def install():
+    if MODULES_DIR in sys.path:
+        return
+    sys.path.insert(0, MODULES_DIR)
+
+    # gc is built into CPython, so the stand-in has to be placed in sys.modules by hand
+    spec = importlib.util.spec_from_file_location("gc", os.path.join(MODULES_DIR, "_gc.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    sys.modules["gc"] = module
+
+    # MicroPython's os.dupterm; the rest of os works as is
+    if not hasattr(os, "dupterm"):
+        os.dupterm = _dupterm
+
+    # Names under .sim resolve to the loopback services, everything else goes to the host resolver
+    socket.getaddrinfo = loopback.getaddrinfo
+
+
+def _dupterm(stream, index=0):
+    previous = board.dupterm_stream
+    board.dupterm_stream = stream
+    return previous
+
+
+def reset(seed=0):
+    # Fresh board state between runs in the same process (benchmarks)
+    clock.reset()
+    signals.reset(seed)
+    board.reset()
+    loopback.reset()
+
+
+__all__ = ["clock", "signals", "board", "loopback", "install", "reset",
+           "Waveform", "MachineReset", "WatchdogStarved"]
@@ -0,0 +1,131 @@
+import sys
+
+
+class MachineReset(SystemExit):
+    # machine.reset() ends the run: SystemExit passes every `except Exception` in the firmware
+    pass
+
+
+class WatchdogStarved(MachineReset):
+    pass
+
+
+class Board:
+    # GPIO levels, ADC channels, the watchdog and the attached peripherals of the simulated Pico W
+    TEMP_SENSOR_CHANNEL = 4
+    BUTTON_PINS = {"A": 12, "B": 13, "X": 14, "Y": 15}
+
+    def __init__(self, clock, signals):
+        self.clock = clock
+        self.signals = signals
+        self.cpu_freq = 125000000
+        self.heap_size = 4 * 1024 * 1024  # Generous, CPython objects are several times larger
+        self.frame_history = 64  # Frames each display keeps
+        self.reset()
+        clock.watchers.append(self.check_watchdog)
+
+    def reset(self):
+        self.levels = {}
+        self.irqs = {}
+        self.pin_listeners = {}
+        self.displays = []
+        self.leds = []
+        self.led_rgb = (0, 0, 0)
+        self.external_button_pin = None
+
+        self.wdt_timeout_us = None
+        self.wdt_last_feed_us = 0
+        self.wdt_feeds = 0
+        self.wdt_starvations = []
+        self.strict_watchdog = False
+
+        self.sleeps = 0
+        self.sleep_us_total = 0
+        self.woken = False
+        self.resets = 0
+        self.dupterm_stream = None
+
+    # -- GPIO ----------------------------------------------------------------------------------
+
+    def level(self, pin_id, default=1):
+        return self.levels.get(pin_id, default)
+
+    def drive(self, pin_id, level):
+        # The firmware wrote an output pin (pump, LED); listeners model what is wired to it
+        level = 1 if level else 0
+        if self.levels.get(pin_id) == level:
+            return
+        self.levels[pin_id] = level
+        for listener in self.pin_listeners.get(pin_id, ()):
+            listener(level)
+
+    def add_pin_listener(self, pin_id, listener):
+        self.pin_listeners.setdefault(pin_id, []).append(listener)
+
+    def set_input(self, pin_id, level):
+        # Something outside the board changed an input; IRQs fire like they would on the edge
+        previous = self.levels.get(pin_id, 1)
+        self.levels[pin_id] = level
+        irq = self.irqs.get(pin_id)
+        if irq is None or previous == level:
+            return
+        handler, trigger, pin = irq
+        edge = 8 if level else 4  # IRQ_RISING / IRQ_FALLING on the rp2 port
+        if trigger & edge:
+            self.woken = True
+            handler(pin)
+
+    def set_irq(self, pin_id, handler, trigger, pin):
+        if handler is None:
+            self.irqs.pop(pin_id, None)
+        else:
+            self.irqs[pin_id] = (handler, trigger, pin)
+
+    def press(self, button, at_s, hold_ms=1000):
+        # Buttons are active low with pull-ups; EXT is the momentary button from the config
+        pin_id = self.BUTTON_PINS.get(button, self.external_button_pin if button == "EXT" else button)
+        self.clock.at(at_s, lambda: self.set_input(pin_id, 0))
+        self.clock.at(at_s + hold_ms / 1000, lambda: self.set_input(pin_id, 1))
+
+    # -- ADC -----------------------------------------------------------------------------------
+
+    def read_adc(self, channel):
+        if channel == self.TEMP_SENSOR_CHANNEL:
+            # RP2040 sensor: 0.706 V at 27 C, -1.721 mV per degree
+            volts = 0.706 - (self.signals.read("chip_temperature", 27.0) - 27) * 0.001721
+            return max(0, min(65535, int(volts / 3.3 * 65535)))
+        value = self.signals.read(f"adc{26 + channel}", 0)
+        return max(0, min(65535, int(value)))
+
+    # -- watchdog and sleep --------------------------------------------------------------------
+
+    def arm_watchdog(self, timeout_ms):
+        self.wdt_timeout_us = timeout_ms * 1000
+        self.wdt_last_feed_us = self.clock.now_us()
+
+    def feed_watchdog(self):
+        self.wdt_feeds += 1
+        self.wdt_last_feed_us = self.clock.now_us()
+
+    def check_watchdog(self, now_us):
+        if self.wdt_timeout_us is None or now_us - self.wdt_last_feed_us <= self.wdt_timeout_us:
+            return
+        starved_ms = (now_us - self.wdt_last_feed_us) // 1000
+        self.wdt_starvations.append((round(now_us / 1000000, 3), starved_ms))
+        print(f"[sim] watchdog starved for {starved_ms}ms at t={now_us / 1000000:.3f}s, "
+              "the board would have reset", file=sys.stderr)
+        self.wdt_last_feed_us = now_us
+        if self.strict_watchdog:
+            raise WatchdogStarved(f"watchdog starved for {starved_ms}ms")
+
+    def lightsleep(self, ms):
+        # The core stops until the timeout or a wake IRQ; timers keep running (they wake it too)
+        self.woken = False
+        start = self.clock.now_us()
+        self.clock.advance(ms * 1000, until=lambda: self.woken)
+        self.sleeps += 1
+        self.sleep_us_total += self.clock.now_us() - start
+
+    def machine_reset(self):
+        self.resets += 1
+        raise MachineReset(f"machine.reset() at t={self.clock.seconds():.3f}s")
@@ -0,0 +1,235 @@
+import asyncio
+import heapq
+import selectors
+import threading
+import time
+
+TICKS_PERIOD = 1 << 30  # MicroPython ticks_ms/ticks_us wrap here
+PICO_RTC_EPOCH = 1609459200  # 2021-01-01 00:00:00, what the RP2040 RTC reads before it is set
+
+
+class ClockTimer:
+    __slots__ = ("due_us", "period_us", "callback", "cancelled")
+
+    def __init__(self, due_us, period_us, callback):
+        self.due_us = due_us
+        self.period_us = period_us
+        self.callback = callback
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class VirtualClock:
+    # Device time is host compute time plus every idle period that was skipped instead of waited
+    # for. With realtime_compute off, time only moves when the firmware sleeps or idles, which
+    # makes runs repeatable at the cost of reporting zero cost for pure computation.
+    def __init__(self, start_epoch=1717243200, drift_ppm=0, ticks_start_ms=0, realtime_compute=True):
+        self.realtime_compute = realtime_compute
+        self.skip_idle = True  # Off: idle time is waited for, e.g. while a real client talks to the firmware
+        self.start_epoch = start_epoch  # True (NTP) time at boot
+        self.drift_ppm = drift_ppm  # The board's oscillator runs this much fast against true time
+        self.ticks_start_us = ticks_start_ms * 1000
+        self.rtc_base_us = PICO_RTC_EPOCH * 1000000
+        self.skipped_us = 0
+        self.origin_ns = time.perf_counter_ns()
+        self.stop_at_s = None
+        self.owner = threading.get_ident()
+
+        self.timers = []
+        self.timer_seq = 0
+        self.soon = []
+        self.watchers = []
+        self.loop_hooks = []
+
+    def reset(self):
+        self.skipped_us = 0
+        self.origin_ns = time.perf_counter_ns()
+        self.rtc_base_us = PICO_RTC_EPOCH * 1000000
+        self.timers.clear()
+        self.soon.clear()
+        self.owner = threading.get_ident()
+
+    # -- time sources --------------------------------------------------------------------------
+
+    def now_us(self):
+        if self.realtime_compute:
+            return (time.perf_counter_ns() - self.origin_ns) // 1000 + self.skipped_us
+        return self.skipped_us
+
+    def seconds(self):
+        return self.now_us() / 1000000
+
+    def ticks_us(self):
+        return (self.now_us() + self.ticks_start_us) % TICKS_PERIOD
+
+    def ticks_ms(self):
+        return ((self.now_us() + self.ticks_start_us) // 1000) % TICKS_PERIOD
+
+    def rtc_us(self):
+        return self.rtc_base_us + self.now_us()
+
+    def set_rtc(self, epoch_seconds):
+        self.rtc_base_us = epoch_seconds * 1000000 - self.now_us()
+
+    def true_time(self):
+        # What an NTP server would answer: local elapsed time corrected for the oscillator drift
+        return self.start_epoch + self.now_us() / (1000000 + self.drift_ppm)
+
+    # -- timers (Timer IRQs, scripted inputs, scenario events) ---------------------------------
+
+    def schedule(self, delay_us, callback, period_us=None):
+        timer = ClockTimer(self.now_us() + max(0, int(delay_us)), period_us, callback)
+        self.timer_seq += 1
+        heapq.heappush(self.timers, (timer.due_us, self.timer_seq, timer))
+        return timer
+
+    def at(self, seconds, callback):
+        return self.schedule(seconds * 1000000 - self.now_us(), callback)
+
+    def call_soon(self, callback, arg=None):
+        # micropython.schedule(): runs once the current "IRQ" returns
+        self.soon.append((callback, arg))
+
+    def next_due_us(self):
+        while self.timers and self.timers[0][2].cancelled:
+            heapq.heappop(self.timers)
+        return self.timers[0][0] if self.timers else None
+
+    def run_due(self):
+        now = self.now_us()
+        while self.timers and self.timers[0][0] <= now:
+            _, _, timer = heapq.heappop(self.timers)
+            if timer.cancelled:
+                continue
+            if timer.period_us:
+                timer.due_us += timer.period_us
+                self.timer_seq += 1
+                heapq.heappush(self.timers, (timer.due_us, self.timer_seq, timer))
+            timer.callback()
+            now = self.now_us()
+        while self.soon:
+            callback, arg = self.soon.pop(0)
+            callback(arg)
+        for watcher in self.watchers:
+            watcher(now)
+
+    def advance(self, us, until=None):
+        # Skip `us` of device time, firing timers on the way; `until` ends the skip early (wake IRQ)
+        if threading.get_ident() != self.owner:
+            self._wait(us)
+            return
+        target = self.now_us() + int(us)
+        while True:
+            self.run_due()
+            if until is not None and until():
+                return
+            now = self.now_us()
+            if now >= target:
+                return
+            due = self.next_due_us()
+            step_to = target if due is None else min(target, due)
+            if step_to > now:
+                self.skipped_us += step_to - now
+
+    def _wait(self, us):
+        # Other threads (the core 1 worker) can't move the clock, they wait for the event loop to
+        target = self.now_us() + int(us)
+        while self.now_us() < target:
+            time.sleep(0.0002)
+
+    # -- event loop ----------------------------------------------------------------------------
+
+    def new_event_loop(self):
+        self.owner = threading.get_ident()
+        loop = VirtualTimeLoop(self)
+        loop.set_exception_handler(_exception_handler)
+        for hook in self.loop_hooks:
+            hook(loop)
+        return loop
+
+    def run(self, main):
+        # uasyncio.run(): stops after stop_at_s seconds of device time when that is set
+        loop = self.new_event_loop()
+        asyncio.set_event_loop(loop)
+        task = loop.create_task(main)
+        if self.stop_at_s is not None:
+            loop.call_at(self.stop_at_s, task.cancel)
+        try:
+            return loop.run_until_complete(task)
+        except asyncio.CancelledError:
+            if self.stop_at_s is None:
+                raise
+            return None
+        finally:
+            pending = [t for t in asyncio.all_tasks(loop) if not t.done()]
+            for t in pending:
+                t.cancel()
+            if pending:
+                loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            asyncio.set_event_loop(None)
+            loop.close()
+
+
+def _exception_handler(loop, context):
+    # machine.reset() from inside a task already ended the run, don't report it a second time
+    if isinstance(context.get("exception"), SystemExit):
+        return
+    loop.default_exception_handler(context)
+
+
+class _IdleSkippingSelector(selectors.BaseSelector):
+    # Wraps the real selector: sockets are polled without blocking, and the time the event loop
+    # would have spent waiting for its next timer is skipped on the virtual clock instead
+    def __init__(self, clock):
+        self.clock = clock
+        self.selector = selectors.DefaultSelector()
+
+    def register(self, fileobj, events, data=None):
+        return self.selector.register(fileobj, events, data)
+
+    def unregister(self, fileobj):
+        return self.selector.unregister(fileobj)
+
+    def modify(self, fileobj, events, data=None):
+        return self.selector.modify(fileobj, events, data)
+
+    def get_key(self, fileobj):
+        return self.selector.get_key(fileobj)
+
+    def get_map(self):
+        return self.selector.get_map()
+
+    def close(self):
+        self.selector.close()
+
+    def select(self, timeout=None):
+        self.clock.run_due()
+        ready = self.selector.select(0)
+        if ready or timeout == 0:
+            return ready
+        if not self.clock.skip_idle:
+            due_us = self.clock.next_due_us()
+            wait_s = timeout
+            if due_us is not None:
+                due_s = max(0, due_us - self.clock.now_us()) / 1000000
+                wait_s = due_s if wait_s is None else min(wait_s, due_s)
+            return self.selector.select(wait_s)
+        if timeout is None and self.clock.next_due_us() is None:
+            # Nothing scheduled at all, only another thread can wake the loop now
+            return self.selector.select(0.01)
+        wait_us = None if timeout is None else int(timeout * 1000000) + 1
+        if wait_us is None:
+            wait_us = self.clock.next_due_us() - self.clock.now_us()
+        self.clock.advance(wait_us)
+        return self.selector.select(0)
+
+
+class VirtualTimeLoop(asyncio.SelectorEventLoop):
+    def __init__(self, clock):
+        super().__init__(_IdleSkippingSelector(clock))
+        self.clock = clock
+
+    def time(self):
+        return self.clock.now_us() / 1000000
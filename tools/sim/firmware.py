@@ -0,0 +1,144 @@
+import contextlib
+import io
+import json
+import os
+import runpy
+import sys
+import tempfile
+import time
+
+import sim
+from sim import scenario as scenarios
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+
+# Keys the firmware reads that the template leaves out or fills with placeholders. Paths are
+# relative because the flash directory is the working directory, like "/" on the device.
+SIM_CONFIG = {
+    "WIFI_SSID": "enviro-sim",
+    "WIFI_PASSWORD": "sim",
+    "WIFI_COUNTRY": "DE",
+    "MQTT_CLIENT_NAME": "enviro-pi-sim",
+    "MQTT_BROKER_ADDRESS": "broker.sim",
+    "MQTT_BROKER_USER": "sim",
+    "MQTT_BROKER_PW": "sim",
+    "FLASH_LOG_DIR": "logs",
+    "TRACE_FILE": "trace.bin",
+    "SENSOR_RECORD_FILE": "sensors.bin",
+    "DST_HOURS": 2,
+    "DEFAULT_DISPLAY_MODE": "Sensor",
+    "ENVIRO_PLUS_MICROPHONE_PIN": 26,
+    "MOMENTARY_BUTTON_PIN": 3,
+    "HUMIDITY_OFFSET": 0,
+    "SENSOR_DATA_AVG_WINDOW_SIZE": 10,
+    "MIC_MIN_VALUE": 30000,
+    "MIC_MAX_VALUE": 65535,
+    "LIGHT_THRESHOLD_VERY_LOW": 50,
+    "LIGHT_THRESHOLD_LOW": 200,
+    "LIGHT_THRESHOLD_MODERATE": 500,
+    "LIGHT_THRESHOLD_GOOD": 1000,
+    "WEATHER_API_BASE_URL": "http://weather.sim/v1",
+    "WEATHER_API_TOKEN": "sim",
+    "WEATHER_FOR": "Simville",
+    "WEATHER_UPDATE_INTERVAL_IN_MINUTES": 10,
+    "INFLUXDB_HOST": "influx.sim",
+    "INFLUXDB_ORG": "sim",
+    "INFLUXDB_BUCKET": "enviro",
+    "INFLUXDB_TOKEN": "sim",
+    "INFLUXDB_LOOKUP_INTERVAL": 7,
+}
+
+
+def build_config(overrides=None):
+    with open(os.path.join(SRC_DIR, "config.json.template")) as f:
+        config = json.load(f)
+    config.update(SIM_CONFIG)
+    config["NTP_SERVERS"] = [sim.loopback.start_ntp()]
+    sim.loopback.start_http()
+    if overrides:
+        config.update(overrides)
+    return config
+
+
+def prepare_flash(config, root=None):
+    # <root>/config.json plus <root>/flash as the working directory: ConfigManager reads "../config.json"
+    root = root or tempfile.mkdtemp(prefix="enviro-sim-")
+    flash = os.path.join(root, "flash")
+    os.makedirs(flash, exist_ok=True)
+    with open(os.path.join(root, "config.json"), "w") as f:
+        json.dump(config, f, indent=4)
+    return flash
+
+
+def unload():
+    # Forget firmware and stand-in modules so the next boot starts from fresh module state
+    for name, module in list(sys.modules.items()):
+        path = getattr(module, "__file__", None) or ""
+        if name != "gc" and (path.startswith(SRC_DIR) or path.startswith(sim.MODULES_DIR)):
+            del sys.modules[name]
+
+
+@contextlib.contextmanager
+def session(scenario=None, overrides=None, root=None, quiet=False, seed=None, strict_watchdog=False):
+    # A fresh board with the firmware importable: src/ on the path, the flash directory as cwd
+    scenario = scenario or {}
+    seed = scenario.get("seed", 0) if seed is None else seed
+    config_overrides = dict(scenario.get("config", {}))
+    config_overrides.update(overrides or {})
+
+    sim.install()
+    unload()
+    sim.reset(seed)
+    config = build_config(config_overrides)
+    flash = prepare_flash(config, root)
+    sim.board.external_button_pin = config.get("MOMENTARY_BUTTON_PIN")
+    sim.board.strict_watchdog = strict_watchdog
+    scenarios.apply(scenario, config["MQTT_CLIENT_NAME"])
+
+    cwd = os.getcwd()
+    sys.path.insert(0, SRC_DIR)
+    try:
+        os.chdir(flash)
+        with contextlib.redirect_stdout(io.StringIO()) if quiet else contextlib.nullcontext():
+            yield flash
+    finally:
+        os.chdir(cwd)
+        sys.path.remove(SRC_DIR)
+
+
+def run(seconds, scenario=None, overrides=None, root=None, quiet=False, seed=None, strict_watchdog=False):
+    # Boots src/main.py on a fresh simulated board and runs it for `seconds` of device time
+    reset = None
+    wall_start = time.perf_counter()
+    with session(scenario, overrides, root, quiet, seed, strict_watchdog) as flash:
+        sim.clock.stop_at_s = seconds
+        try:
+            runpy.run_path(os.path.join(SRC_DIR, "main.py"), run_name="__main__")
+        except sim.MachineReset as e:
+            reset = str(e)
+        finally:
+            sim.clock.stop_at_s = None
+    return summary(time.perf_counter() - wall_start, reset, flash)
+
+
+def summary(wall_s, reset, flash):
+    device_s = sim.clock.seconds()
+    broker = sim.loopback.broker
+    return {
+        "device_s": round(device_s, 3),
+        "wall_s": round(wall_s, 3),
+        "speedup": round(device_s / wall_s, 1) if wall_s else None,
+        "reset": reset,
+        "frames": sum(display.frame_count for display in sim.board.displays),
+        "mqtt_published": broker.published,
+        "mqtt_bytes": broker.published_bytes,
+        "mqtt_connects": broker.connects,
+        "http_requests": len(sim.loopback.http_requests),
+        "http_connections": sim.loopback.http_connections,
+        "dns_lookups": sim.loopback.dns_lookups,
+        "ntp_requests": sim.loopback.ntp_requests,
+        "wdt_feeds": sim.board.wdt_feeds,
+        "wdt_starvations": sim.board.wdt_starvations,
+        "lightsleeps": sim.board.sleeps,
+        "flash_dir": flash,
+    }
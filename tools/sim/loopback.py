@@ -0,0 +1,291 @@
+import asyncio
+import json
+import socket
+import struct
+from collections import deque
+
+NTP_DELTA = 2208988800  # 1900 -> 1970
+SIM_DOMAIN = ".sim"
+HTTP_REASONS = {200: "OK", 204: "No Content", 400: "Bad Request", 404: "Not Found", 500: "Internal Server Error"}
+
+
+def topic_matches(pattern, topic):
+    pattern_parts = pattern.split("/")
+    topic_parts = topic.split("/")
+    for index, part in enumerate(pattern_parts):
+        if part == "#":
+            return True
+        if index >= len(topic_parts) or (part != "+" and part != topic_parts[index]):
+            return False
+    return len(pattern_parts) == len(topic_parts)
+
+
+class Session:
+    def __init__(self, client_id):
+        self.client_id = client_id
+        self.connected = False
+        self.subscriptions = {}
+        self.inbox = deque()
+
+
+class Broker:
+    # In-memory MQTT broker: keeps everything the device published and queues injected control
+    # messages for subscribed clients, QoS 1 ones also while a persistent session is offline
+    def __init__(self, clock, history=10000):
+        self.clock = clock
+        self.history = history
+        self.reset()
+
+    def reset(self):
+        self.sessions = {}
+        self.retained = {}
+        self.last = {}
+        self.messages = deque(maxlen=self.history)
+        self.published = 0
+        self.published_bytes = 0
+        self.connects = 0
+
+    def connect(self, client_id, clean_session=True):
+        session = self.sessions.get(client_id)
+        present = session is not None and not clean_session
+        if session is None or clean_session:
+            session = Session(client_id)
+            self.sessions[client_id] = session
+        session.connected = True
+        self.connects += 1
+        return present
+
+    def disconnect(self, client_id):
+        session = self.sessions.get(client_id)
+        if session:
+            session.connected = False
+
+    def subscribe(self, client_id, pattern, qos=0):
+        session = self.sessions[client_id]
+        session.subscriptions[pattern] = qos
+        for topic, payload in self.retained.items():
+            if topic_matches(pattern, topic):
+                session.inbox.append((topic, payload))
+
+    def publish(self, topic, payload, retain=False, sender=None):
+        if isinstance(topic, (bytes, bytearray)):
+            topic = bytes(topic).decode()
+        if isinstance(payload, str):
+            payload = payload.encode()
+        payload = bytes(payload)
+        self.published += 1
+        self.published_bytes += len(topic) + len(payload)
+        self.messages.append((round(self.clock.seconds(), 3), topic, payload))
+        self.last[topic] = payload
+        if retain:
+            self.retained[topic] = payload
+        for session in self.sessions.values():
+            if session.client_id == sender:
+                continue
+            for pattern, qos in session.subscriptions.items():
+                if topic_matches(pattern, topic) and (session.connected or qos > 0):
+                    session.inbox.append((topic, payload))
+                    break
+
+    def inject(self, topic, payload):
+        # A message from "the outside", e.g. a control command from Home Assistant
+        self.publish(topic, payload)
+
+    def value(self, topic, default=None):
+        payload = self.last.get(topic)
+        return default if payload is None else payload.decode()
+
+    def count(self, prefix=""):
+        return sum(1 for _, topic, _ in self.messages if topic.startswith(prefix))
+
+
+class Loopback:
+    # Everything past the radio: the access point, the MQTT broker, HTTP services and an NTP server.
+    # Outages are scheduled per service in device seconds.
+    def __init__(self, clock, signals):
+        self.clock = clock
+        self.signals = signals
+        self.broker = Broker(clock)
+        self.ssid = None  # Any SSID associates unless one is set here
+        self.ip = "192.168.4.23"
+        self.bssid = b"\x02\x00\x00\x5e\x00\x01"
+        self.channel = 6
+        self.wifi_connect_ms = 1500
+        self.mqtt_connect_ms = 40
+        self.http_latency_ms = 120
+        self.http_keepalive_s = 60  # Idle connections are closed after this, like a real web server
+        self.ntp_socket = None
+        self.http_socket = None
+        self.system_getaddrinfo = socket.getaddrinfo
+        self.reset()
+        clock.loop_hooks.append(self._attach)
+
+    def reset(self):
+        self.broker.reset()
+        self.outages = {"wifi": [], "broker": [], "http": [], "ntp": []}
+        self.routes = []
+        self.http_requests = []
+        self.http_connections = 0
+        self.dns_lookups = 0
+        self.ntp_requests = 0
+        self.associated = False
+        self.add_route("http://weather.sim/", self._weather)
+        self.add_route("http://influx.sim/", self._influx)
+
+    # -- outages -------------------------------------------------------------------------------
+
+    def outage(self, service, start_s, duration_s):
+        self.outages[service].append((start_s, start_s + duration_s))
+
+    def available(self, service):
+        t = self.clock.seconds()
+        for start, end in self.outages[service]:
+            if start <= t < end:
+                return False
+        if service != "wifi":
+            return self.associated and self.available("wifi")
+        return True
+
+    # -- HTTP ----------------------------------------------------------------------------------
+
+    def add_route(self, prefix, handler):
+        # handler(method, url, headers, body) -> (status, body, headers); latest route wins
+        self.routes.insert(0, (prefix, handler))
+
+    def route(self, method, url):
+        if not self.available("http"):
+            raise OSError(113, "EHOSTUNREACH")
+        for prefix, handler in self.routes:
+            if url.startswith(prefix):
+                self.http_requests.append((round(self.clock.seconds(), 3), method, url))
+                return handler
+        raise OSError(-2, "host not found")  # What getaddrinfo raises for an unknown name
+
+    def http(self, method, url, headers, body):
+        handler = self.route(method, url)
+        self.clock.advance(self.http_latency_ms * 1000)  # urequests blocks for the round trip
+        return handler(method, url, headers, body)
+
+    def start_http(self):
+        # The same routes over a real TCP socket on 127.0.0.1 for firmware that opens its own
+        # connections; getaddrinfo() hands out this address for every *.sim name
+        if self.http_socket is None:
+            self.http_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.http_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self.http_socket.bind(("127.0.0.1", 0))
+            self.http_socket.listen(8)
+            self.http_socket.setblocking(False)
+        return self.http_socket.getsockname()[1]
+
+    def getaddrinfo(self, host, port, *args, **kwargs):
+        # Replaces socket.getaddrinfo once the sim is installed: the loopback is the DNS server too
+        if not isinstance(host, str) or not host.endswith(SIM_DOMAIN) or self.http_socket is None:
+            return self.system_getaddrinfo(host, port, *args, **kwargs)
+        self.dns_lookups += 1
+        if not self.available("http"):
+            raise socket.gaierror(-3, "Temporary failure in name resolution")
+        address = ("127.0.0.1", self.http_socket.getsockname()[1])
+        return [(socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP, "", address)]
+
+    async def _serve_http(self):
+        await asyncio.start_server(self._on_http_connection, sock=self.http_socket)
+
+    async def _on_http_connection(self, reader, writer):
+        self.http_connections += 1
+        try:
+            while await self._answer_http(reader, writer):
+                pass
+        except (OSError, ValueError, asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    async def _answer_http(self, reader, writer):
+        # One request/response on a keep-alive connection; False once the connection should close
+        request_line = await asyncio.wait_for(reader.readline(), self.http_keepalive_s)
+        if not request_line:
+            return False
+        method, target, version = request_line.decode().split()
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if not line or line == b"\r\n":
+                break
+            name, _, value = line.decode().partition(":")
+            headers[name.strip().lower()] = value.strip()
+        length = int(headers.get("content-length", 0))
+        body = await reader.readexactly(length) if length else None
+        if not self.available("http"):
+            return False  # Outage: the request goes unanswered and the connection drops
+        host = headers.get("host", "").split(":")[0]
+        try:
+            handler = self.route(method, f"http://{host}{target}")
+        except OSError:
+            status, content, response_headers = 404, b"", {}
+        else:
+            await asyncio.sleep(self.http_latency_ms / 1000)
+            status, content, response_headers = handler(method, f"http://{host}{target}", headers, body)
+        keep = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+        head = f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}\r\nContent-Length: {len(content)}\r\n"
+        for name, value in response_headers.items():
+            head += f"{name}: {value}\r\n"
+        head += "Connection: keep-alive\r\n\r\n" if keep else "Connection: close\r\n\r\n"
+        writer.write(head.encode() + content)
+        await writer.drain()
+        return keep
+
+    def _weather(self, method, url, headers, body):
+        temp = round(self.signals.read("temperature") - 6, 1)
+        data = {
+            "location": {"name": "Simville", "localtime": "2024-06-01 12:00"},
+            "current": {
+                "temp_c": temp,
+                "feelslike_c": temp - 1,
+                "condition": {"text": "Partly cloudy", "icon": "//cdn.weatherapi.com/weather/64x64/day/116.png"},
+                "wind_kph": 11.2,
+                "wind_dir": "WSW",
+                "pressure_mb": round(self.signals.read("pressure") / 100),
+                "humidity": round(self.signals.read("humidity")),
+                "uv": 5,
+                "air_quality": {"pm2_5": 4.1, "pm10": 6.3, "co": 210.3, "no2": 3.2, "o3": 61.5},
+            },
+        }
+        return 200, json.dumps(data).encode(), {"Content-Type": "application/json"}
+
+    def _influx(self, method, url, headers, body):
+        csv = ",result,table,_time,_value\r\n,_result,0,2024-06-01T10:00:00Z,1200\r\n"
+        return 200, csv.encode(), {"Content-Type": "application/csv"}
+
+    # -- NTP -----------------------------------------------------------------------------------
+
+    def start_ntp(self):
+        # A real UDP socket on 127.0.0.1 that answers from the event loop with the clock's true time
+        if self.ntp_socket is None:
+            self.ntp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.ntp_socket.bind(("127.0.0.1", 0))
+            self.ntp_socket.setblocking(False)
+        return f"127.0.0.1:{self.ntp_socket.getsockname()[1]}"
+
+    def _attach(self, loop):
+        if self.ntp_socket is not None:
+            loop.add_reader(self.ntp_socket, self._on_ntp_request)
+        if self.http_socket is not None:
+            loop.create_task(self._serve_http())
+
+    def _on_ntp_request(self):
+        try:
+            request, address = self.ntp_socket.recvfrom(48)
+        except OSError:
+            return
+        self.ntp_requests += 1
+        if len(request) < 48 or not self.available("ntp"):
+            return  # Dropped, the client runs into its timeout
+        now = self.clock.true_time() + NTP_DELTA
+        seconds = int(now)
+        fraction = int((now - seconds) * (1 << 32))
+        response = bytearray(48)
+        response[0] = 0x24  # LI = 0, VN = 4, Mode = 4 (server)
+        response[1] = 2  # Stratum
+        struct.pack_into("!II", response, 32, seconds, fraction)  # Receive timestamp
+        struct.pack_into("!II", response, 40, seconds, fraction)  # Transmit timestamp
+        self.ntp_socket.sendto(response, address)
@@ -0,0 +1,48 @@
+# Installed as `gc`: CPython's collector plus MicroPython's heap figures. With tracemalloc running
+# the allocation figures are real (host) bytes, so heap churn can be compared between builds.
+import gc as _gc
+import tracemalloc as _tracemalloc
+from sim import board
+
+_threshold = -1
+collections = 0  # Explicit collect() calls, benchmarks flag new ones on hot paths
+_IDLE_ALLOC = 64 * 1024  # Reported when tracemalloc is off
+
+
+def __getattr__(name):
+    return getattr(_gc, name)
+
+
+def collect(generation=2):
+    global collections
+    collections += 1
+    return _gc.collect(generation)
+
+
+def enable():
+    _gc.enable()
+
+
+def disable():
+    _gc.disable()
+
+
+def isenabled():
+    return _gc.isenabled()
+
+
+def mem_alloc():
+    if _tracemalloc.is_tracing():
+        return _tracemalloc.get_traced_memory()[0]
+    return _IDLE_ALLOC
+
+
+def mem_free():
+    return max(0, board.heap_size - mem_alloc())
+
+
+def threshold(amount=None):
+    global _threshold
+    if amount is None:
+        return _threshold
+    _threshold = amount
@@ -0,0 +1,18 @@
+from sim import board
+
+
+class ADCFFT:
+    # Microphone FFT helper: update() takes a block from the ADC stand-in, get_scaled() reads bins
+    SAMPLES = 256
+
+    def __init__(self, adc_channel=0, adc_gpio=26, sample_rate=10000):
+        self.channel = adc_channel
+        self.bins = [0] * (self.SAMPLES // 2)
+
+    def update(self):
+        level = board.read_adc(self.channel) >> 8
+        for index in range(len(self.bins)):
+            self.bins[index] = level // (index + 1)
+
+    def get_scaled(self, index, scale):
+        return self.bins[index] * scale >> 8
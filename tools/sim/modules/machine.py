@@ -0,0 +1,176 @@
+from sim import board, clock
+
+PWRON_RESET = 1
+WDT_RESET = 3
+
+
+def freq(hz=None):
+    if hz is None:
+        return board.cpu_freq
+    board.cpu_freq = hz
+
+
+def reset():
+    board.machine_reset()
+
+
+def soft_reset():
+    board.machine_reset()
+
+
+def reset_cause():
+    return PWRON_RESET
+
+
+def lightsleep(ms=None):
+    board.lightsleep(ms if ms is not None else 0x7fffffff)
+
+
+def deepsleep(ms=None):
+    board.lightsleep(ms if ms is not None else 0x7fffffff)
+    board.machine_reset()  # Waking from deepsleep is a reset
+
+
+def idle():
+    pass
+
+
+def unique_id():
+    return b"\xe6\x61\x41\x04\x03\x2b\x5c\x2f"
+
+
+def disable_irq():
+    return 0
+
+
+def enable_irq(state=0):
+    pass
+
+
+class Pin:
+    IN = 0
+    OUT = 1
+    OPEN_DRAIN = 2
+    ALT = 3
+    PULL_UP = 1
+    PULL_DOWN = 2
+    IRQ_FALLING = 4
+    IRQ_RISING = 8
+
+    def __init__(self, id, mode=-1, pull=-1, value=None):
+        self.id = id
+        self.mode = mode
+        if value is not None:
+            board.drive(id, value)
+
+    def init(self, mode=-1, pull=-1, value=None):
+        self.mode = mode
+        if value is not None:
+            board.drive(self.id, value)
+
+    def value(self, value=None):
+        if value is None:
+            return board.level(self.id, 0 if self.mode == self.OUT else 1)
+        board.drive(self.id, value)
+
+    __call__ = value
+
+    def on(self):
+        board.drive(self.id, 1)
+
+    def off(self):
+        board.drive(self.id, 0)
+
+    high = on
+    low = off
+
+    def toggle(self):
+        board.drive(self.id, not board.level(self.id, 0))
+
+    def irq(self, handler=None, trigger=IRQ_FALLING | IRQ_RISING, hard=False, wake=None):
+        board.set_irq(self.id, handler, trigger, self)
+
+    def __repr__(self):
+        return f"Pin({self.id!r})"
+
+
+class ADC:
+    CORE_TEMP = 4
+
+    def __init__(self, pin):
+        # ADC(Pin(26)), ADC(26) and ADC(0) all select channel 0; channel 4 is the temperature sensor
+        pin_id = pin.id if isinstance(pin, Pin) else pin
+        self.channel = pin_id - 26 if isinstance(pin_id, int) and pin_id >= 26 else pin_id
+
+    def read_u16(self):
+        return board.read_adc(self.channel)
+
+
+class Timer:
+    ONE_SHOT = 0
+    PERIODIC = 1
+
+    def __init__(self, id=-1, **kwargs):
+        self.timer = None
+        if kwargs:
+            self.init(**kwargs)
+
+    def init(self, mode=PERIODIC, freq=None, period=None, tick_hz=1000, callback=None, hard=None):
+        self.deinit()
+        if freq is not None:
+            period_us = int(1000000 / freq)
+        else:
+            period_us = int((period if period is not None else 1000) * 1000000 / tick_hz)
+        if callback is None:
+            return
+
+        def fire():
+            callback(self)
+
+        self.timer = clock.schedule(period_us, fire, period_us if mode == self.PERIODIC else None)
+
+    def deinit(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+
+
+class WDT:
+    def __init__(self, id=0, timeout=5000):
+        board.arm_watchdog(timeout)
+
+    def feed(self):
+        board.feed_watchdog()
+
+
+class RTC:
+    def datetime(self, datetimetuple=None):
+        # (year, month, day, weekday, hours, minutes, seconds, subseconds)
+        import calendar
+        import time
+        if datetimetuple is None:
+            tm = time.gmtime(clock.rtc_us() // 1000000)
+            return (tm.tm_year, tm.tm_mon, tm.tm_mday, tm.tm_wday, tm.tm_hour, tm.tm_min, tm.tm_sec, 0)
+        y, mo, d, _, h, mi, s = datetimetuple[:7]
+        clock.set_rtc(calendar.timegm((y, mo, d, h, mi, s, 0, 0, 0)))
+
+
+class PWM:
+    def __init__(self, pin, freq=1000, duty_u16=0):
+        self.pin = pin
+        self._freq = freq
+        self._duty = duty_u16
+
+    def freq(self, value=None):
+        if value is None:
+            return self._freq
+        self._freq = value
+
+    def duty_u16(self, value=None):
+        if value is None:
+            return self._duty
+        self._duty = value
+        board.drive(self.pin.id, value > 0)
+
+    def deinit(self):
+        board.drive(self.pin.id, 0)
@@ -0,0 +1,58 @@
+from sim import board, clock
+
+_heap_locked = 0
+
+
+def const(value):
+    return value
+
+
+def native(func):
+    return func
+
+
+viper = native
+
+
+def alloc_emergency_exception_buf(size):
+    pass
+
+
+def opt_level(level=None):
+    return 0
+
+
+def schedule(callback, arg):
+    clock.call_soon(callback, arg)
+
+
+def heap_lock():
+    global _heap_locked
+    _heap_locked += 1
+
+
+def heap_unlock():
+    global _heap_locked
+    _heap_locked -= 1
+    return _heap_locked
+
+
+def stack_use():
+    return 1024
+
+
+def mem_info(verbose=None):
+    # Same layout as the rp2 port; free space is reported as one block so fragmentation reads 0
+    import gc
+    used = gc.mem_alloc()
+    free = gc.mem_free()
+    text = (f"stack: 1024 out of 7936\nGC: total: {used + free}, used: {used}, free: {free}\n"
+            f" No. of 1-blocks: 0, 2-blocks: 0, max blk sz: 0, max free sz: {free // 16}\n")
+    if board.dupterm_stream is not None:
+        board.dupterm_stream.write(text.encode())
+    else:
+        print(text, end="")
+
+
+def qstr_info(verbose=None):
+    print("qstr pool: n_pool=0, n_qstr=0, n_str_data_bytes=0, n_total_bytes=0")
@@ -0,0 +1,120 @@
+from sim import clock, loopback
+
+STA_IF = 0
+AP_IF = 1
+
+STAT_IDLE = 0
+STAT_CONNECTING = 1
+STAT_WRONG_PASSWORD = -3
+STAT_NO_AP_FOUND = -2
+STAT_CONNECT_FAIL = -1
+STAT_GOT_IP = 3
+
+
+class WLAN:
+    # CYW43 station interface associating with the loopback access point
+    PM_NONE = 0x10
+    PM_PERFORMANCE = 0xa11142
+    PM_POWERSAVE = 0x11
+
+    _instances = {}
+
+    def __new__(cls, interface=STA_IF):
+        # One object per interface, like the driver: every WLAN(STA_IF) shares the link state
+        instance = cls._instances.get(interface)
+        if instance is None:
+            instance = super().__new__(cls)
+            instance._setup(interface)
+            cls._instances[interface] = instance
+        return instance
+
+    def _setup(self, interface):
+        self.interface = interface
+        self.ssid = None
+        self.is_active = False
+        self.connect_done_us = None
+        self.static_config = None
+        self.pm = self.PM_PERFORMANCE
+
+    def active(self, value=None):
+        if value is None:
+            return self.is_active
+        self.is_active = bool(value)
+        if not value:
+            self.disconnect()
+
+    def connect(self, ssid=None, key=None, bssid=None):
+        self.is_active = True
+        loopback.associated = False
+        self.ssid = ssid
+        # A cached lease or BSSID (fast reconnect) skips the scan and the DHCP exchange
+        delay_ms = loopback.wifi_connect_ms // 3 if bssid or self.static_config else loopback.wifi_connect_ms
+        self.connect_done_us = clock.now_us() + delay_ms * 1000
+
+    def disconnect(self):
+        self.connect_done_us = None
+        loopback.associated = False
+
+    def status(self, param=None):
+        if param == "rssi":
+            if not self.isconnected():
+                raise OSError(-1, "not connected")
+            return int(loopback.signals.read("rssi", -60))
+        if not self.is_active or self.connect_done_us is None:
+            return STAT_IDLE
+        if not loopback.available("wifi"):
+            # Out of range: the link drops and stays down until the next connect()
+            if loopback.associated:
+                loopback.associated = False
+                self.connect_done_us = None
+                return STAT_IDLE
+            if clock.now_us() < self.connect_done_us:
+                return STAT_CONNECTING
+            self.connect_done_us = None
+            return STAT_NO_AP_FOUND
+        if loopback.associated:
+            return STAT_GOT_IP
+        if clock.now_us() < self.connect_done_us:
+            return STAT_CONNECTING
+        if loopback.ssid is not None and self.ssid != loopback.ssid:
+            self.connect_done_us = None
+            return STAT_NO_AP_FOUND
+        loopback.associated = True
+        return STAT_GOT_IP
+
+    def isconnected(self):
+        return self.status() == STAT_GOT_IP
+
+    def ifconfig(self, config=None):
+        if config is None:
+            if not self.isconnected():
+                return ("0.0.0.0", "0.0.0.0", "0.0.0.0", "0.0.0.0")
+            return self.static_config or (loopback.ip, "255.255.255.0", "192.168.4.1", "192.168.4.1")
+        self.static_config = None if config == "dhcp" else tuple(config)
+
+    def scan(self):
+        if not self.is_active or not loopback.available("wifi"):
+            return []
+        ssid = (loopback.ssid or self.ssid or "sim").encode()
+        rssi = int(loopback.signals.read("rssi", -60))
+        return [(ssid, loopback.bssid, loopback.channel, rssi, 3, 0),
+                (b"neighbour", b"\x02\x00\x00\x5e\x00\x02", 11, rssi - 20, 3, 0)]
+
+    def config(self, *args, **kwargs):
+        if "pm" in kwargs:
+            self.pm = kwargs["pm"]
+        if args:
+            if args[0] == "mac":
+                return b"\x28\xcd\xc1\x00\x00\x01"
+            if args[0] == "pm":
+                return self.pm
+            if args[0] == "ssid":
+                return self.ssid
+
+
+def country(code=None):
+    return "XX" if code is None else None
+
+
+def hostname(name=None):
+    return "enviro-pi" if name is None else None
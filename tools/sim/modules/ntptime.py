@@ -0,0 +1,14 @@
+from sim import clock, loopback
+
+host = "pool.ntp.org"
+timeout = 1
+
+
+def time():
+    if not loopback.available("ntp"):
+        raise OSError(110, "ETIMEDOUT")
+    return int(clock.true_time())
+
+
+def settime():
+    clock.set_rtc(time())
@@ -0,0 +1,108 @@
+from collections import deque
+from sim import board, clock
+
+DISPLAY_ENVIRO_PLUS = 12
+DISPLAY_PICO_DISPLAY = 1
+DISPLAY_PICO_DISPLAY_2 = 2
+PEN_RGB565 = 6
+
+_SIZES = {DISPLAY_ENVIRO_PLUS: (240, 240), DISPLAY_PICO_DISPLAY: (240, 135), DISPLAY_PICO_DISPLAY_2: (320, 240)}
+_GLYPH_WIDTHS = {"bitmap6": 5, "bitmap8": 6, "bitmap14_outline": 10, "sans": 9, "serif": 9}
+
+
+class PicoGraphics:
+    # Recording framebuffer: draw calls are collected per frame and kept when update() pushes
+    # the frame, so a run can be checked for what was on screen and when
+    def __init__(self, display=DISPLAY_ENVIRO_PLUS, rotate=0, bus=None, buffer=None, pen_type=PEN_RGB565):
+        width, height = _SIZES.get(display, (240, 240))
+        if rotate in (90, 270):
+            width, height = height, width
+        self.width = width
+        self.height = height
+        self.pens = []
+        self.pen = 0
+        self.font = "bitmap8"
+        self.thickness = 1
+        self.backlight = 1.0
+        self.ops = []
+        self.frames = deque(maxlen=board.frame_history)
+        self.frame_count = 0
+        self.op_count = 0
+        board.displays.append(self)
+
+    def _record(self, *op):
+        self.ops.append(op)
+        self.op_count += 1
+
+    def get_bounds(self):
+        return self.width, self.height
+
+    def create_pen(self, r, g, b):
+        self.pens.append((r, g, b))
+        return len(self.pens) - 1
+
+    def create_pen_hsv(self, h, s, v):
+        import colorsys
+        r, g, b = colorsys.hsv_to_rgb(h, s, v)
+        return self.create_pen(int(r * 255), int(g * 255), int(b * 255))
+
+    def set_pen(self, pen):
+        self.pen = pen
+
+    def set_font(self, font):
+        self.font = font
+
+    def set_thickness(self, thickness):
+        self.thickness = thickness
+
+    def set_backlight(self, brightness):
+        self.backlight = brightness
+
+    def set_clip(self, x, y, w, h):
+        pass
+
+    def remove_clip(self):
+        pass
+
+    def clear(self):
+        # A clear starts a new picture; anything drawn before it is gone
+        self.ops.clear()
+        self._record("clear", self.pen)
+
+    def pixel(self, x, y):
+        self._record("pixel", self.pen, x, y)
+
+    def pixel_span(self, x, y, length):
+        self._record("pixel_span", self.pen, x, y, length)
+
+    def line(self, x1, y1, x2, y2, thickness=None):
+        self._record("line", self.pen, x1, y1, x2, y2)
+
+    def rectangle(self, x, y, w, h):
+        self._record("rectangle", self.pen, x, y, w, h)
+
+    def circle(self, x, y, r):
+        self._record("circle", self.pen, x, y, r)
+
+    def triangle(self, x1, y1, x2, y2, x3, y3):
+        self._record("triangle", self.pen, x1, y1, x2, y2, x3, y3)
+
+    def polygon(self, *points):
+        self._record("polygon", self.pen, points)
+
+    def text(self, text, x, y, wordwrap=None, scale=2, angle=0, spacing=1, fixed_width=False):
+        self._record("text", self.pen, x, y, str(text), scale)
+
+    def measure_text(self, text, scale=2, spacing=1, fixed_width=False):
+        glyph = _GLYPH_WIDTHS.get(self.font, 6)
+        return len(str(text)) * (glyph + spacing) * scale
+
+    def update(self):
+        self.frames.append((round(clock.seconds(), 3), tuple(self.ops)))
+        self.frame_count += 1
+
+    def texts(self, frame=-1):
+        # The strings on a recorded frame, in drawing order
+        if not self.frames:
+            return []
+        return [op[4] for op in self.frames[frame][1] if op[0] == "text"]
@@ -0,0 +1,40 @@
+from sim import board
+
+BREAKOUT_GARDEN_I2C_PINS = {"sda": 4, "scl": 5}
+PICO_EXPLORER_I2C_PINS = {"sda": 20, "scl": 21}
+
+
+class RGBLED:
+    def __init__(self, r, g, b, invert=True):
+        self.pins = (r, g, b)
+        board.leds.append(self)
+
+    def set_rgb(self, r, g, b):
+        board.led_rgb = (r, g, b)
+
+    def set_hsv(self, h, s, v):
+        import colorsys
+        r, g, b = colorsys.hsv_to_rgb(h, s, v)
+        self.set_rgb(int(r * 255), int(g * 255), int(b * 255))
+
+
+class Button:
+    # read() is True once per press, like Pimoroni's Button without auto-repeat
+    def __init__(self, button, invert=True, repeat_time=200, hold_time=1000):
+        self.pin = button
+        self.invert = invert
+        self.last_state = False
+
+    def raw(self):
+        level = board.level(self.pin)
+        return level == 0 if self.invert else level == 1
+
+    def read(self):
+        state = self.raw()
+        pressed = state and not self.last_state
+        self.last_state = state
+        return pressed
+
+    @property
+    def is_pressed(self):
+        return self.raw()
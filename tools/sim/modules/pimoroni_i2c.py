@@ -0,0 +1,7 @@
+class PimoroniI2C:
+    def __init__(self, sda=4, scl=5, baudrate=400000):
+        self.sda = sda
+        self.scl = scl
+
+    def scan(self):
+        return [0x23, 0x77]  # LTR-559 and BME688 on the Enviro+ pack
@@ -0,0 +1,35 @@
+# uasyncio on top of asyncio, running on the virtual clock's event loop
+from asyncio import *  # noqa: F401,F403
+import asyncio as _asyncio
+from sim import clock as _clock
+
+
+async def sleep_ms(ms):
+    await _asyncio.sleep(ms / 1000)
+
+
+def wait_for_ms(awaitable, timeout):
+    return _asyncio.wait_for(awaitable, timeout / 1000)
+
+
+def run(main):
+    return _clock.run(main)
+
+
+def new_event_loop():
+    return _clock.new_event_loop()
+
+
+class ThreadSafeFlag:
+    def __init__(self):
+        self._event = _asyncio.Event()
+
+    def set(self):
+        self._event.set()
+
+    def clear(self):
+        self._event.clear()
+
+    async def wait(self):
+        await self._event.wait()
+        self._event.clear()
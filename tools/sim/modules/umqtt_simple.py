@@ -0,0 +1,76 @@
+from sim import clock, loopback
+
+
+class MQTTException(Exception):
+    pass
+
+
+class MQTTClient:
+    # umqtt.simple's API against the loopback broker; a lost link or broker surfaces as OSError
+    def __init__(self, client_id, server, port=0, user=None, password=None, keepalive=0,
+                 ssl=None, ssl_params={}):
+        if isinstance(client_id, bytes):
+            client_id = client_id.decode()
+        self.client_id = client_id
+        self.server = server
+        self.port = port or 1883
+        self.user = user
+        self.pswd = password
+        self.keepalive = keepalive
+        self.cb = None
+        self.lw_topic = None
+        self.connected = False
+
+    def set_callback(self, f):
+        self.cb = f
+
+    def set_last_will(self, topic, msg, retain=False, qos=0):
+        self.lw_topic = topic
+        self.lw_msg = msg
+        self.lw_retain = retain
+
+    def _check(self):
+        if not self.connected:
+            raise OSError(128, "ENOTCONN")
+        if not loopback.available("broker"):
+            self.connected = False
+            loopback.broker.disconnect(self.client_id)
+            raise OSError(104, "ECONNRESET")
+
+    def connect(self, clean_session=True):
+        if not loopback.available("broker"):
+            raise OSError(113, "EHOSTUNREACH")
+        clock.advance(loopback.mqtt_connect_ms * 1000)  # The CONNECT/CONNACK round trip blocks
+        self.connected = True
+        return loopback.broker.connect(self.client_id, clean_session)
+
+    def disconnect(self):
+        if self.connected:
+            loopback.broker.disconnect(self.client_id)
+        self.connected = False
+
+    def ping(self):
+        self._check()
+
+    def publish(self, topic, msg, retain=False, qos=0):
+        self._check()
+        loopback.broker.publish(topic, msg, retain, sender=self.client_id)
+
+    def subscribe(self, topic, qos=0):
+        self._check()
+        if isinstance(topic, bytes):
+            topic = topic.decode()
+        loopback.broker.subscribe(self.client_id, topic, qos)
+
+    def wait_msg(self):
+        self._check()
+        inbox = loopback.broker.sessions[self.client_id].inbox
+        if not inbox:
+            return None
+        topic, payload = inbox.popleft()
+        if self.cb:
+            self.cb(topic.encode(), payload)
+        return None
+
+    def check_msg(self):
+        return self.wait_msg()
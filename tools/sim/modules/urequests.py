@@ -0,0 +1,58 @@
+import json as _json
+from sim import loopback
+
+
+class Response:
+    def __init__(self, status_code, content, headers):
+        self.status_code = status_code
+        self.reason = b"OK" if status_code == 200 else b""
+        self.headers = headers
+        self.encoding = "utf-8"
+        self._content = content
+
+    def close(self):
+        self._content = None
+
+    @property
+    def content(self):
+        return self._content
+
+    @property
+    def text(self):
+        return str(self._content, self.encoding)
+
+    def json(self):
+        return _json.loads(self._content)
+
+
+def request(method, url, data=None, json=None, headers={}, stream=None, auth=None, timeout=None, parse_headers=True):
+    if json is not None:
+        data = _json.dumps(json)
+    if isinstance(data, str):
+        data = data.encode()
+    status, content, response_headers = loopback.http(method, url, headers, data)
+    return Response(status, content, response_headers)
+
+
+def head(url, **kw):
+    return request("HEAD", url, **kw)
+
+
+def get(url, **kw):
+    return request("GET", url, **kw)
+
+
+def post(url, **kw):
+    return request("POST", url, **kw)
+
+
+def put(url, **kw):
+    return request("PUT", url, **kw)
+
+
+def patch(url, **kw):
+    return request("PATCH", url, **kw)
+
+
+def delete(url, **kw):
+    return request("DELETE", url, **kw)
@@ -0,0 +1,61 @@
+import time as _time
+from sim import clock
+
+_TICKS_PERIOD = 1 << 30
+_TICKS_HALF = _TICKS_PERIOD // 2
+
+
+def ticks_ms():
+    return clock.ticks_ms()
+
+
+def ticks_us():
+    return clock.ticks_us()
+
+
+def ticks_cpu():
+    return clock.ticks_us()
+
+
+def ticks_add(ticks, delta):
+    return (ticks + delta) % _TICKS_PERIOD
+
+
+def ticks_diff(ticks1, ticks2):
+    return ((ticks1 - ticks2 + _TICKS_HALF) % _TICKS_PERIOD) - _TICKS_HALF
+
+
+def time():
+    return clock.rtc_us() // 1000000
+
+
+def time_ns():
+    return clock.rtc_us() * 1000
+
+
+def gmtime(secs=None):
+    # (year, month, mday, hour, minute, second, weekday, yearday), no time zones on the device
+    if secs is None:
+        secs = time()
+    tm = _time.gmtime(secs)
+    return (tm.tm_year, tm.tm_mon, tm.tm_mday, tm.tm_hour, tm.tm_min, tm.tm_sec, tm.tm_wday, tm.tm_yday)
+
+
+localtime = gmtime
+
+
+def mktime(tm):
+    import calendar
+    return calendar.timegm((tm[0], tm[1], tm[2], tm[3], tm[4], tm[5], 0, 0, 0))
+
+
+def sleep(seconds):
+    clock.advance(int(seconds * 1000000))
+
+
+def sleep_ms(ms):
+    clock.advance(ms * 1000)
+
+
+def sleep_us(us):
+    clock.advance(us)
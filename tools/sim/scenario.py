@@ -0,0 +1,45 @@
+import json
+
+import sim
+from sim.waveforms import Waveform
+
+# A scenario is a JSON object; every key is optional:
+#   "seconds":  device seconds to run
+#   "seed":     noise seed for the default waveforms
+#   "config":   config.json overrides
+#   "signals":  {name: {"base", "amplitude", "period_s", "phase_s", "noise", "minimum", "maximum",
+#                       "steps": [[t, delta]], "spikes": [[t, value, duration]], "holds": [[start, end, value]]}}
+#               without "base" the steps/spikes/holds are added to the default waveform
+#   "buttons":  [[button, t, hold_ms]]        A, B, X, Y or EXT
+#   "outages":  [[service, start, duration]]  wifi, broker, http or ntp
+#   "mqtt":     [[t, topic, payload]]         "{client}" in the topic is MQTT_CLIENT_NAME
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def apply(scenario, client_name):
+    for name, spec in scenario.get("signals", {}).items():
+        waveform = sim.signals.get(name)
+        if "base" in spec or not isinstance(waveform, Waveform):
+            shape = {key: spec[key] for key in ("base", "amplitude", "period_s", "phase_s", "noise", "minimum", "maximum")
+                     if key in spec}
+            waveform = sim.signals.set(name, Waveform(seed=sim.signals.seed, **shape))
+        for at_s, delta in spec.get("steps", ()):
+            waveform.step(at_s, delta)
+        for spike in spec.get("spikes", ()):
+            waveform.spike(*spike)
+        for start, end, value in spec.get("holds", ()):
+            waveform.hold(start, end, value)
+
+    for button in scenario.get("buttons", ()):
+        sim.board.press(*button)
+
+    for service, start, duration in scenario.get("outages", ()):
+        sim.loopback.outage(service, start, duration)
+
+    for at_s, topic, payload in scenario.get("mqtt", ()):
+        topic = topic.replace("{client}", client_name)
+        sim.clock.at(at_s, lambda topic=topic, payload=payload: sim.loopback.broker.inject(topic, payload))
@@ -0,0 +1,110 @@
+import math
+import random
+
+
+class SoilModel:
+    # One pot as a water bucket. The pump pin adds flow_ml_min while it is high; the plant and the
+    # surface lose water faster when it is warm and bright (the temperature and lux signals), and
+    # water above field capacity drains out of the bottom within hours. Each probe turns the
+    # moisture fraction into a raw ADC value between its dry and wet calibration points.
+    def __init__(self, clock, signals, board, pump_pin=22, capacity_ml=1500, moisture=0.45,
+                 et_ml_day=180, field_capacity=0.8, drain_per_h=0.5, flow_ml_min=600, seed=0):
+        self.clock = clock
+        self.signals = signals
+        self.capacity_ml = capacity_ml
+        self.water_ml = moisture * capacity_ml
+        self.et_ml_day = et_ml_day
+        self.field_capacity = field_capacity
+        self.drain_per_h = drain_per_h
+        self.flow_ml_min = flow_ml_min
+        self.random = random.Random(seed)
+        self.pump_on = False
+        self.pumped_ml = 0.0
+        self.pump_runs = 0
+        self.drained_ml = 0.0
+        self.probes = {}
+        self.pump_pin = pump_pin
+        self.last_s = clock.seconds()
+        board.add_pin_listener(pump_pin, self._on_pump)
+
+    def add_probe(self, pin, dry_raw, wet_raw, noise=150.0, offset=0.0):
+        # offset shifts this probe's reading (in moisture fraction), e.g. a probe in a drier corner
+        self.probes[pin] = (dry_raw, wet_raw, noise, offset)
+        self.signals.set(f"adc{pin}", lambda t, pin=pin: self.read_raw(pin))
+
+    def fail_probe(self, pin, raw):
+        # From now on the probe reads a fixed value: 0 for a shorted one, 65535 for a lost contact
+        self.signals.set(f"adc{pin}", raw)
+
+    def moisture(self):
+        self.update()
+        return self.water_ml / self.capacity_ml
+
+    def read_raw(self, pin):
+        dry_raw, wet_raw, noise, offset = self.probes[pin]
+        fraction = min(1.0, max(0.0, self.moisture() + offset))
+        raw = dry_raw - (dry_raw - wet_raw) * fraction + self.random.gauss(0, noise)
+        return max(0, min(65535, raw))
+
+    def _on_pump(self, level):
+        self.update()
+        if level and not self.pump_on:
+            self.pump_runs += 1
+        self.pump_on = bool(level)
+
+    def update(self):
+        now = self.clock.seconds()
+        dt = now - self.last_s
+        if dt <= 0:
+            return
+        self.last_s = now
+        if self.pump_on:
+            added = self.flow_ml_min * dt / 60
+            self.pumped_ml += added
+            self.water_ml += added
+        # Evapotranspiration scales with how warm and bright it is around the plant
+        temperature = self.signals.read("temperature", 25.0)
+        lux = self.signals.read("lux", 300.0)
+        factor = max(0.2, 1 + (temperature - 25) * 0.06) * (0.4 + min(lux, 1500) / 1000)
+        fraction = self.water_ml / self.capacity_ml
+        # Drier soil holds on to its water harder, the plant gets less out of it
+        stress = min(1.0, fraction / 0.3)
+        self.water_ml -= self.et_ml_day * factor * stress * dt / 86400
+        excess = self.water_ml - self.field_capacity * self.capacity_ml
+        if excess > 0:
+            drained = excess * (1 - math.exp(-self.drain_per_h * dt / 3600))
+            self.water_ml -= drained
+            self.drained_ml += drained
+        self.water_ml = min(max(self.water_ml, 0.0), self.capacity_ml)
+
+
+class SoilRack:
+    # Pots whose probes share one ADC pin through an analog multiplexer: the levels on the select
+    # pins pick the channel, so a probe only reads while its channel is selected. Also counts how
+    # many of the pots' pumps run at once, which is what the power supply sees.
+    def __init__(self, signals, board, adc_pin, select_pins):
+        self.board = board
+        self.select_pins = select_pins
+        self.channels = {}
+        self.pumps_on = set()
+        self.max_pumps_on = 0
+        signals.set(f"adc{adc_pin}", lambda t: self.read_raw())
+
+    def add(self, channel, pot, dry_raw, wet_raw, noise=150.0, offset=0.0):
+        pot.probes[("mux", channel)] = (dry_raw, wet_raw, noise, offset)
+        self.channels[channel] = pot
+        self.board.add_pin_listener(pot.pump_pin, lambda level, pin=pot.pump_pin: self._on_pump(pin, level))
+
+    def read_raw(self):
+        channel = 0
+        for bit, pin in enumerate(self.select_pins):
+            channel |= (1 if self.board.level(pin, 0) else 0) << bit
+        pot = self.channels.get(channel)
+        return pot.read_raw(("mux", channel)) if pot else 65535  # Open input floats high
+
+    def _on_pump(self, pin, level):
+        if level:
+            self.pumps_on.add(pin)
+        else:
+            self.pumps_on.discard(pin)
+        self.max_pumps_on = max(self.max_pumps_on, len(self.pumps_on))
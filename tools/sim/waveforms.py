@@ -0,0 +1,105 @@
+import math
+import random
+import zlib
+
+
+class Waveform:
+    # base + amplitude * sin over `period_s`, gaussian noise, and scripted steps/spikes/holds on top.
+    # Noise is seeded per signal so two runs with the same seed read the same values.
+    def __init__(self, base, amplitude=0.0, period_s=86400, phase_s=0.0, noise=0.0,
+                 minimum=None, maximum=None, seed=0):
+        self.base = base
+        self.amplitude = amplitude
+        self.period_s = period_s
+        self.phase_s = phase_s
+        self.noise = noise
+        self.minimum = minimum
+        self.maximum = maximum
+        self.random = random.Random(seed)
+        self.steps = []
+        self.overrides = []
+
+    def step(self, at_s, delta):
+        # Permanent offset from `at_s` on (a heater switching on, a sensor drifting)
+        self.steps.append((at_s, delta))
+        return self
+
+    def spike(self, at_s, value, duration_s=1.0):
+        # Reads return `value` for a while, e.g. a glitch the spike filter should reject
+        self.overrides.append((at_s, at_s + duration_s, value))
+        return self
+
+    def hold(self, start_s, end_s, value):
+        self.overrides.append((start_s, end_s, value))
+        return self
+
+    def at(self, t):
+        for start, end, value in self.overrides:
+            if start <= t < end:
+                return value
+        value = self.base
+        if self.amplitude:
+            value += self.amplitude * math.sin(2 * math.pi * (t + self.phase_s) / self.period_s)
+        for at_s, delta in self.steps:
+            if t >= at_s:
+                value += delta
+        if self.noise:
+            value += self.random.gauss(0, self.noise)
+        if self.minimum is not None and value < self.minimum:
+            value = self.minimum
+        if self.maximum is not None and value > self.maximum:
+            value = self.maximum
+        return value
+
+
+def default_waveforms(seed=0):
+    # A growhouse day: warmest and brightest around 14:00 (the clock starts at 12:00 true time)
+    def make(name, *args, **kwargs):
+        return Waveform(*args, seed=seed ^ zlib.crc32(name.encode()), **kwargs)
+
+    return {
+        # BME688 raw readings; the firmware subtracts TEMPERATURE_OFFSET for self-heating
+        "temperature": make("temperature", 27.0, 3.0, 86400, phase_s=14400, noise=0.05),
+        "humidity": make("humidity", 55.0, -10.0, 86400, phase_s=14400, noise=0.3, minimum=0, maximum=100),
+        "pressure": make("pressure", 101325.0, 150.0, 3 * 86400, noise=5.0),
+        "gas": make("gas", 60000.0, 15000.0, 6 * 3600, noise=500.0, minimum=1000),
+        "lux": make("lux", 150.0, 650.0, 86400, phase_s=14400, noise=5.0, minimum=0),
+        "chip_temperature": make("chip_temperature", 30.0, 2.0, 86400, noise=0.2),
+        "rssi": make("rssi", -60.0, 5.0, 3600, noise=2.0, maximum=-20),
+        # Raw read_u16() values per ADC GPIO: microphone, two soil probes, VSYS / 3
+        "adc26": make("adc26", 33000.0, noise=800.0, minimum=0, maximum=65535),
+        "adc27": make("adc27", 24000.0, noise=150.0, minimum=0, maximum=65535),
+        "adc28": make("adc28", 24000.0, noise=150.0, minimum=0, maximum=65535),
+        "adc29": make("adc29", 32430.0, noise=50.0, minimum=0, maximum=65535),
+    }
+
+
+class Signals:
+    # Every simulated sensor reads its value from here, by name, at the current device time
+    def __init__(self, clock, seed=0):
+        self.clock = clock
+        self.seed = seed
+        self.sources = default_waveforms(seed)
+
+    def reset(self, seed=None):
+        if seed is not None:
+            self.seed = seed
+        self.sources = default_waveforms(self.seed)
+
+    def set(self, name, source):
+        # A Waveform, any callable of device seconds, or a constant
+        self.sources[name] = source
+        return source
+
+    def get(self, name):
+        return self.sources.get(name)
+
+    def read(self, name, default=0.0):
+        source = self.sources.get(name)
+        if source is None:
+            return default
+        if isinstance(source, Waveform):
+            return source.at(self.clock.seconds())
+        if callable(source):
+            return source(self.clock.seconds())
+        return source
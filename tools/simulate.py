@@ -0,0 +1,111 @@
+"""Run the firmware in ``src/`` unmodified on simulated hardware, faster than real time.
+
+The stand-in modules and the virtual clock live in ``tools/sim``. Idle time (sleeps, waits for
+the next job) is skipped instead of waited for, so an hour of device time takes seconds:
+
+    python tools/simulate.py --seconds 3600
+    python tools/simulate.py --seconds 600 --scenario outage.json --quiet
+    python tools/simulate.py --seconds 120 --press X@30 --outage broker@40+30 \\
+        --mqtt "60:{client}/control/trace=start:5" --set PERF_ENABLED=true --frames frames.jsonl
+    python tools/simulate.py --realtime --seconds 120 --set HTTP_SERVER_ENABLED=true --set HTTP_SERVER_PORT=8080
+
+See ``tools/sim/scenario.py`` for the scenario file format; the command line options add to it.
+"""
+import argparse
+import base64
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import sim  # noqa: E402
+from sim import firmware, scenario as scenarios  # noqa: E402
+
+
+def parse_value(text):
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+def parse_press(text):
+    # X@30 or EXT@90+1500 (hold in ms)
+    button, _, rest = text.partition("@")
+    at_s, _, hold = rest.partition("+")
+    return [button, float(at_s), int(hold)] if hold else [button, float(at_s)]
+
+
+def parse_outage(text):
+    # broker@300+120
+    service, _, rest = text.partition("@")
+    start, _, duration = rest.partition("+")
+    return [service, float(start), float(duration)]
+
+
+def parse_mqtt(text):
+    # 60:{client}/control/trace=start:10
+    at_s, _, rest = text.partition(":")
+    topic, _, payload = rest.partition("=")
+    return [float(at_s), topic, payload]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, help="device seconds to run (default: scenario or 300)")
+    parser.add_argument("--scenario", help="scenario JSON file")
+    parser.add_argument("--seed", type=int, help="noise seed for the sensor waveforms")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE", help="config override")
+    parser.add_argument("--press", action="append", default=[], metavar="BUTTON@T[+HOLD_MS]")
+    parser.add_argument("--outage", action="append", default=[], metavar="SERVICE@T+DURATION")
+    parser.add_argument("--mqtt", action="append", default=[], metavar="T:TOPIC=PAYLOAD",
+                        help="inject a message into the broker")
+    parser.add_argument("--deterministic", action="store_true",
+                        help="only sleeps advance the clock, host compute time counts as zero")
+    parser.add_argument("--realtime", action="store_true",
+                        help="wait idle time instead of skipping it, e.g. to curl the HTTP server")
+    parser.add_argument("--strict-watchdog", action="store_true", help="stop when the watchdog starves")
+    parser.add_argument("--flash-dir", help="keep config.json and the flash contents here")
+    parser.add_argument("--quiet", action="store_true", help="hide the firmware's console output")
+    parser.add_argument("--frames", help="write the recorded display frames as JSON lines")
+    parser.add_argument("--mqtt-log", help="write everything published to the broker as JSON lines")
+    args = parser.parse_args(argv)
+
+    scenario = scenarios.load(args.scenario) if args.scenario else {}
+    scenario.setdefault("buttons", []).extend(parse_press(text) for text in args.press)
+    scenario.setdefault("outages", []).extend(parse_outage(text) for text in args.outage)
+    scenario.setdefault("mqtt", []).extend(parse_mqtt(text) for text in args.mqtt)
+    overrides = {}
+    for text in args.set:
+        key, _, value = text.partition("=")
+        overrides[key] = parse_value(value)
+
+    sim.clock.realtime_compute = not args.deterministic
+    sim.clock.skip_idle = not args.realtime
+    seconds = args.seconds or scenario.get("seconds", 300)
+    result = firmware.run(seconds, scenario, overrides, root=args.flash_dir, quiet=args.quiet,
+                          seed=args.seed, strict_watchdog=args.strict_watchdog)
+
+    if args.frames:
+        with open(args.frames, "w") as f:
+            for display in sim.board.displays:
+                for at_s, ops in display.frames:
+                    texts = [op[4] for op in ops if op[0] == "text"]
+                    f.write(json.dumps({"t": at_s, "ops": len(ops), "texts": texts}) + "\n")
+    if args.mqtt_log:
+        with open(args.mqtt_log, "w") as f:
+            for at_s, topic, payload in sim.loopback.broker.messages:
+                try:
+                    entry = {"t": at_s, "topic": topic, "payload": payload.decode()}
+                except UnicodeError:
+                    entry = {"t": at_s, "topic": topic, "payload_b64": base64.b64encode(payload).decode()}
+                f.write(json.dumps(entry) + "\n")
+
+    json.dump(result, sys.stdout, indent=2)
+    print()
+    return 1 if result["reset"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
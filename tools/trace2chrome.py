@@ -0,0 +1,126 @@
+"""Convert a device trace dump into Chrome trace JSON for Perfetto / chrome://tracing.
+
+The dump comes from ``managers/trace_recorder.py``: either the file written by
+the ``save`` command (``/trace.bin`` on the device) or the ``trace/dump`` MQTT
+messages of a ``dump`` command, saved back to back (``--chunked``):
+
+    mosquitto_sub -t '<client>/trace/dump' -N > trace.chunks
+    python tools/trace2chrome.py trace.chunks --chunked -o trace.json
+    python tools/trace2chrome.py trace.bin -o trace.json
+"""
+import argparse
+import json
+import struct
+import sys
+
+MAGIC = b"EPTR"
+HEADER_FORMAT = "<4sBBHI"
+EVENT_FORMAT = "<IHBB"
+EVENT_SIZE = struct.calcsize(EVENT_FORMAT)
+CHUNK_HEADER_FORMAT = "<HHH"
+PHASES = {0: "B", 1: "E", 2: "i"}
+
+
+def reassemble(data):
+    # Chunks may arrive out of order or repeated (QoS 1), keep one per sequence number
+    chunks = {}
+    total = None
+    offset = 0
+    header_size = struct.calcsize(CHUNK_HEADER_FORMAT)
+    while offset + header_size <= len(data):
+        seq, total, length = struct.unpack_from(CHUNK_HEADER_FORMAT, data, offset)
+        offset += header_size
+        chunks[seq] = data[offset:offset + length]
+        offset += length
+    if total is None:
+        raise ValueError("no trace chunks found")
+    missing = [seq for seq in range(total) if seq not in chunks]
+    if missing:
+        raise ValueError(f"missing chunks: {missing}")
+    return b"".join(chunks[seq] for seq in range(total))
+
+
+def parse(data):
+    magic, version, name_count, event_count, ticks_period = struct.unpack_from(HEADER_FORMAT, data, 0)
+    if magic != MAGIC:
+        raise ValueError("not a trace dump")
+    if version != 1:
+        raise ValueError(f"unsupported trace version {version}")
+    offset = struct.calcsize(HEADER_FORMAT)
+    names = []
+    for _ in range(name_count):
+        length = data[offset]
+        names.append(data[offset + 1:offset + 1 + length].decode("utf-8", "replace"))
+        offset += 1 + length
+    events = []
+    for index in range(event_count):
+        events.append(struct.unpack_from(EVENT_FORMAT, data, offset + index * EVENT_SIZE))
+    return names, events, ticks_period
+
+
+def to_chrome(names, events, ticks_period):
+    trace_events = []
+    tasks = set()
+    depth = {}
+    base = None
+    previous = None
+    wraps = 0
+    for ticks, name_id, phase, task_id in events:
+        # ticks_us wraps every ticks_period; events are in order, so a big step back is a wrap
+        if previous is not None and ticks < previous and previous - ticks > ticks_period // 2:
+            wraps += 1
+        previous = ticks
+        timestamp = ticks + wraps * ticks_period
+        if base is None:
+            base = timestamp
+        tasks.add(task_id)
+        ph = PHASES.get(phase, "i")
+        # After the ring wrapped, the oldest events can be ends whose begins were overwritten
+        if ph == "E":
+            if not depth.get(task_id):
+                continue
+            depth[task_id] -= 1
+        elif ph == "B":
+            depth[task_id] = depth.get(task_id, 0) + 1
+        event = {
+            "name": names[name_id] if name_id < len(names) else f"#{name_id}",
+            "ph": ph,
+            "ts": timestamp - base,
+            "pid": 1,
+            "tid": task_id,
+        }
+        if event["ph"] == "i":
+            event["s"] = "t"
+        trace_events.append(event)
+
+    for task_id in sorted(tasks):
+        trace_events.append({"name": "thread_name", "ph": "M", "pid": 1, "tid": task_id,
+                             "args": {"name": f"task {task_id}" if task_id else "main"}})
+    trace_events.append({"name": "process_name", "ph": "M", "pid": 1, "args": {"name": "enviro-pi"}})
+    return {"traceEvents": trace_events, "displayTimeUnit": "ms"}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("dump", help="trace.bin from the device, or saved trace/dump messages with --chunked")
+    parser.add_argument("--chunked", action="store_true", help="input is concatenated trace/dump MQTT messages")
+    parser.add_argument("-o", "--output", help="output file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    with open(args.dump, "rb") as f:
+        data = f.read()
+    if args.chunked:
+        data = reassemble(data)
+    names, events, ticks_period = parse(data)
+    trace = to_chrome(names, events, ticks_period)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(trace, f)
+        print(f"{len(events)} events written to {args.output}", file=sys.stderr)
+    else:
+        json.dump(trace, sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""Run the closed-loop watering controller against a simulated pot for weeks of device time.
+
+Only the watering side of the firmware runs: the M5 watering unit, the DFRobot probe and the
+WateringController from ``src/``, driven by their scheduler jobs. The pot is the soil model in
+``tools/sim/soil.py``. A month of control behaviour takes seconds:
+
+    python tools/watering.py --days 28
+    python tools/watering.py --days 14 --et 320 --set WATERING_MAX_CYCLES=3 -o decisions.jsonl
+    python tools/watering.py --days 7 --fail-probe 28@2=65535        # DFR probe loses contact on day 2
+    python tools/watering.py --days 14 --zones 8 --set WATERING_DOSE_ML=80
+
+With ``--zones N`` the ZoneScheduler waters a rack of N pots instead. Each pot has its own pump
+and a thirst drawn from the seed; the probes share ADC pin 28 through a multiplexer.
+
+The summary (moisture range, time spent too dry or waterlogged, water pumped, decisions by
+state) is printed as JSON; ``-o`` writes every published decision as JSON lines.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import sim  # noqa: E402
+from sim import firmware  # noqa: E402
+from sim.soil import SoilModel, SoilRack  # noqa: E402
+from simulate import parse_value  # noqa: E402
+
+SAMPLE_S = 600  # How often the true soil moisture is logged for the summary
+RACK_ADC_PIN = 28
+RACK_MUX_PINS = [18, 19, 20, 21]  # Up to 16 zones, their pumps on GPIO 2-17
+RACK_FIRST_PUMP_PIN = 2
+
+
+class DecisionLog:
+    # Takes the place of the MQTT manager: keeps every decision the controller publishes
+    def __init__(self, clock):
+        self.clock = clock
+        self.decisions = []
+
+    def publish_message(self, subtopic, message):
+        decision = json.loads(message)
+        decision["device_s"] = round(self.clock.seconds(), 1)
+        self.decisions.append(decision)
+        return True
+
+
+def parse_failure(text):
+    # 28@2.5=65535: pin, day, raw value from then on
+    pin, _, rest = text.partition("@")
+    day, _, raw = rest.partition("=")
+    return int(pin), float(day), int(raw)
+
+
+def rack_config(zones):
+    return {
+        "WATERING_ZONES": [{"name": f"pot{index}", "sensor_pin": RACK_ADC_PIN, "mux_channel": index,
+                            "pump_pin": RACK_FIRST_PUMP_PIN + index} for index in range(zones)],
+        "WATERING_ZONE_MUX_PINS": RACK_MUX_PINS,
+    }
+
+
+def moisture_summary(samples, threshold, waterlogged):
+    if not samples:
+        return {"moisture_min": None, "moisture_max": None, "moisture_mean": None,
+                "pct_time_below_threshold": None, "pct_time_waterlogged": None}
+    return {
+        "moisture_min": round(min(samples), 1),
+        "moisture_max": round(max(samples), 1),
+        "moisture_mean": round(sum(samples) / len(samples), 1),
+        "pct_time_below_threshold": round(100 * sum(1 for m in samples if m < threshold) / len(samples), 2),
+        "pct_time_waterlogged": round(100 * sum(1 for m in samples if m >= waterlogged) / len(samples), 2),
+    }
+
+
+def run(days, overrides=None, et_ml_day=180, refill_days=7, failures=(), seed=0, zones=0):
+    config = {"WATERING_ENABLED": True}
+    if zones:
+        config.update(rack_config(zones))
+    config.update(overrides or {})
+    with firmware.session(overrides=config, quiet=True, seed=seed):
+        import uasyncio
+        from managers.config_manager import ConfigManager
+        from managers.log_manager import LogManager
+        from managers.data_manager import DataManager
+        from managers.job_scheduler import JobScheduler
+        from managers.watering_controller import WateringController
+        from components.water_tank import WaterTank
+        from components.m5_watering_unit import M5WateringUnit
+        from components.dfr_moisture_sensor import DFRobotMoistureSensor
+
+        log_mgr = LogManager()
+        config_mgr = ConfigManager(log_mgr)
+        tank = WaterTank(config_mgr.WATER_TANK_FULL_CAPACITY or 1400, log_mgr)
+        decisions = DecisionLog(sim.clock)
+        scheduler = JobScheduler(log_mgr)
+        rack = None
+        if zones:
+            from managers.zone_scheduler import ZoneScheduler
+            rng = random.Random(seed)
+            pots = []
+            rack = SoilRack(sim.signals, sim.board, RACK_ADC_PIN, RACK_MUX_PINS)
+            for index in range(zones):
+                pot = SoilModel(sim.clock, sim.signals, sim.board, pump_pin=RACK_FIRST_PUMP_PIN + index,
+                                moisture=rng.uniform(0.35, 0.55), et_ml_day=et_ml_day * rng.uniform(0.6, 1.4),
+                                flow_ml_min=config_mgr.M5_WATER_PUMP_FLOW_RATE or 600, seed=seed + index)
+                rack.add(index, pot, config_mgr.M5_MOISTURE_SENSOR_DRY_VALUE, config_mgr.M5_MOISTURE_SENSOR_WET_VALUE)
+                pots.append(pot)
+            watering = ZoneScheduler(config_mgr, log_mgr, tank, decisions)
+        else:
+            soil = SoilModel(sim.clock, sim.signals, sim.board, pump_pin=config_mgr.M5_WATER_PUMP_PIN_NR,
+                             et_ml_day=et_ml_day, flow_ml_min=config_mgr.M5_WATER_PUMP_FLOW_RATE or 600, seed=seed)
+            soil.add_probe(config_mgr.M5_MOISTURE_SENSOR_PIN_NR, config_mgr.M5_MOISTURE_SENSOR_DRY_VALUE,
+                           config_mgr.M5_MOISTURE_SENSOR_WET_VALUE)
+            soil.add_probe(config_mgr.DFR_MOISTURE_SENSOR_PIN, config_mgr.DFR_MOISTURE_SENSOR_DRY_VALUE,
+                           config_mgr.DFR_MOISTURE_SENSOR_WET_VALUE, noise=400, offset=-0.03)
+            for pin, day, raw in failures:
+                sim.clock.at(day * 86400, lambda pin=pin, raw=raw: soil.fail_probe(pin, raw))
+            pots = [soil]
+
+            data_mgr = DataManager(config_mgr, log_mgr, None)
+            unit = M5WateringUnit(config_mgr, None, log_mgr, data_mgr, tank)
+            probe = DFRobotMoistureSensor(config_mgr, log_mgr, data_mgr)
+            watering = WateringController(config_mgr, log_mgr, unit, probe, decisions)
+
+        scheduler.add_job("moisture", (config_mgr.MOISTURE_CHECK_INTERVAL or 300) * 1000, watering.read_sensors, priority=2)
+        scheduler.add_job("watering", (config_mgr.WATERING_CHECK_INTERVAL or 900) * 1000, watering.decide, priority=1)
+
+        samples = [[] for _ in pots]
+
+        def sample():
+            for pot, pot_samples in zip(pots, samples):
+                pot_samples.append(pot.moisture() * 100)
+        sim.clock.schedule(SAMPLE_S * 1000000, sample, SAMPLE_S * 1000000)
+        refills = []
+        if refill_days:
+            def refill():
+                refills.append(round(tank.get_capacity(), 1))
+                tank.reset_capacity()
+            sim.clock.schedule(int(refill_days * 86400 * 1000000), refill, int(refill_days * 86400 * 1000000))
+
+        async def main():
+            task = uasyncio.create_task(scheduler.run())
+            await uasyncio.sleep(days * 86400)
+            task.cancel()
+
+        sim.clock.run(main())
+
+    threshold = config_mgr.MOISTURE_THRESHOLD or 40
+    waterlogged = pots[0].field_capacity * 100
+    states = {}
+    for decision in decisions.decisions:
+        states[decision["state"]] = states.get(decision["state"], 0) + 1
+    summary = {"days": days}
+    summary.update(moisture_summary([m for pot_samples in samples for m in pot_samples], threshold, waterlogged))
+    summary.update({
+        "pump_runs": sum(pot.pump_runs for pot in pots),
+        "pumped_ml": round(sum(pot.pumped_ml for pot in pots), 1),
+        "drained_ml": round(sum(pot.drained_ml for pot in pots), 1),
+        "tank_left_at_refills": refills,
+        "decisions": len(decisions.decisions),
+        "states": states,
+    })
+    if rack:
+        summary["max_pumps_on"] = rack.max_pumps_on
+        summary["zones"] = []
+        for pot, pot_samples in zip(pots, samples):
+            zone = {"et_ml_day": round(pot.et_ml_day, 1)}
+            zone.update(moisture_summary(pot_samples, threshold, waterlogged))
+            zone["pump_runs"] = pot.pump_runs
+            zone["pumped_ml"] = round(pot.pumped_ml, 1)
+            summary["zones"].append(zone)
+    return summary, decisions.decisions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=float, default=28, help="device days to run")
+    parser.add_argument("--et", type=float, default=180, help="evapotranspiration in ml per day at 25 C and 600 lux")
+    parser.add_argument("--refill-days", type=float, default=7, help="refill the tank this often, 0 = never")
+    parser.add_argument("--fail-probe", action="append", default=[], metavar="PIN@DAY=RAW",
+                        help="the probe on PIN reads RAW from DAY on (single pot only)")
+    parser.add_argument("--zones", type=int, default=0, help="water a rack of this many pots (up to 16)")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE", help="config override")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", help="write the decision trace as JSON lines")
+    args = parser.parse_args(argv)
+
+    overrides = {}
+    for text in args.set:
+        key, _, value = text.partition("=")
+        overrides[key] = parse_value(value)
+    import time
+    start = time.perf_counter()
+    summary, decisions = run(args.days, overrides, args.et, args.refill_days,
+                             [parse_failure(text) for text in args.fail_probe], args.seed, args.zones)
+    summary["wall_s"] = round(time.perf_counter() - start, 2)
+    if args.output:
+        with open(args.output, "w") as f:
+            for decision in decisions:
+                f.write(json.dumps(decision) + "\n")
+    print(json.dumps(summary, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())